@@ -0,0 +1,270 @@
+"""Benchmarks for every stage of the pygitviz pipeline, run against synthetic
+repositories of configurable shape.
+
+Each stage is timed separately, along with the amount of subprocesses it
+spawns and its peak Python memory usage. Results are compared against the
+stored baselines, and the script exits with a non-zero status if any stage
+spawns more subprocesses or uses more memory than its baseline. Times vary
+between machines, so slower stages are only reported as warnings.
+
+Usage:
+
+    python benchmarks/run_benchmarks.py                   # compare to baselines
+    python benchmarks/run_benchmarks.py --update-baseline # store new baselines
+"""
+import argparse
+import contextlib
+import dataclasses
+import json
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from _pygitviz import git
+from _pygitviz import graphviz
+from _pygitviz import svg
+from _pygitviz import util
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+from synthetic_repo import RepoShape, create_repo  # noqa: E402
+
+BASELINE_FILE = pathlib.Path(__file__).parent / "baseline.json"
+# stages faster than this are too noisy to compare times of
+TIME_FLOOR = 0.05
+# the least increase of peak memory, in bytes, that counts as a regression
+MEMORY_FLOOR = 64 * 1024
+
+SHAPES = [
+    RepoShape("small-loose", num_commits=50, num_branches=2, packed=False),
+    RepoShape("linear-packed", num_commits=2000, tree_depth=2, files_per_tree=3),
+    RepoShape(
+        "branchy-packed",
+        num_commits=2000,
+        num_branches=20,
+        tree_depth=3,
+        files_per_tree=3,
+        num_tags=50,
+        commit_graph=True,
+    ),
+    RepoShape(
+        "deep-loose",
+        num_commits=300,
+        num_branches=4,
+        tree_depth=5,
+        files_per_tree=2,
+        packed=False,
+        num_tags=10,
+    ),
+]
+
+
+@dataclasses.dataclass
+class StageResult:
+    seconds: float
+    subprocesses: int
+    peak_memory: int
+
+
+class _CountingPopen(subprocess.Popen):
+    count = 0
+
+    def __init__(self, *args, **kwargs):
+        type(self).count += 1
+        super().__init__(*args, **kwargs)
+
+
+@contextlib.contextmanager
+def _count_subprocesses():
+    original_popen = subprocess.Popen
+    _CountingPopen.count = 0
+    subprocess.Popen = _CountingPopen
+    try:
+        yield
+    finally:
+        subprocess.Popen = original_popen
+
+
+def measure(func: Callable[[], object], repeat: int) -> StageResult:
+    """Measure a stage. The time is the best of the repetitions, while the
+    subprocess count and peak memory are taken from a separate run, as
+    tracing memory allocations slows Python down considerably.
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        with _count_subprocesses():
+            func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return StageResult(seconds, _CountingPopen.count, peak_memory)
+
+
+def benchmark_repo(
+    git_dir: pathlib.Path, output_dir: pathlib.Path, repeat: int
+) -> Dict[str, StageResult]:
+    """Benchmark every stage of the pipeline on a repository."""
+    git_objects = git.collect_objects(git_dir)
+    refs = git.collect_refs(git_dir)
+    graph = graphviz.to_graphviz(git_objects, refs, hide_content=False)
+
+    stages = {
+        "collect_objects": lambda: git.collect_objects(git_dir),
+        "collect_objects(git)": lambda: git.collect_objects(
+            git_dir, git.ObjectBackend.GIT
+        ),
+        "collect_objects(hide_content)": lambda: git.collect_objects(
+            git_dir, hide_content=True
+        ),
+        "collect_refs": lambda: git.collect_refs(git_dir),
+        "state": lambda: git.state(git_dir),
+        "Fingerprinter.state": lambda: git.Fingerprinter(git_dir).state(),
+        "to_graphviz": lambda: graphviz.to_graphviz(
+            git_objects, refs, hide_content=False
+        ),
+        "iter_svg": lambda: "".join(svg.iter_svg(git_objects, refs)),
+    }
+    if shutil.which("dot"):
+        stages["compile"] = lambda: util.compile(output_dir / "graph.png", graph)
+
+    return {name: measure(func, repeat) for name, func in stages.items()}
+
+
+def compare(
+    results: Dict[str, Dict[str, StageResult]],
+    baseline: Dict[str, Dict[str, dict]],
+    tolerance: float,
+) -> Tuple[List[str], List[str]]:
+    """Compare the results against the baseline.
+
+    Subprocess counts are deterministic and must not grow at all, and peak
+    memory may exceed the baseline by the tolerance. Those are regressions.
+    Times depend on the machine that measured them, so a stage that is slower
+    than its baseline by more than the tolerance is only a warning, and
+    stages that take less than :py:const:`TIME_FLOOR` are not compared.
+
+    Returns:
+        Descriptions of the regressions and of the warnings.
+    """
+    regressions = []
+    warnings = []
+    for shape_name, stages in results.items():
+        for stage, result in stages.items():
+            expected = baseline.get(shape_name, {}).get(stage)
+            if expected is None:
+                continue
+
+            prefix = f"{shape_name}/{stage}"
+            slower = result.seconds > expected["seconds"] * (1 + tolerance)
+            if slower and result.seconds >= TIME_FLOOR:
+                warnings.append(
+                    f"{prefix}: {result.seconds:.4f}s, "
+                    f"baseline {expected['seconds']:.4f}s"
+                )
+            if result.subprocesses > expected["subprocesses"]:
+                regressions.append(
+                    f"{prefix}: {result.subprocesses} subprocesses, "
+                    f"baseline {expected['subprocesses']}"
+                )
+            if result.peak_memory > max(
+                expected["peak_memory"] * (1 + tolerance),
+                expected["peak_memory"] + MEMORY_FLOOR,
+            ):
+                regressions.append(
+                    f"{prefix}: {result.peak_memory} bytes peak memory, "
+                    f"baseline {expected['peak_memory']}"
+                )
+    return regressions, warnings
+
+
+def _print_results(shape: RepoShape, results: Dict[str, StageResult]) -> None:
+    print(f"\n{shape.name}: {shape}")
+    print(f"{'stage':<32}{'seconds':>12}{'subprocesses':>14}{'peak KiB':>12}")
+    for stage, result in results.items():
+        print(
+            f"{stage:<32}{result.seconds:>12.4f}{result.subprocesses:>14}"
+            f"{result.peak_memory // 1024:>12}"
+        )
+
+
+def _create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--update-baseline",
+        help="Store the results as the new baseline instead of comparing",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--tolerance",
+        help="Allowed relative increase of time and memory over the baseline",
+        default=0.5,
+        type=float,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Amount of timed repetitions of each stage, the best is kept",
+        default=3,
+        type=int,
+    )
+    parser.add_argument(
+        "--shape",
+        help="Only run the shapes with these names",
+        action="append",
+        choices=[shape.name for shape in SHAPES],
+    )
+    return parser
+
+
+def main() -> None:
+    args = _create_parser().parse_args()
+    shapes = [shape for shape in SHAPES if not args.shape or shape.name in args.shape]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for shape in shapes:
+            git_dir = create_repo(shape, pathlib.Path(tmpdir) / shape.name)
+            results[shape.name] = benchmark_repo(
+                git_dir, pathlib.Path(tmpdir), args.repeat
+            )
+            _print_results(shape, results[shape.name])
+
+    baseline = (
+        json.loads(BASELINE_FILE.read_text(encoding="utf8"))
+        if BASELINE_FILE.is_file()
+        else {}
+    )
+    if args.update_baseline:
+        for shape_name, stages in results.items():
+            baseline[shape_name] = {
+                stage: dataclasses.asdict(result) for stage, result in stages.items()
+            }
+        BASELINE_FILE.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf8"
+        )
+        print(f"\nBaseline written to {BASELINE_FILE}")
+        return
+
+    regressions, warnings = compare(results, baseline, args.tolerance)
+    if warnings:
+        print("\nSlower than baseline (not a failure, times vary between machines):")
+        print("\n".join(f"\t{warning}" for warning in warnings))
+    if regressions:
+        print("\nRegressions:")
+        print("\n".join(f"\t{regression}" for regression in regressions))
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
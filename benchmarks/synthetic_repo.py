@@ -0,0 +1,146 @@
+"""Generation of synthetic Git repositories of configurable shape, used by the
+benchmarks. Repositories are written with a single `git fast-import`, which
+is orders of magnitude faster than creating commits one by one.
+"""
+import dataclasses
+import pathlib
+import shutil
+import subprocess
+from typing import List
+
+_COMMITTER = "Bench <bench@example.com>"
+_START_TIME = 1_600_000_000
+
+
+@dataclasses.dataclass(frozen=True)
+class RepoShape:
+    """The shape of a synthetic repository.
+
+    Attributes:
+        name: A name for the shape, used in benchmark reports.
+        num_commits: The total amount of commits.
+        num_branches: The amount of branches. Commits are spread round-robin
+            over the branches, which all fork off from the first commit.
+        tree_depth: The depth of the directory hierarchy that files are put
+            in.
+        files_per_tree: The amount of files and subdirectories per directory.
+        packed: If True, all objects are put in a single, deltified pack.
+            Otherwise, all objects are loose.
+        num_tags: The amount of annotated tags, spread evenly over the
+            history of the first branch.
+        commit_graph: If True, a commit-graph is written for all commits.
+    """
+
+    name: str
+    num_commits: int
+    num_branches: int = 1
+    tree_depth: int = 1
+    files_per_tree: int = 2
+    packed: bool = True
+    num_tags: int = 0
+    commit_graph: bool = False
+
+
+def create_repo(shape: RepoShape, repo: pathlib.Path) -> pathlib.Path:
+    """Create a repository of the given shape, and return its .git directory."""
+    repo.mkdir(parents=True)
+    _git(repo, "init", "--quiet", "--initial-branch=branch0")
+    _git(repo, "fast-import", "--quiet", stdin=_fast_import_stream(shape))
+
+    git_dir = repo / ".git"
+    if shape.packed:
+        _git(repo, "repack", "-a", "-d", "-f", "--quiet")
+    else:
+        _unpack_all(repo, git_dir)
+    if shape.commit_graph:
+        _git(repo, "commit-graph", "write", "--reachable")
+    _git(repo, "checkout", "--quiet", "branch0")
+    return git_dir
+
+
+def _fast_import_stream(shape: RepoShape) -> bytes:
+    paths = _file_paths(shape.tree_depth, shape.files_per_tree)
+    commands: List[bytes] = []
+    branch_tips = {}
+    tags = {mark: n for n, mark in enumerate(_tagged_commits(shape))}
+
+    for i in range(shape.num_commits):
+        mark = i + 1
+        branch = f"branch{i % shape.num_branches}" if i else "branch0"
+        parent = branch_tips.get(branch, 1 if i else None)
+        path = paths[i % len(paths)]
+        message = f"Commit {i}\n".encode()
+        content = f"Content of {path} in commit {i}\n".encode()
+
+        commands.append(f"commit refs/heads/{branch}\nmark :{mark}\n".encode())
+        commands.append(
+            f"committer {_COMMITTER} {_START_TIME + i} +0000\n".encode()
+            + _data(message)
+        )
+        if parent:
+            commands.append(f"from :{parent}\n".encode())
+        commands.append(f"M 100644 inline {path}\n".encode() + _data(content) + b"\n")
+        branch_tips[branch] = mark
+
+        if mark in tags:
+            commands.append(
+                f"tag v{tags[mark]}\nfrom :{mark}\n".encode()
+                + f"tagger {_COMMITTER} {_START_TIME + i} +0000\n".encode()
+                + _data(f"Tag of commit {i}\n".encode())
+            )
+
+    # every branch must exist, even if no commit was put on it
+    for b in range(shape.num_branches):
+        if f"branch{b}" not in branch_tips:
+            commands.append(f"reset refs/heads/branch{b}\nfrom :1\n\n".encode())
+    return b"".join(commands)
+
+
+def _tagged_commits(shape: RepoShape) -> List[int]:
+    first_branch_marks = [
+        i + 1 for i in range(shape.num_commits) if i % shape.num_branches == 0
+    ]
+    if not shape.num_tags:
+        return []
+    step = max(1, len(first_branch_marks) // shape.num_tags)
+    return first_branch_marks[::step][: shape.num_tags]
+
+
+def _file_paths(tree_depth: int, files_per_tree: int) -> List[str]:
+    """Return the paths of all files in a directory hierarchy of the given
+    depth, where every directory has the given amount of files and
+    subdirectories.
+    """
+    paths = []
+    directories = [""]
+    for _ in range(tree_depth):
+        paths.extend(
+            f"{directory}file{i}.txt"
+            for directory in directories
+            for i in range(files_per_tree)
+        )
+        directories = [
+            f"{directory}dir{i}/"
+            for directory in directories
+            for i in range(files_per_tree)
+        ]
+    return paths or ["file.txt"]
+
+
+def _data(content: bytes) -> bytes:
+    return f"data {len(content)}\n".encode() + content
+
+
+def _unpack_all(repo: pathlib.Path, git_dir: pathlib.Path) -> None:
+    """Explode all packs into loose objects."""
+    pack_dir = git_dir / "objects" / "pack"
+    unpacked_dir = repo.parent / f"{repo.name}-packs"
+    shutil.move(str(pack_dir), str(unpacked_dir))
+    pack_dir.mkdir()
+    for pack_file in unpacked_dir.glob("*.pack"):
+        _git(repo, "unpack-objects", "-q", stdin=pack_file.read_bytes())
+    shutil.rmtree(unpacked_dir)
+
+
+def _git(repo: pathlib.Path, *args: str, stdin: bytes = b"") -> None:
+    subprocess.run(["git", *args], cwd=repo, input=stdin, check=True)
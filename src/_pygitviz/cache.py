@@ -0,0 +1,189 @@
+"""An on-disk cache of parsed Git objects that is shared across runs."""
+import dataclasses
+import hashlib
+import os
+import pathlib
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from _pygitviz.gitobject import Type
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+# seconds before the last use of an entry is updated again
+DEFAULT_TOUCH_INTERVAL = 60 * 60
+
+_SHA_SIZE = 20
+# SQLite limits the amount of parameters in a single statement
+_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha BLOB PRIMARY KEY,
+    type TEXT NOT NULL,
+    children BLOB NOT NULL,
+    parents BLOB NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS objects_last_used ON objects (last_used);
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class ParsedObject:
+    """The parsed form of a Git object. For a commit, the tree is the single
+    child with an empty name.
+    """
+
+    sha: str
+    obj_type: Type
+    children: Tuple[Tuple[str, str], ...] = ()
+    parents: Tuple[str, ...] = ()
+
+
+class ObjectCache:
+    """A SHA-keyed cache of parsed Git objects, stored in an SQLite database.
+
+    Git objects are content-addressed, so a cached entry never goes stale.
+    The cache is bounded by the amount of entries, and the least recently
+    used entries are evicted when it grows too large. Recency is tracked
+    coarsely, such that loading from a warm cache rarely writes to it.
+
+    Use as a context manager to close the database.
+    """
+
+    def __init__(
+        self,
+        db_path: pathlib.Path,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        touch_interval: float = DEFAULT_TOUCH_INTERVAL,
+    ):
+        """
+        Args:
+            db_path: Path to the database file, which is created if it does
+                not exist.
+            max_entries: The maximum amount of objects to keep in the cache.
+            touch_interval: Seconds that must pass since the last recorded
+                use of an entry before a new use is recorded.
+        """
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # the live view reads from a render thread, but never concurrently
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._max_entries = max_entries
+        self._touch_interval = touch_interval
+        # counted once, and then kept up to date by the inserts and evictions
+        (self._num_entries,) = self._connection.execute(
+            "SELECT COUNT(*) FROM objects"
+        ).fetchone()
+
+    @classmethod
+    def for_repo(
+        cls, git_root: pathlib.Path, max_entries: int = DEFAULT_MAX_ENTRIES
+    ) -> "ObjectCache":
+        """Return the cache for the provided .git directory, which is stored
+        under $XDG_CACHE_HOME/pygitviz.
+        """
+        repo_key = hashlib.sha1(str(git_root.resolve()).encode("utf8")).hexdigest()
+        return cls(cache_dir() / f"{repo_key}.sqlite", max_entries)
+
+    def __enter__(self) -> "ObjectCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def get_many(self, shas: List[str]) -> Dict[str, ParsedObject]:
+        """Return the cached objects among the provided shas. Shas that are not
+        in the cache are absent from the result.
+        """
+        found = {}
+        now = time.time()
+        stale = []
+        for batch in _batches([bytes.fromhex(sha) for sha in shas]):
+            placeholders = ",".join("?" * len(batch))
+            rows = self._connection.execute(
+                "SELECT sha, type, children, parents, last_used FROM objects "
+                f"WHERE sha IN ({placeholders})",
+                batch,
+            ).fetchall()
+            for *row, last_used in rows:
+                obj = _decode(row)
+                found[obj.sha] = obj
+                if now - last_used >= self._touch_interval:
+                    stale.append(row[0])
+
+        if stale:
+            with self._connection:
+                for batch in _batches(stale):
+                    placeholders = ",".join("?" * len(batch))
+                    self._connection.execute(
+                        "UPDATE objects SET last_used = ? "
+                        f"WHERE sha IN ({placeholders})",
+                        [now, *batch],
+                    )
+        return found
+
+    def put_many(self, objs: Iterable[ParsedObject]) -> None:
+        """Add the provided objects to the cache, and evict the least recently
+        used objects if the cache grows beyond its maximum size.
+        """
+        now = time.time()
+        with self._connection:
+            # objects are content-addressed, so an existing entry is identical
+            inserted = self._connection.executemany(
+                "INSERT OR IGNORE INTO objects VALUES (?, ?, ?, ?, ?)",
+                (_encode(obj) + (now,) for obj in objs),
+            ).rowcount
+            self._num_entries += max(inserted, 0)
+            if self._num_entries > self._max_entries:
+                self._num_entries -= self._connection.execute(
+                    "DELETE FROM objects WHERE sha IN "
+                    "(SELECT sha FROM objects ORDER BY last_used LIMIT ?)",
+                    (self._num_entries - self._max_entries,),
+                ).rowcount
+
+
+def cache_dir() -> pathlib.Path:
+    """Return the directory in which pygitviz stores its caches."""
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = (
+        pathlib.Path(xdg_cache_home)
+        if xdg_cache_home
+        else pathlib.Path.home() / ".cache"
+    )
+    return base / "pygitviz"
+
+
+def _batches(items: list) -> Iterable[list]:
+    return (items[i : i + _BATCH_SIZE] for i in range(0, len(items), _BATCH_SIZE))
+
+
+def _encode(obj: ParsedObject) -> tuple:
+    children = b"".join(
+        name.encode("utf8") + b"\0" + bytes.fromhex(sha) for name, sha in obj.children
+    )
+    parents = b"".join(bytes.fromhex(sha) for sha in obj.parents)
+    return (bytes.fromhex(obj.sha), obj.obj_type.value, children, parents)
+
+
+def _decode(row: tuple) -> ParsedObject:
+    raw_sha, obj_type, raw_children, raw_parents = row
+
+    children = []
+    pos = 0
+    while pos < len(raw_children):
+        name_end = raw_children.index(b"\0", pos)
+        name = raw_children[pos:name_end].decode("utf8")
+        sha = raw_children[name_end + 1 : name_end + 1 + _SHA_SIZE].hex()
+        children.append((name, sha))
+        pos = name_end + 1 + _SHA_SIZE
+
+    parents = tuple(
+        raw_parents[i : i + _SHA_SIZE].hex()
+        for i in range(0, len(raw_parents), _SHA_SIZE)
+    )
+    return ParsedObject(raw_sha.hex(), Type(obj_type), tuple(children), parents)
@@ -1,17 +1,29 @@
 """The command line interface for PyGitViz."""
-import time
 import tempfile
 import argparse
 import sys
 import logging
 import contextlib
+import json
+import sqlite3
+import threading
 from pathlib import Path
+from typing import Optional
 
 import daiquiri
 
 from _pygitviz import util
+from _pygitviz import cache
 from _pygitviz import git
-from _pygitviz.graphviz import git_to_dot
+from _pygitviz import layoutcache
+from _pygitviz import profile
+from _pygitviz import reduce
+from _pygitviz import render
+from _pygitviz import replay
+from _pygitviz import serve
+from _pygitviz import svg
+from _pygitviz import watch
+from _pygitviz.graphviz import iter_graphviz, refs_within
 
 daiquiri.setup(
     level=logging.WARNING,
@@ -36,27 +48,112 @@ def main() -> None:
     with _convert_error_to_log(traceback=args.traceback):
         _validate_args(args)
 
-        pdf_name = "graph.pdf"
-        dot_name = "graph.dot"
+        renderer = util.Renderer(args.renderer)
+        pdf_name = (
+            "graph.svg"
+            if renderer == util.Renderer.NATIVE or args.serve is not None
+            else "graph.pdf"
+        )
         git_root = args.git_directory
-        with tempfile.TemporaryDirectory() as tmpdir:
-            dot_file = Path(str(tmpdir)) / dot_name
+        with tempfile.TemporaryDirectory() as tmpdir, contextlib.ExitStack() as stack:
             pdf_file = Path(str(tmpdir)) / pdf_name
 
-            if args.snapshot:
-                _render(dot_file, args.snapshot, git_root, args.hide_content)
+            object_cache = None if args.no_cache else _open_object_cache(git_root)
+            if object_cache:
+                stack.enter_context(object_cache)
+            object_store = git.ObjectStore(
+                git_root,
+                object_cache=object_cache,
+                reachable_only=args.reachable_only,
+                window=_history_window(args),
+                hide_content=args.hide_content,
+            )
+
+            if args.replay:
+                frames = replay.replay(
+                    args.snapshot,
+                    object_store.update(),
+                    git.collect_refs(git_root),
+                    git.replay_commit_shas(git_root, args.replay),
+                    args.hide_content,
+                    _reduction(args),
+                    renderer,
+                )
+                print(f"{len(frames)} frames saved to '{args.snapshot.parent}'")
+            elif args.snapshot:
+                with _profiled(args.profile):
+                    _render(
+                        args.snapshot,
+                        git_root,
+                        args.hide_content,
+                        object_store,
+                        _reduction(args),
+                        renderer=renderer,
+                    )
                 print(f"Output saved to '{args.snapshot}'")
             else:
+                server = (
+                    stack.enter_context(serve.LiveServer(args.serve))
+                    if args.serve is not None
+                    else None
+                )
                 _mainloop(
                     git_root,
-                    dot_file,
                     pdf_file,
                     args.pdf_viewer,
                     operating_system,
                     args.hide_content,
+                    object_store,
+                    _reduction(args),
+                    renderer,
+                    not args.no_layout_reuse,
+                    args.profile,
+                    server,
                 )
 
 
+def _history_window(args: argparse.Namespace) -> Optional[git.HistoryWindow]:
+    if args.max_commits is None and args.revision_range is None:
+        return None
+    return git.HistoryWindow(
+        max_commits=args.max_commits, revision_range=args.revision_range
+    )
+
+
+def _reduction(args: argparse.Namespace) -> reduce.Reduction:
+    return reduce.Reduction(
+        collapse_chains=args.collapse_chains, max_tree_depth=args.max_tree_depth
+    )
+
+
+def _open_object_cache(git_root: Path) -> Optional[cache.ObjectCache]:
+    try:
+        return cache.ObjectCache.for_repo(git_root)
+    except (OSError, sqlite3.Error) as exc:
+        LOGGER.warning(f"could not open the object cache, continuing without: {exc}")
+        return None
+
+
+@contextlib.contextmanager
+def _profiled(profile_output: Optional[str]):
+    """Profile the context if a profile output is given, and report the
+    profile afterwards. The output "-" means a summary on stdout, anything
+    else is a path to dump the profile to as JSON.
+    """
+    if profile_output is None:
+        yield
+        return
+
+    with profile.profiling() as profiler:
+        yield
+    if profile_output == "-":
+        print(profiler.summary())
+    else:
+        Path(profile_output).write_text(
+            json.dumps(profiler.to_dict(), indent=2), encoding="utf8"
+        )
+
+
 @contextlib.contextmanager
 def _convert_error_to_log(traceback: bool):
     try:
@@ -80,6 +177,33 @@ def _validate_args(args: argparse.Namespace) -> None:
         )
     if args.snapshot:
         util.check_filetype_supported(args.snapshot)
+    if args.renderer == util.Renderer.NATIVE.value:
+        if not args.hide_content:
+            raise ValueError(
+                "the native renderer only shows commits, and requires --hide-content"
+            )
+        if args.snapshot and args.snapshot.suffix != ".svg":
+            raise ValueError(
+                f"the native renderer only writes SVG, cannot write '{args.snapshot}'"
+            )
+    if args.serve is not None and (args.snapshot or args.replay):
+        raise ValueError("--serve cannot be combined with --snapshot or --replay")
+    if args.replay and not args.snapshot:
+        raise ValueError(
+            "--replay requires --snapshot, which the numbered frames are named after"
+        )
+    if args.replay and (args.max_commits is not None or args.revision_range):
+        raise ValueError(
+            "--replay cannot be combined with --max-commits or --revision-range"
+        )
+    if args.max_tree_depth is not None and args.max_tree_depth < 0:
+        raise ValueError(
+            f"invalid --max-tree-depth: {args.max_tree_depth}, must not be negative"
+        )
+    if args.max_commits is not None and args.max_commits < 1:
+        raise ValueError(
+            f"invalid --max-commits: {args.max_commits}, must be at least 1"
+        )
 
 
 def _create_parser(operating_system: util.OS) -> argparse.ArgumentParser:
@@ -114,9 +238,113 @@ def _create_parser(operating_system: util.OS) -> argparse.ArgumentParser:
         "-s",
         "--snapshot",
         metavar="filepath",
-        help="Capture a single snapshot and save it to the specified path. Supports .pdf and .png",
+        help="Capture a single snapshot and save it to the specified path. Supports .pdf, .png and .svg",
         type=Path,
     )
+    parser.add_argument(
+        "--max-commits",
+        metavar="N",
+        help=(
+            "Only show the N most recent commits of each ref. Parents of the "
+            "shown commits are drawn as truncated stubs"
+        ),
+        type=int,
+    )
+    parser.add_argument(
+        "--revision-range",
+        metavar="range",
+        help=(
+            "Only show commits in a revision range as understood by `git "
+            "rev-list`, e.g. main~10..main"
+        ),
+        type=str,
+    )
+    parser.add_argument(
+        "--renderer",
+        help=(
+            "The renderer to use. The native renderer lays out the commit "
+            "graph itself, which is much faster than Graphviz for large "
+            "histories, but requires --hide-content and only writes SVG"
+        ),
+        choices=[renderer.value for renderer in util.Renderer],
+        default=util.Renderer.DOT.value,
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="port",
+        help=(
+            "Serve the graph on localhost instead of opening a PDF viewer. "
+            "Browsers showing the page are updated in place after every "
+            "render. The port defaults to 8000"
+        ),
+        nargs="?",
+        const=8000,
+        type=int,
+    )
+    parser.add_argument(
+        "--no-layout-reuse",
+        help=(
+            "Lay out the whole graph with dot on every refresh, instead of "
+            "keeping the positions of existing nodes and only placing new ones"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="range",
+        help=(
+            "Render one frame per commit in a revision range, showing the "
+            "repository as it was after that commit. Frames are numbered "
+            "after the --snapshot path, e.g. graph-0001.png, and rendered in "
+            "parallel"
+        ),
+        type=str,
+    )
+    parser.add_argument(
+        "--collapse-chains",
+        help=(
+            "Collapse runs of commits with a single parent and a single child "
+            "that no ref points to into one summary node"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max-tree-depth",
+        metavar="N",
+        help=(
+            "Fold trees at depth N, where the top-level tree of a commit is at "
+            "depth 0, such that their content is not shown"
+        ),
+        type=int,
+    )
+    parser.add_argument(
+        "--reachable-only",
+        help=(
+            "Only show objects that are reachable from refs, HEAD and the "
+            "stash, and never read dangling objects"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-cache",
+        help=(
+            "Do not use the on-disk cache of parsed Git objects, which is "
+            "stored in $XDG_CACHE_HOME/pygitviz"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="filepath",
+        help=(
+            "Profile each render. Prints a summary of the time spent per "
+            "phase, subprocesses, object counts and DOT size, or dumps it as "
+            "JSON to the specified path"
+        ),
+        nargs="?",
+        const="-",
+        type=str,
+    )
     parser.add_argument(
         "--tb",
         "--traceback",
@@ -127,29 +355,105 @@ def _create_parser(operating_system: util.OS) -> argparse.ArgumentParser:
     return parser
 
 
-def _render(dot_file: Path, output: Path, git_root: Path, hide_content: bool):
-    graph = git_to_dot(git_root, hide_content)
-    util.compile(dot_file, output, graph)
+def _render(
+    output: Path,
+    git_root: Path,
+    hide_content: bool,
+    object_store: git.ObjectStore,
+    reduction: reduce.Reduction,
+    cancel: Optional[threading.Event] = None,
+    render_cache: Optional[util.RenderCache] = None,
+    renderer: util.Renderer = util.Renderer.DOT,
+    layout_cache: Optional[layoutcache.LayoutCache] = None,
+):
+    with profile.phase("collect_objects"):
+        git_objs = object_store.update()
+    with profile.phase("collect_refs"):
+        refs = git.collect_refs(git_root)
+    if object_store.window:
+        refs = refs_within(refs, git_objs)
+    if reduction:
+        with profile.phase("reduce"):
+            git_objs = reduce.reduce_graph(git_objs, refs, reduction)
+    profile.count_objects(git_objs)
+    with profile.phase("compile"):
+        if renderer == util.Renderer.NATIVE:
+            svg.compile(output, git_objs, refs)
+        elif layout_cache is not None:
+            layoutcache.compile(
+                output,
+                git_objs,
+                refs,
+                hide_content,
+                layout_cache,
+                cancel,
+                render_cache,
+            )
+        else:
+            util.compile(
+                output,
+                lambda: iter_graphviz(git_objs, refs, hide_content),
+                cancel,
+                render_cache,
+            )
 
 
 def _mainloop(
     git_root: Path,
-    dot_file: Path,
     pdf_file: Path,
     pdf_viewer: str,
     operating_system: util.OS,
     hide_content: bool,
+    object_store: git.ObjectStore,
+    reduction: reduce.Reduction,
+    renderer: util.Renderer = util.Renderer.DOT,
+    reuse_layout: bool = True,
+    profile_output: Optional[str] = None,
+    server: Optional[serve.LiveServer] = None,
 ) -> None:
     """Create and open a PDF file that is continually refreshed as changes
-    occurr in the Git repo.
+    occurr in the Git repo. If a server is given, every render is instead
+    published to it as SVG.
     """
-    state_cache = git.state(git_root)
-    _render(dot_file, pdf_file, git_root, hide_content)
-    util.view(pdf_file, pdf_viewer, operating_system.shell_setting)
-
-    while True:
-        time.sleep(1)
-        state_out = git.state(git_root)
-        if state_cache != state_out:
-            state_cache = state_out
-            _render(dot_file, pdf_file, git_root, hide_content)
+    fingerprinter = git.Fingerprinter(git_root)
+    state_cache = fingerprinter.state()
+    # the state also changes for things that do not alter the graph, such as
+    # config edits, and going back and forth between states is common
+    render_cache = util.RenderCache()
+    layout_cache = (
+        layoutcache.LayoutCache()
+        if reuse_layout and renderer == util.Renderer.DOT
+        else None
+    )
+
+    def render_newest(cancel: Optional[threading.Event]) -> None:
+        with _profiled(profile_output):
+            _render(
+                pdf_file,
+                git_root,
+                hide_content,
+                object_store,
+                reduction,
+                cancel,
+                render_cache,
+                renderer,
+                layout_cache,
+            )
+        if server is not None:
+            server.publish(pdf_file.read_bytes())
+
+    render_newest(None)
+    if server is None:
+        util.view(pdf_file, pdf_viewer, operating_system.shell_setting)
+    else:
+        print(f"Serving the graph on {server.url}")
+
+    with watch.create_watcher(git_root) as watcher, render.RenderWorker(
+        render_newest
+    ) as worker:
+        while True:
+            watcher.wait()
+            state_out = fingerprinter.state()
+            if state_cache != state_out:
+                state_cache = state_out
+                worker.request()
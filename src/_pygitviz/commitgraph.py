@@ -0,0 +1,215 @@
+"""Native reader for Git's commit-graph files."""
+import mmap
+import pathlib
+from typing import Iterable, List, Optional, Tuple
+
+_SIGNATURE = b"CGPH"
+_SHA1_VERSION = 1
+_SHA_SIZE = 20
+_FANOUT_SIZE = 256 * 4
+_CHUNK_LOOKUP_ENTRY_SIZE = 12
+
+_OID_FANOUT = b"OIDF"
+_OID_LOOKUP = b"OIDL"
+_COMMIT_DATA = b"CDAT"
+_EXTRA_EDGES = b"EDGE"
+
+# a commit data entry is the tree sha, two parent positions and a generation
+# number and commit time packed into 8 bytes
+_COMMIT_DATA_SIZE = _SHA_SIZE + 16
+_NO_PARENT = 0x70000000
+_EXTRA_EDGES_NEEDED = 0x80000000
+_LAST_EDGE = 0x80000000
+
+
+class CommitGraph:
+    """The commit-graph of a repository, which stores the tree and parents of
+    commits such that they can be looked up without inflating the commits.
+
+    Both a single commit-graph file and a chain of split commit-graph files
+    are supported. The files are memory mapped and never copied into Python
+    memory as a whole, and lookups are binary searches in the sorted sha
+    tables of the files.
+
+    Use as a context manager to release the memory maps.
+    """
+
+    def __init__(self, graph_paths: List[pathlib.Path]):
+        """
+        Args:
+            graph_paths: Paths to the files of the commit-graph. For a split
+                commit-graph, the base file comes first.
+        """
+        self._layers: List[_CommitGraphFile] = []
+        try:
+            num_commits = 0
+            for graph_path in graph_paths:
+                layer = _CommitGraphFile(graph_path, num_commits)
+                self._layers.append(layer)
+                num_commits += len(layer)
+        except BaseException:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, git_root: pathlib.Path) -> Optional["CommitGraph"]:
+        """Return the commit-graph of the .git directory, or None if there is
+        no commit-graph. A split commit-graph takes precedence over a single
+        commit-graph file, just as in Git.
+        """
+        info_dir = git_root / "objects" / "info"
+        chain_file = info_dir / "commit-graphs" / "commit-graph-chain"
+        if chain_file.is_file():
+            graph_hashes = chain_file.read_text(encoding="ascii").split()
+            return cls(
+                [
+                    chain_file.parent / f"graph-{graph_hash}.graph"
+                    for graph_hash in graph_hashes
+                ]
+            )
+
+        graph_file = info_dir / "commit-graph"
+        return cls([graph_file]) if graph_file.is_file() else None
+
+    def __enter__(self) -> "CommitGraph":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for layer in self._layers:
+            layer.close()
+
+    def __len__(self) -> int:
+        return sum(len(layer) for layer in self._layers)
+
+    def __contains__(self, sha: str) -> bool:
+        raw_sha = bytes.fromhex(sha)
+        return any(layer.find(raw_sha) >= 0 for layer in self._layers)
+
+    def shas(self) -> Iterable[str]:
+        """Return the shas of all commits in the commit-graph."""
+        return (
+            layer.sha_at(position).hex()
+            for layer in self._layers
+            for position in range(len(layer))
+        )
+
+    def lookup(self, sha: str) -> Optional[Tuple[str, List[str]]]:
+        """Return the sha of the tree and the shas of the parents of the
+        commit, or None if the commit is not in the commit-graph.
+        """
+        raw_sha = bytes.fromhex(sha)
+        # newer layers are the most likely to contain recent commits
+        for layer in reversed(self._layers):
+            position = layer.find(raw_sha)
+            if position >= 0:
+                tree_sha, parent_positions = layer.commit_data(position)
+                return tree_sha, [self._sha_at(pos) for pos in parent_positions]
+        return None
+
+    def _sha_at(self, global_position: int) -> str:
+        """Return the sha at a position that counts commits in all layers,
+        which is how parents are referenced.
+        """
+        for layer in self._layers:
+            if global_position < layer.base_position + len(layer):
+                return layer.sha_at(global_position - layer.base_position).hex()
+        raise RuntimeError(f"commit-graph position {global_position} out of range")
+
+
+class _CommitGraphFile:
+    """A single commit-graph file, which is one layer of a split chain."""
+
+    def __init__(self, graph_path: pathlib.Path, base_position: int):
+        """
+        Args:
+            graph_path: Path to the commit-graph file.
+            base_position: The amount of commits in the layers below this one.
+        """
+        self.base_position = base_position
+        with open(graph_path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data = self._data
+        if data[:4] != _SIGNATURE or data[5] != _SHA1_VERSION:
+            self.close()
+            raise RuntimeError(f"unsupported commit-graph file: {graph_path}")
+
+        chunks = dict(self._chunk_offsets(data[6]))
+        try:
+            self._fanout_start = chunks[_OID_FANOUT]
+            self._shas_start = chunks[_OID_LOOKUP]
+            self._commit_data_start = chunks[_COMMIT_DATA]
+        except KeyError as exc:
+            self.close()
+            raise RuntimeError(f"commit-graph {graph_path} lacks chunk {exc}")
+        self._extra_edges_start = chunks.get(_EXTRA_EDGES, -1)
+        self._num_commits = self._fanout(255)
+
+    def _chunk_offsets(self, num_chunks: int) -> Iterable[Tuple[bytes, int]]:
+        for i in range(num_chunks):
+            start = 8 + i * _CHUNK_LOOKUP_ENTRY_SIZE
+            chunk_id = self._data[start : start + 4]
+            offset = int.from_bytes(self._data[start + 4 : start + 12], "big")
+            yield chunk_id, offset
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __len__(self) -> int:
+        return self._num_commits
+
+    def find(self, raw_sha: bytes) -> int:
+        """Return the position of the sha in this file, or -1 if it's not
+        present.
+        """
+        first_byte = raw_sha[0]
+        lo = self._fanout(first_byte - 1) if first_byte else 0
+        hi = self._fanout(first_byte)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = self.sha_at(mid)
+            if candidate < raw_sha:
+                lo = mid + 1
+            elif candidate > raw_sha:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def sha_at(self, position: int) -> bytes:
+        start = self._shas_start + position * _SHA_SIZE
+        return self._data[start : start + _SHA_SIZE]
+
+    def commit_data(self, position: int) -> Tuple[str, List[int]]:
+        """Return the tree sha and the global parent positions of the commit at
+        the position.
+        """
+        start = self._commit_data_start + position * _COMMIT_DATA_SIZE
+        tree_sha = self._data[start : start + _SHA_SIZE].hex()
+        first_parent = self._uint32(start + _SHA_SIZE)
+        second_parent = self._uint32(start + _SHA_SIZE + 4)
+
+        parents = []
+        if first_parent != _NO_PARENT:
+            parents.append(first_parent)
+        if second_parent & _EXTRA_EDGES_NEEDED:
+            # octopus merge, the second and later parents are in a list
+            edge = self._extra_edges_start + (second_parent & ~_EXTRA_EDGES_NEEDED) * 4
+            while True:
+                parent = self._uint32(edge)
+                parents.append(parent & ~_LAST_EDGE)
+                if parent & _LAST_EDGE:
+                    break
+                edge += 4
+        elif second_parent != _NO_PARENT:
+            parents.append(second_parent)
+        return tree_sha, parents
+
+    def _fanout(self, first_byte: int) -> int:
+        return self._uint32(self._fanout_start + first_byte * 4)
+
+    def _uint32(self, start: int) -> int:
+        return int.from_bytes(self._data[start : start + 4], "big")
@@ -2,15 +2,19 @@
 import dataclasses
 import pathlib
 import enum
-import tempfile
-import subprocess
-import itertools
-from typing import List, Dict, Optional, Dict, Iterable
+import os
+import stat
+import zlib
+from typing import List, Dict, Optional, Iterable, Set, Tuple
 
 
 from _pygitviz import util
+from _pygitviz import cache
+from _pygitviz import commitgraph
 from _pygitviz import gitobject
-from _pygitviz.gitobject import Type, GitObject
+from _pygitviz import pack
+from _pygitviz import profile
+from _pygitviz.gitobject import Type
 
 
 @dataclasses.dataclass(frozen=True, order=True)
@@ -25,168 +29,700 @@ class CatFileOption(enum.Enum):
     PRETTY = "-p"
 
 
-def collect_objects(git_root: pathlib.Path) -> List[gitobject.GitObject]:
+@dataclasses.dataclass(frozen=True)
+class ObjectInfo:
+    obj_type: Type
+    size: int
+
+
+# a loose object header is "<type> <size>\0", so this covers it by a wide margin
+_LOOSE_HEADER_READ_SIZE = 64
+
+
+class ObjectBackend(enum.Enum):
+    """How object data is read from the object database."""
+
+    GIT = "git"  # batched `git cat-file` processes
+    NATIVE = "native"  # in-process loose object and packfile readers
+
+
+# the types that are shown when trees and blobs are hidden
+_HISTORY_TYPES = (Type.COMMIT, Type.TAG)
+
+
+@dataclasses.dataclass(frozen=True)
+class HistoryWindow:
+    """A window of history to collect. Only the commits in the window are
+    expanded, and their parents outside of the window are truncated.
+
+    Attributes:
+        max_commits: The maximum amount of commits to collect per ref,
+            walking breadth first over parents from the commit it points to.
+        revision_range: A revision range as understood by `git rev-list`,
+            e.g. `main~10..main`. If given, only commits in the range are
+            collected instead of commits from all refs.
+    """
+
+    max_commits: Optional[int] = None
+    revision_range: Optional[str] = None
+
+
+def collect_objects(
+    git_root: pathlib.Path,
+    backend: ObjectBackend = ObjectBackend.NATIVE,
+    object_cache: Optional[cache.ObjectCache] = None,
+    reachable_only: bool = False,
+    window: Optional[HistoryWindow] = None,
+    hide_content: bool = False,
+) -> List[gitobject.GitObject]:
     """Return all Git objects in the .git/objects directory, or an empty list
     if the directory does not exist.
+
+    Args:
+        git_root: The .git directory.
+        backend: The backend to read object data with.
+        object_cache: An on-disk cache of parsed objects to consult before
+            reading objects from the object database.
+        reachable_only: If True, only return objects that are reachable from
+            refs, HEAD and the stash. Dangling objects are then left out.
+        window: If given, only return the commits in the window along with
+            their content, and truncated stubs for their parents outside of
+            it.
+        hide_content: If True, only return commits and tags. Trees and blobs
+            are then never read.
     """
-    if not (git_root / "objects").is_dir():
+    return ObjectStore(
+        git_root, backend, object_cache, reachable_only, window, hide_content
+    ).update()
+
+
+class ObjectStore:
+    """An in-memory store of the linked Git objects of a repository, meant to
+    live for a whole session.
+
+    Git objects are immutable, so each call to :py:meth:`update` only reads
+    and links objects that have appeared since the last call, and drops
+    objects that have disappeared (e.g. after gc or prune). The cost of an
+    update is proportional to the change, not to the size of the repository.
+
+    If the store is reachable only, objects are instead discovered by walking
+    from the refs, such that objects that are not reachable are never read.
+    With a history window, the walk starts from the commits in the window
+    and never crosses its boundary. If content is hidden, only commits and
+    tags are read, and commits are not linked to their trees.
+    """
+
+    def __init__(
+        self,
+        git_root: pathlib.Path,
+        backend: ObjectBackend = ObjectBackend.NATIVE,
+        object_cache: Optional[cache.ObjectCache] = None,
+        reachable_only: bool = False,
+        window: Optional[HistoryWindow] = None,
+        hide_content: bool = False,
+    ):
+        """
+        Args:
+            git_root: The .git directory.
+            backend: The backend to read object data with.
+            object_cache: An on-disk cache of parsed objects to consult before
+                reading objects from the object database.
+            reachable_only: If True, only store objects that are reachable
+                from refs, HEAD and the stash.
+            window: If given, only store the commits in the window, their
+                content and truncated stubs for their parents outside of it.
+            hide_content: If True, only store commits and tags.
+        """
+        self._git_root = git_root
+        self._backend = backend
+        self._cache = object_cache
+        self._reachable_only = reachable_only
+        self._window = window
+        self._hide_content = hide_content
+        self._objects: Dict[str, gitobject.GitObject] = {}
+        # trees and blobs that are known, but not stored as content is hidden
+        self._hidden_shas: Set[str] = set()
+        # the window moves as history grows, which turns full commits into
+        # stubs and vice versa, so windowed objects are relinked on each
+        # update from parsed objects that are kept for the whole session
+        self._parsed: Dict[str, cache.ParsedObject] = {}
+
+    @property
+    def window(self) -> Optional[HistoryWindow]:
+        return self._window
+
+    def update(self) -> List[gitobject.GitObject]:
+        """Synchronize the store with the object database, and return all Git
+        objects in it. Return an empty list if the objects directory does not
+        exist.
+        """
+        if not (self._git_root / "objects").is_dir():
+            self._objects.clear()
+            return []
+
+        with _open_object_database(self._git_root, self._backend) as odb:
+            if self._window:
+                self._objects = self._collect_window(odb)
+                return list(self._objects.values())
+
+            if self._reachable_only:
+                current_shas, parsed = self._walk(odb)
+            else:
+                with profile.phase("enumerate_objects"):
+                    current_shas = odb.object_shas()
+                self._hidden_shas.intersection_update(current_shas)
+                new_shas = [
+                    sha
+                    for sha in current_shas
+                    if sha not in self._objects and sha not in self._hidden_shas
+                ]
+                parsed = self._parse(new_shas, odb)
+
+            removed_shas = self._objects.keys() - current_shas
+            if removed_shas:
+                self._remove(removed_shas)
+            if parsed:
+                self._add(parsed)
+
+        return list(self._objects.values())
+
+    def _walk(self, odb) -> Tuple[Dict[str, None], Dict[str, cache.ParsedObject]]:
+        """Walk the objects that are reachable from the roots, one frontier at
+        a time such that each frontier is read in a single batch. Objects
+        already in the store are walked in memory.
+
+        Returns:
+            The shas of all reachable objects, as an insertion ordered set,
+            and the parsed objects that were not already in the store.
+        """
+        reachable: Dict[str, None] = {}
+        parsed: Dict[str, cache.ParsedObject] = {}
+        frontier = list(dict.fromkeys(reachable_root_shas(self._git_root)))
+        while frontier:
+            parsed.update(
+                self._parse([sha for sha in frontier if sha not in self._objects], odb)
+            )
+            reachable.update(dict.fromkeys(frontier))
+
+            next_frontier: Dict[str, None] = {}
+            for sha in frontier:
+                if sha in self._objects:
+                    obj = self._objects[sha]
+                    referenced = [child.sha for child in obj.children]
+                    referenced.extend(parent.sha for parent in obj.parents)
+                elif sha in parsed:
+                    referenced = list(self._children_to_walk(parsed[sha]))
+                    referenced.extend(parsed[sha].parents)
+                else:
+                    continue  # a hidden tree or blob
+                next_frontier.update(
+                    (ref_sha, None)
+                    for ref_sha in referenced
+                    if ref_sha not in reachable
+                )
+            frontier = list(next_frontier)
+
+        return reachable, parsed
+
+    def _collect_window(self, odb) -> Dict[str, gitobject.GitObject]:
+        with profile.phase("window_commits"):
+            if self._window.revision_range:
+                window_shas = window_commit_shas(self._git_root, self._window)
+            else:
+                window_shas = self._newest_commit_shas(odb)
+
+        reachable: Dict[str, None] = {}
+        boundary: Dict[str, None] = {}
+        frontier = list(window_shas)
+        while frontier:
+            self._parsed.update(
+                self._parse([sha for sha in frontier if sha not in self._parsed], odb)
+            )
+            reachable.update(dict.fromkeys(frontier))
+
+            next_frontier: Dict[str, None] = {}
+            for sha in frontier:
+                parsed = self._parsed[sha]
+                next_frontier.update(
+                    (child_sha, None)
+                    for child_sha in self._children_to_walk(parsed)
+                    if child_sha not in reachable
+                )
+                boundary.update(
+                    (parent_sha, None)
+                    for parent_sha in parsed.parents
+                    if parent_sha not in window_shas
+                )
+            frontier = list(next_frontier)
+
+        objects = {
+            sha: gitobject.GitObject(sha=sha, obj_type=self._parsed[sha].obj_type)
+            for sha in reachable
+        }
+        objects.update(
+            (sha, gitobject.GitObject(sha=sha, obj_type=Type.COMMIT, truncated=True))
+            for sha in boundary
+        )
+        with profile.phase("link_objects"):
+            for sha in reachable:
+                _link(objects[sha], self._parsed[sha], objects, not self._hide_content)
+        return objects
+
+    def _newest_commit_shas(self, odb) -> Dict[str, None]:
+        """Return the shas of up to the maximum amount of commits of the window
+        per root, nearest to the root first, as an insertion ordered set.
+
+        All roots are walked together in memory, one frontier at a time such
+        that each frontier is parsed in a single batch. Roots that are not
+        commits, such as tags of trees, are skipped.
+        """
+        max_commits = self._window.max_commits or float("inf")
+        roots = list(
+            dict.fromkeys(reachable_root_shas(self._git_root, peeled_only=True))
+        )
+        reached: List[Dict[str, None]] = [{} for _ in roots]
+        frontiers = [[root] for root in roots]
+        while any(frontiers):
+            unparsed = dict.fromkeys(
+                sha
+                for frontier in frontiers
+                for sha in frontier
+                if sha not in self._parsed
+            )
+            self._parsed.update(self._parse(list(unparsed), odb))
+
+            for root_reached, frontier in zip(reached, frontiers):
+                next_frontier = []
+                for sha in frontier:
+                    if len(root_reached) >= max_commits:
+                        break
+                    parsed = self._parsed.get(sha)
+                    if parsed and parsed.obj_type == Type.COMMIT:
+                        if sha not in root_reached:
+                            root_reached[sha] = None
+                            next_frontier.extend(parsed.parents)
+                frontier[:] = next_frontier if len(root_reached) < max_commits else []
+
+        window_shas: Dict[str, None] = {}
+        for root_reached in reached:
+            window_shas.update(root_reached)
+        return window_shas
+
+    def _children_to_walk(self, parsed: cache.ParsedObject) -> Iterable[str]:
+        if self._hide_content:
+            return ()
+        return (child_sha for _, child_sha in parsed.children)
+
+    def _parse(self, shas: List[str], odb) -> Dict[str, cache.ParsedObject]:
+        """Return the parsed objects, from the cache if possible. If content is
+        hidden, trees and blobs are only typed, and left out of the result.
+        """
+        with profile.phase("parse_objects"):
+            parsed = self._cache.get_many(shas) if self._cache else {}
+            misses = [sha for sha in shas if sha not in parsed]
+            if misses:
+                parsed_misses = _parse_from_commit_graph(misses, odb.commit_graph)
+                if parsed_misses:
+                    from_graph = {obj.sha for obj in parsed_misses}
+                    misses = [sha for sha in misses if sha not in from_graph]
+
+                types = odb.object_types(misses)
+                if self._hide_content:
+                    types = {
+                        sha: obj_type
+                        for sha, obj_type in types.items()
+                        if obj_type in _HISTORY_TYPES
+                    }
+                parsed_misses.extend(_parse_objects(types, odb))
+                parsed.update((obj.sha, obj) for obj in parsed_misses)
+                if self._cache:
+                    self._cache.put_many(parsed_misses)
+
+            if self._hide_content:
+                parsed = {
+                    sha: obj
+                    for sha, obj in parsed.items()
+                    if obj.obj_type in _HISTORY_TYPES
+                }
+                self._hidden_shas.update(sha for sha in shas if sha not in parsed)
+            return parsed
+
+    def _add(self, parsed: Dict[str, cache.ParsedObject]) -> None:
+        self._objects.update(
+            (sha, gitobject.GitObject(sha=sha, obj_type=parsed_obj.obj_type))
+            for sha, parsed_obj in parsed.items()
+        )
+        with profile.phase("link_objects"):
+            for sha, parsed_obj in parsed.items():
+                _link(
+                    self._objects[sha],
+                    parsed_obj,
+                    self._objects,
+                    not self._hide_content,
+                )
+
+    def _remove(self, shas: Set[str]) -> None:
+        removed = [self._objects.pop(sha) for sha in shas]
+        # objects are normally only removed together with everything that
+        # references them, so this is rarely needed
+        for obj in self._objects.values():
+            if any(child.sha in shas for child in obj.children) or any(
+                parent.sha in shas for parent in obj.parents
+            ):
+                obj.unlink(removed)
+
+
+def window_commit_shas(
+    git_root: pathlib.Path, window: HistoryWindow
+) -> Dict[str, None]:
+    """Return the shas of the commits in the revision range of the window, as
+    an insertion ordered set. `git rev-list` stops walking at the boundary of
+    the window, so the cost is proportional to the size of the window and not
+    to the size of the history.
+    """
+    max_count = (
+        [f"--max-count={window.max_commits}"] if window.max_commits is not None else []
+    )
+    return dict.fromkeys(
+        _rev_list(git_root, *max_count, *window.revision_range.split())
+    )
+
+
+def replay_commit_shas(git_root: pathlib.Path, revision_range: str) -> List[str]:
+    """Return the shas of the commits in the revision range, ordered such that
+    every commit comes after its parents.
+    """
+    return _rev_list(git_root, "--topo-order", "--reverse", *revision_range.split())
+
+
+def _rev_list(git_root: pathlib.Path, *args: str) -> List[str]:
+    rc, stdout, stderr = util.captured_run("git", "rev-list", *args, "--", cwd=git_root)
+    if rc != 0:
+        raise RuntimeError(stderr.strip())
+    return stdout.split()
+
+
+def _detached_head_sha(git_root: pathlib.Path) -> Optional[str]:
+    head_file = git_root / "HEAD"
+    if not head_file.exists():
+        return None
+    head_content = head_file.read_text(encoding=util.ENCODING).strip()
+    return head_content if len(head_content) == 40 and _is_hex(head_content) else None
+
+
+def reachable_root_shas(git_root: pathlib.Path, peeled_only: bool = False) -> List[str]:
+    """Return the full shas of the objects that refs, a detached HEAD and the
+    stash point to. For annotated tags, both the tag object and the tagged
+    object are included, or only the tagged object if peeled_only is True.
+    """
+    shas = []
+    for _, sha, _, peeled_sha in _get_raw_refs(git_root):
+        if not (peeled_only and peeled_sha):
+            shas.append(sha)
+        if peeled_sha:
+            shas.append(peeled_sha)
+
+    head_sha = _detached_head_sha(git_root)
+    if head_sha:
+        shas.append(head_sha)
+    return shas
+
+
+def _parse_from_commit_graph(
+    shas: List[str], commit_graph: Optional[commitgraph.CommitGraph]
+) -> List[cache.ParsedObject]:
+    """Return the parsed commits among the shas that are in the commit-graph,
+    which requires neither typing nor inflating them.
+    """
+    if not commit_graph:
         return []
+    if len(shas) > len(commit_graph):
+        # cheaper than a failed lookup for every tree and blob
+        graph_shas = set(commit_graph.shas())
+        shas = [sha for sha in shas if sha in graph_shas]
+
+    parsed = []
+    for sha in shas:
+        commit_data = commit_graph.lookup(sha)
+        if commit_data:
+            tree_sha, parent_shas = commit_data
+            parsed.append(
+                cache.ParsedObject(
+                    sha,
+                    Type.COMMIT,
+                    children=(("", tree_sha),),
+                    parents=tuple(parent_shas),
+                )
+            )
+    return parsed
+
+
+def _parse_objects(types: Dict[str, Type], odb) -> List[cache.ParsedObject]:
+    """Read the objects of the provided types from the object database and
+    parse their references to other objects.
+    """
+    contents = odb.read_contents(
+        [sha for sha, obj_type in types.items() if obj_type in (Type.TREE, Type.COMMIT)]
+    )
 
-    git_objects = _collect_loose_git_objects(git_root)
-    packed_git_objects = _collect_packed_git_objects(git_root)
+    parsed = []
+    for sha, obj_type in types.items():
+        if obj_type == Type.TREE:
+            children = tuple(parse_tree(contents[sha]))
+            parsed.append(cache.ParsedObject(sha, obj_type, children=children))
+        elif obj_type == Type.COMMIT:
+            tree_sha, parent_shas = parse_commit(contents[sha])
+            parsed.append(
+                cache.ParsedObject(
+                    sha,
+                    obj_type,
+                    children=(("", tree_sha),),
+                    parents=tuple(parent_shas),
+                )
+            )
+        else:
+            parsed.append(cache.ParsedObject(sha, obj_type))
+    return parsed
+
+
+def _link(
+    obj: gitobject.GitObject,
+    parsed: cache.ParsedObject,
+    git_objects: Dict[str, gitobject.GitObject],
+    with_children: bool = True,
+) -> None:
+    """Add the children and parents of the parsed object to the GitObject.
+    For a commit, the only child is the top-level tree.
+    """
+    if with_children:
+        for name, sha in parsed.children:
+            obj.add_child(name, git_objects[sha])
+    for sha in parsed.parents:
+        obj.add_parent(git_objects[sha])
 
-    git_objects.update(packed_git_objects)
-    _link_related_git_objects(git_objects, git_root)
 
-    return list(git_objects.values())
+def _open_object_database(git_root: pathlib.Path, backend: ObjectBackend):
+    if backend == ObjectBackend.GIT:
+        return _GitObjectDatabase(git_root)
+    return _NativeObjectDatabase(git_root)
 
 
-def _collect_loose_git_objects(
-    git_root: pathlib.Path,
-) -> Dict[str, gitobject.GitObject]:
+def _loose_object_shas(git_root: pathlib.Path) -> List[str]:
     objects_root = git_root / "objects"
-
     object_dirs = (d for d in objects_root.iterdir() if len(d.name) == 2 and d.is_dir())
-    object_shas = (d.name + file.name for d in object_dirs for file in d.iterdir())
+    return [
+        d.name + file.name
+        for d in object_dirs
+        for file in d.iterdir()
+        if len(file.name) == 38 and _is_hex(file.name)
+    ]
 
-    git_objects = {sha: _create_git_object(sha, git_root) for sha in object_shas}
 
-    return git_objects
+def _pack_files(git_root: pathlib.Path) -> List[pathlib.Path]:
+    pack_dir = git_root / "objects" / "pack"
+    return [
+        pack_file
+        for pack_file in sorted(pack_dir.glob("*.pack"))
+        # a pack without an index is still being written
+        if pack_file.with_suffix(".idx").is_file()
+    ]
 
 
-def _create_git_object(sha, git_root):
-    obj_type = Type(cat_file(sha, git_root, CatFileOption.TYPE))
-    return gitobject.GitObject(sha=sha, obj_type=obj_type)
+class _GitObjectDatabase:
+    """Reads object data through batched `git cat-file` processes."""
 
+    def __init__(self, git_root: pathlib.Path):
+        self._git_root = git_root
+        self.commit_graph = commitgraph.CommitGraph.open(git_root)
 
-def _link_related_git_objects(git_objects, git_root):
-    for obj in git_objects.values():
-        if obj.obj_type == Type.TREE:
-            _add_children(obj, git_objects, git_root)
-        elif obj.obj_type == Type.COMMIT:
-            _add_parents_and_tree(obj, git_objects, git_root)
+    def __enter__(self) -> "_GitObjectDatabase":
+        return self
 
+    def __exit__(self, *args) -> None:
+        if self.commit_graph:
+            self.commit_graph.close()
 
-def _collect_packed_git_objects(
-    git_root: pathlib.Path,
-) -> Dict[str, gitobject.GitObject]:
-    objects_root = git_root / "objects"
+    def object_shas(self) -> Dict[str, None]:
+        """Return the shas of all objects, as an insertion ordered set."""
+        shas = dict.fromkeys(_loose_object_shas(self._git_root))
+        for pack_file in _pack_files(self._git_root):
+            with pack.PackIndex(pack_file.with_suffix(".idx")) as index:
+                shas.update(dict.fromkeys(index.shas()))
+        return shas
 
-    pack_dir = objects_root / "pack"
-    pack_files = list(pack_dir.glob("*.pack"))
-    if not pack_files:
-        return {}
+    def object_types(self, shas: List[str]) -> Dict[str, Type]:
+        infos = batch_check(shas, self._git_root)
+        return {sha: info.obj_type for sha, info in infos.items()}
 
-    with tempfile.TemporaryDirectory() as cache_dir:
-        util.captured_run("git", "init", cwd=cache_dir)
-        _unpack_pack_files_to(pack_files, cache_dir)
-        git_objects = _collect_loose_git_objects(pathlib.Path(cache_dir) / ".git")
+    def read_contents(self, shas: List[str]) -> Dict[str, bytes]:
+        return batch_read(shas, self._git_root)
 
-    return git_objects
 
+class _NativeObjectDatabase:
+    """Reads object data in-process, without spawning any `git` processes."""
 
-def _unpack_pack_files_to(pack_files, target_dir):
-    for pack_file in pack_files:
-        proc = subprocess.Popen(
-            ["git", "unpack-objects"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.STDOUT,
-            cwd=target_dir,
-        )
-        proc.communicate(pack_file.read_bytes())
+    def __init__(self, git_root: pathlib.Path):
+        self._git_root = git_root
+        self._loose_shas = dict.fromkeys(_loose_object_shas(git_root))
+        self._packs = [pack.PackFile(pack_file) for pack_file in _pack_files(git_root)]
+        self.commit_graph = commitgraph.CommitGraph.open(git_root)
 
+    def __enter__(self) -> "_NativeObjectDatabase":
+        return self
 
-def _get_remote_tracking_branch(
-    git_root: pathlib.Path, branch_name: str
-) -> Optional[str]:
-    returncode, stdout, _ = util.captured_run(
-        "git",
-        "rev-parse",
-        "--abbrev-ref",
-        "--symbolic-full-name",
-        f"{branch_name}@{{upstream}}",
-        cwd=git_root,
-    )
+    def __exit__(self, *args) -> None:
+        for packfile in self._packs:
+            packfile.close()
+        if self.commit_graph:
+            self.commit_graph.close()
 
-    if returncode != 0:
-        return None
+    def object_shas(self) -> Dict[str, None]:
+        """Return the shas of all objects, as an insertion ordered set."""
+        shas = dict(self._loose_shas)
+        for packfile in self._packs:
+            shas.update(dict.fromkeys(packfile.index.shas()))
+        return shas
 
-    return stdout.strip()
+    def object_types(self, shas: List[str]) -> Dict[str, Type]:
+        return {sha: self.object_type(sha) for sha in shas}
+
+    def object_type(self, sha: str) -> Type:
+        if sha in self._loose_shas:
+            return read_loose_object_info(self._git_root, sha).obj_type
+
+        for packfile in self._packs:
+            try:
+                return packfile.object_type(packfile.index.offset(sha))
+            except KeyError:
+                pass
+
+        raise RuntimeError(f"fatal: Not a valid object name {sha}")
+
+    def read_contents(self, shas: List[str]) -> Dict[str, bytes]:
+        return {sha: self.read(sha)[1] for sha in shas}
+
+    def read(self, sha: str) -> Tuple[Type, bytes]:
+        if sha in self._loose_shas:
+            return read_loose_object(self._git_root, sha)
 
+        for packfile in self._packs:
+            try:
+                return packfile.read(sha)
+            except KeyError:
+                pass
 
-def collect_refs(
-    git_root: pathlib.Path, annotated_tags: Optional[List[GitObject]] = None
-) -> List[Ref]:
+        raise RuntimeError(f"fatal: Not a valid object name {sha}")
+
+
+def _loose_object_path(git_root: pathlib.Path, sha: str) -> pathlib.Path:
+    return git_root / "objects" / sha[:2] / sha[2:]
+
+
+def read_loose_object_info(git_root: pathlib.Path, sha: str) -> ObjectInfo:
+    """Return the type and size of a loose object. Only the object header is
+    inflated.
+    """
+    decompressor = zlib.decompressobj()
+    header = b""
+    with open(_loose_object_path(git_root, sha), "rb") as f:
+        while b"\0" not in header:
+            chunk = f.read(_LOOSE_HEADER_READ_SIZE)
+            if not chunk:
+                raise RuntimeError(f"corrupt loose object {sha}")
+            header += decompressor.decompress(
+                decompressor.unconsumed_tail + chunk, _LOOSE_HEADER_READ_SIZE
+            )
+
+    return _parse_loose_header(header[: header.index(b"\0")], sha)
+
+
+def read_loose_object(git_root: pathlib.Path, sha: str) -> Tuple[Type, bytes]:
+    """Return the type and content of a loose object."""
+    raw = zlib.decompress(_loose_object_path(git_root, sha).read_bytes())
+    header_end = raw.index(b"\0")
+    info = _parse_loose_header(raw[:header_end], sha)
+    return info.obj_type, raw[header_end + 1 :]
+
+
+def _parse_loose_header(header: bytes, sha: str) -> ObjectInfo:
+    try:
+        obj_type, size = header.decode(util.ENCODING).split()
+        return ObjectInfo(Type(obj_type), int(size))
+    except ValueError:
+        raise RuntimeError(f"corrupt loose object {sha}")
+
+
+_REF_NAMESPACES = ("refs/heads/", "refs/remotes/", "refs/tags/")
+_STASH_REF = "refs/stash"
+
+
+def collect_refs(git_root: pathlib.Path) -> List[Ref]:
     """Return concrete refs, remote refs and the HEAD symbolic ref. Return
-    nothing if there are no concrete or remote refs.
+    nothing if there are no concrete or remote refs. Annotated tags are
+    peeled, such that the ref points to the tagged object.
+
+    Names, values, upstreams and peeled tags of all refs are collected with a
+    single `git for-each-ref`.
     """
-    annotated_tags = annotated_tags or []
     if not git_root.is_dir():
         return []
 
-    short_sha_to_annotated_tag = {tag.short_sha: tag for tag in annotated_tags}
+    raw_refs = _get_raw_refs(git_root)
+    ref_names = {_short_ref_name(refname) for refname, *_ in raw_refs}
 
-    def resolve_tag_ref(ref: Ref) -> Ref:
-        if ref.value not in short_sha_to_annotated_tag:
-            return ref
+    refs = []
+    for namespace in _REF_NAMESPACES:
+        for refname, sha, upstream, peeled_sha in raw_refs:
+            name = _short_ref_name(refname)
+            if not refname.startswith(namespace) or name.endswith("/HEAD"):
+                continue  # currently ignore remote HEAD refs
 
-        tag_sha = _parse_annotated_tag_sha(
-            short_sha_to_annotated_tag[ref.value], git_root
-        )
-        return Ref(ref.name, tag_sha)
-
-    refs = [
-        resolve_tag_ref(ref)
-        for ref in itertools.chain(
-            _get_refs(git_root, refs_dir="refs/heads"),
-            _get_refs(git_root, refs_dir="refs/remotes"),
-            _get_refs(git_root, refs_dir="refs/tags"),
-        )
-        if not ref.name.endswith("/HEAD")  # currently ignore remote HEAD refs
-    ]
+            # an upstream may be configured without existing
+            remote_tracking_branch = upstream if upstream in ref_names else None
+            refs.append(
+                Ref(name, util.short_sha(peeled_sha or sha), remote_tracking_branch)
+            )
 
     head_file = git_root / "HEAD"
     if head_file.exists() and refs:  # only add HEAD if there are concrete refs
         head_value = _parse_head_value(head_file)
         refs.append(Ref("HEAD", head_value))
 
-    stash_refs = list(_get_raw_refs(git_root, refs_dir="refs/stash"))
-    if stash_refs:
-        stash_top, *_ = stash_refs
-        refs.append(Ref(r"stash@{0}", util.short_sha(stash_top.strip())))
+    stash_shas = [sha for refname, sha, *_ in raw_refs if refname == _STASH_REF]
+    if stash_shas:
+        stash_top, *_ = stash_shas
+        refs.append(Ref(r"stash@{0}", util.short_sha(stash_top)))
 
     return refs
 
 
-def _get_refs(git_root, refs_dir) -> Iterable[Ref]:
-    def _line_to_ref(line):
-        name, sha = line.strip().split()
-        remote_tracking_branch = _get_remote_tracking_branch(git_root, name)
-        return Ref(name, util.short_sha(sha), remote_tracking_branch)
-
-    return (_line_to_ref(line) for line in _get_raw_refs(git_root, refs_dir))
-
-
-def _get_raw_refs(git_root, refs_dir) -> Iterable[str]:
+def _get_raw_refs(git_root: pathlib.Path) -> List[Tuple[str, str, str, str]]:
+    """Return (refname, sha, upstream, peeled sha) for all refs. The upstream
+    and peeled sha are empty if there is no upstream, or if the ref does not
+    point to an annotated tag.
+    """
     _, stdout, _ = util.captured_run(
         "git",
         "for-each-ref",
-        refs_dir,
         "--format",
-        r"%(refname:lstrip=2) %(objectname)",
+        "%(refname) %(objectname) %(upstream:short) %(*objectname)",
+        *_REF_NAMESPACES,
+        _STASH_REF,
         cwd=git_root,
     )
-    return (line for line in stdout.strip().split("\n") if line)
+    return [tuple(line.split(" ")) for line in stdout.split("\n") if line]
+
+
+def _short_ref_name(refname: str) -> str:
+    # need to account for slashes in the branch name
+    return "/".join(refname.split("/")[2:]) or refname
 
 
 def _parse_head_value(head_file: pathlib.Path) -> str:
     content = head_file.read_text(encoding=util.ENCODING).split()
 
     if len(content) > 1:
-        refname = content[-1]
-        # need to account for slashes in the branch name
-        return "/".join(refname.split("/")[2:])
+        return _short_ref_name(content[-1])
     else:
         return util.short_sha(content[-1])
 
@@ -194,6 +730,9 @@ def _parse_head_value(head_file: pathlib.Path) -> str:
 def state(git_root):
     """Return a hash of the current state of the .git directory. Only considers
     fsck verbose output and refs.
+
+    This hashes every object in the repository, see :py:class:`Fingerprinter`
+    for a cheap alternative suitable for frequent polling.
     """
     if not git_root.is_dir():
         return 0
@@ -203,6 +742,90 @@ def state(git_root):
     return hash(stdout + stderr + refs + config)
 
 
+class Fingerprinter:
+    """Cheap change detection for a .git directory, based purely on
+    filesystem metadata (mtime, size and inode).
+
+    The fingerprint covers HEAD, packed-refs, config, every file under refs/,
+    the pack directory and the loose object fan-out directories. Loose
+    objects are immutable and only ever added or removed, which always
+    changes the stat data of their fan-out directory, so the objects
+    themselves never need to be looked at. Directory listings are cached
+    and only re-read when the stat data of the directory changes.
+    """
+
+    _FILES = ("HEAD", "packed-refs", "config")
+
+    def __init__(self, git_root: pathlib.Path):
+        """
+        Args:
+            git_root: The .git directory.
+        """
+        self._git_root = git_root
+        self._listings: Dict[pathlib.Path, Tuple[Optional[tuple], List[str]]] = {}
+
+    def state(self) -> int:
+        """Return a hash of the current state of the .git directory. The hash
+        changes whenever the refs, config or object database change.
+        """
+        if not self._git_root.is_dir():
+            return 0
+
+        stats = [_stat_signature(self._git_root / name) for name in self._FILES]
+        self._collect_tree_stats(self._git_root / "refs", stats)
+
+        objects_root = self._git_root / "objects"
+        fanout_dirs = [
+            name
+            for name in self._listdir(objects_root, stats)
+            if len(name) == 2 and _is_hex(name)
+        ]
+        stats.extend(_stat_signature(objects_root / name) for name in fanout_dirs)
+
+        pack_dir = objects_root / "pack"
+        stats.extend(
+            _stat_signature(pack_dir / name) for name in self._listdir(pack_dir, stats)
+        )
+
+        return hash(tuple(stats))
+
+    def _collect_tree_stats(self, directory: pathlib.Path, stats: list) -> None:
+        for name in self._listdir(directory, stats):
+            path = directory / name
+            signature = _stat_signature(path)
+            if signature is not None and signature[0]:
+                self._collect_tree_stats(path, stats)
+            else:
+                stats.append((name, signature))
+
+    def _listdir(self, directory: pathlib.Path, stats: list) -> List[str]:
+        """Return the sorted names of the entries in the directory, and add the
+        stat signature of the directory itself to stats. The listing is only
+        re-read if the directory has changed since the last call.
+        """
+        signature = _stat_signature(directory)
+        stats.append((directory.name, signature))
+
+        cached_signature, names = self._listings.get(directory, (None, []))
+        if signature is None:
+            names = []
+        elif signature != cached_signature:
+            names = sorted(entry.name for entry in os.scandir(directory))
+        self._listings[directory] = (signature, names)
+        return names
+
+
+def _stat_signature(path: pathlib.Path) -> Optional[tuple]:
+    """Return (is_dir, mtime, size, inode) of the path, or None if it does not
+    exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (stat.S_ISDIR(st.st_mode), st.st_mtime_ns, st.st_size, st.st_ino)
+
+
 def _get_local_config(git_root: pathlib.Path) -> str:
     returncode, stdout, _ = util.captured_run(
         "git",
@@ -232,34 +855,92 @@ def cat_file(sha: str, git_root: pathlib.Path, opt: CatFileOption) -> str:
     return stdout.strip()
 
 
-def _add_parents_and_tree(commit, git_objects, git_root):
-    """Add parent reference (i.e. to the parent commit) and tree reference (to
-    the top-level tree) to a commit object.
+def batch_check(shas: List[str], git_root: pathlib.Path) -> Dict[str, ObjectInfo]:
+    """Return the type and size of each of the provided objects. All objects
+    are streamed through a single `git cat-file --batch-check` process.
+    """
+    if not shas:
+        return {}
+
+    rc, stdout, stderr = util.captured_run(
+        "git",
+        "cat-file",
+        "--batch-check",
+        cwd=git_root,
+        input="\n".join(shas).encode(util.ENCODING),
+    )
+    if rc != 0:
+        raise RuntimeError(stderr.strip())
+
+    infos = {}
+    for line in stdout.splitlines():
+        sha, obj_type, *rest = line.split()
+        if obj_type == "missing":
+            raise RuntimeError(f"fatal: Not a valid object name {sha}")
+        infos[sha] = ObjectInfo(Type(obj_type), int(rest[0]))
+    return infos
+
+
+def batch_read(shas: List[str], git_root: pathlib.Path) -> Dict[str, bytes]:
+    """Return the raw content of each of the provided objects. All objects are
+    streamed through a single `git cat-file --batch` process.
+    """
+    if not shas:
+        return {}
+
+    rc, stdout, stderr = util.captured_run(
+        "git",
+        "cat-file",
+        "--batch",
+        cwd=git_root,
+        input="\n".join(shas).encode(util.ENCODING),
+        decode=False,
+    )
+    if rc != 0:
+        raise RuntimeError(stderr.strip())
+
+    contents = {}
+    pos = 0
+    while pos < len(stdout):
+        header_end = stdout.index(b"\n", pos)
+        sha, obj_type, *rest = stdout[pos:header_end].decode(util.ENCODING).split()
+        if obj_type == "missing":
+            raise RuntimeError(f"fatal: Not a valid object name {sha}")
+
+        content_start = header_end + 1
+        content_end = content_start + int(rest[0])
+        contents[sha] = stdout[content_start:content_end]
+        pos = content_end + 1  # skip the newline that terminates the content
+
+    return contents
+
+
+def parse_tree(content: bytes) -> Iterable[Tuple[str, str]]:
+    """Parse raw tree content into (name, sha) pairs, in tree order. Each entry
+    in a tree is on the form `<mode> <name>NUL<20 byte binary sha>`.
+    """
+    pos = 0
+    while pos < len(content):
+        mode_end = content.index(b" ", pos)
+        name_end = content.index(b"\0", mode_end)
+        name = content[mode_end + 1 : name_end].decode(util.ENCODING, "replace")
+        sha = content[name_end + 1 : name_end + 21].hex()
+        pos = name_end + 21
+        yield name, sha
+
+
+def parse_commit(content: bytes) -> Tuple[str, List[str]]:
+    """Parse raw commit content into the sha of its tree and the shas of its
+    parents.
     """
-    content = cat_file(commit.sha, git_root, CatFileOption.PRETTY)
-    ptr_str = content.split("\n")[0].strip()
-    ptr_obj = git_objects[ptr_str.strip().split()[1]]
-    commit.add_child("", ptr_obj)
-
-    # parents may not exist
-    for line in content.split("\n")[1:]:
-        if line.startswith("author"):
-            break
-        elif line.startswith("parent"):
-            _, parent_sha = line.strip().split()
-            commit.add_parent(git_objects[parent_sha])
-
-
-def _add_children(tree, git_objects, git_root):
-    """Add children to a tree git object."""
-    for line in cat_file(tree.sha, git_root, CatFileOption.PRETTY).split("\n"):
-        *_, sha, name = line.strip().split()
-        child = git_objects[sha]
-        tree.add_child(name, child)
-
-
-def _parse_annotated_tag_sha(tag: GitObject, git_root: pathlib.Path) -> str:
-    """Return a Ref object from the provided annotated tag."""
-    tag_content = cat_file(tag.sha, git_root, CatFileOption.PRETTY)
-    tag_sha = tag_content.split("\n")[0].strip().split()[1]
-    return util.short_sha(tag_sha)
+    tree_sha = ""
+    parent_shas = []
+    for line in content.split(b"\n"):
+        if not line:
+            break  # end of headers, the commit message follows
+        key, _, value = line.partition(b" ")
+        if key == b"tree":
+            tree_sha = value.decode(util.ENCODING)
+        elif key == b"parent":
+            parent_shas.append(value.decode(util.ENCODING))
+    return tree_sha, parent_shas
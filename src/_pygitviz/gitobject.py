@@ -1,7 +1,9 @@
 """A class that represents a Git object."""
+import collections.abc
 import enum
+import sys
 from collections import namedtuple
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
 
 from _pygitviz import util
 
@@ -9,8 +11,22 @@ from _pygitviz import util
 class Child(namedtuple("_Child", "name obj".split())):
     """A wrapper class for a GitObject that associates it with a name."""
 
+    __slots__ = ()
+
+    @property
+    def sha(self) -> str:
+        return self.obj.sha
+
+    @property
+    def short_sha(self) -> str:
+        return self.obj.short_sha
+
+    @property
+    def obj_type(self) -> "Type":
+        return self.obj.obj_type
+
     def __getattr__(self, key):
-        return self.__dict__.get(key, getattr(self.obj, key))
+        return getattr(self.obj, key)
 
 
 class Type(enum.Enum):
@@ -22,28 +38,80 @@ class Type(enum.Enum):
     TAG = "tag"
 
 
+class _ReadOnlyView(collections.abc.Sequence):
+    """A read-only view of a list, which is cheaper than copying it."""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Union[list, tuple]):
+        self._items = items
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._items)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _ReadOnlyView):
+            other = other._items
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return list(self._items) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self._items))
+
+
 class GitObject:
     """Class representing Git object."""
 
+    __slots__ = (
+        "sha",
+        "short_sha",
+        "truncated",
+        "collapsed",
+        "_type",
+        "_children",
+        "_parents",
+        "_hash",
+    )
+
     def __init__(
-        self, sha: str, obj_type: Type, parents: Optional[List["GitObject"]] = None
+        self,
+        sha: str,
+        obj_type: Type,
+        parents: Optional[List["GitObject"]] = None,
+        truncated: bool = False,
+        collapsed: int = 0,
     ):
         """
         Args:
             sha: The sha1 hexstring of this GitObject.
             obj_type: The type of this GitObject.
             parents: An optional list of parent objects.
+            truncated: If True, this object is a stub at the boundary of a
+                history window, and its children and parents are not known.
+            collapsed: If non-zero, this object is a summary of this many
+                commits, and it has the sha of the newest of them.
         """
 
         self.sha = sha
+        # interned, as the abbreviated sha is used as the node id in graphs
+        self.short_sha = sys.intern(util.short_sha(sha))
+        self.truncated = truncated
+        self.collapsed = collapsed
         self._type = obj_type
-        self._children = []
-        self._parents = parents or []
-
-    @property
-    def short_sha(self) -> str:
-        """Return an abbreviated form of this GitObject's sha1 hexstring."""
-        return util.short_sha(self.sha)
+        # most objects are blobs without children or parents, so an empty
+        # tuple is shared until something is added
+        self._children: Union[List[Child], tuple] = ()
+        self._parents: Union[List["GitObject"], tuple] = (
+            list(parents) if parents else ()
+        )
+        self._hash = hash(sha)
 
     @property
     def obj_type(self) -> Type:
@@ -51,27 +119,43 @@ class GitObject:
         return self._type
 
     @property
-    def children(self) -> List[Child]:
-        """Return a copy of this GitObject's children."""
-        return list(self._children)
+    def children(self) -> Sequence[Child]:
+        """Return a read-only view of this GitObject's children."""
+        return _ReadOnlyView(self._children)
 
     @property
-    def parents(self) -> List["GitObject"]:
-        """Return a copy of this GitObject's parents."""
-        return list(self._parents)
+    def parents(self) -> Sequence["GitObject"]:
+        """Return a read-only view of this GitObject's parents."""
+        return _ReadOnlyView(self._parents)
 
     def add_child(self, name: str, obj: "GitObject") -> None:
         """Add the provided GitObject with the given name as a child to this
         GitObject.
         """
+        if not self._children:
+            self._children = []
         self._children.append(Child(name, obj))
 
     def add_parent(self, obj: "GitObject") -> None:
         """Add a parent to this GitObject."""
+        if not self._parents:
+            self._parents = []
         self._parents.append(obj)
 
+    def unlink(self, objs: Iterable["GitObject"]) -> None:
+        """Remove the provided GitObjects from this GitObject's children and
+        parents.
+        """
+        unlinked = {id(obj) for obj in objs}
+        self._children = [
+            child for child in self._children if id(child.obj) not in unlinked
+        ]
+        self._parents = [
+            parent for parent in self._parents if id(parent) not in unlinked
+        ]
+
     def __repr__(self) -> str:
-        children_str = f", children={self.children}" if self.children else ""
+        children_str = f", children={self.children}" if self._children else ""
         parent_str = f", parents={self.parents}" if self._parents else ""
         return f"{self.obj_type.value}(sha={self.short_sha}{parent_str}{children_str})"
 
@@ -79,4 +163,4 @@ class GitObject:
         return rf"{self.obj_type.value}\n{self.short_sha}"
 
     def __hash__(self) -> int:
-        return int(self.sha, base=16)
+        return self._hash
@@ -1,10 +1,12 @@
 """Functions for converting Git objects to a Graphviz representation."""
 import pathlib
 from itertools import groupby
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from _pygitviz import git
 from _pygitviz import gitobject
+from _pygitviz import profile
+from _pygitviz import reduce
 from _pygitviz.gitobject import Type
 
 _COLOR = {
@@ -15,9 +17,20 @@ _COLOR = {
 _SHAPES = {Type.BLOB: "egg", Type.TREE: "folder", Type.COMMIT: "rect", Type.TAG: "rect"}
 _ORDER = {Type.BLOB: 0, Type.TREE: 1, Type.COMMIT: 2, Type.TAG: 3}
 EMPTY = r"digraph G {}"
+# space in points between the nodes of a cluster and its border
+CLUSTER_MARGIN = 40
 
+# positions of nodes in points, keyed by node name
+Positions = Dict[str, Tuple[float, float]]
 
-def git_to_dot(git_dir: pathlib.Path, hide_content: bool = False) -> str:
+
+def git_to_dot(
+    git_dir: pathlib.Path,
+    hide_content: bool = False,
+    object_store: Optional[git.ObjectStore] = None,
+    window: Optional[git.HistoryWindow] = None,
+    reduction: Optional[reduce.Reduction] = None,
+) -> str:
     """Produce a dot file from a Git directory.
 
     This function is guaranteed to produce consistent output. Calling this
@@ -27,14 +40,64 @@ def git_to_dot(git_dir: pathlib.Path, hide_content: bool = False) -> str:
     Args:
         git_dir: The .git directory.
         hide_content: If True, blobs and trees are not shown.
+        object_store: An object store for the Git directory that is kept
+            between calls, such that only new objects are read. If None, all
+            objects are read.
+        window: A window of history to limit the Digraph to. Ignored if an
+            object store is given, as the store has its own window.
+        reduction: How to reduce the graph before it is converted, e.g. by
+            collapsing linear chains of commits.
 
     Returns:
         A dot Digraph.
     """
-    git_objs = git.collect_objects(git_dir)
-    annotated_tags = [obj for obj in git_objs if obj.obj_type == Type.TAG]
-    refs = git.collect_refs(git_dir, annotated_tags)
-    return to_graphviz(git_objs, refs, hide_content)
+    return "".join(
+        iter_git_to_dot(git_dir, hide_content, object_store, window, reduction)
+    )
+
+
+def iter_git_to_dot(
+    git_dir: pathlib.Path,
+    hide_content: bool = False,
+    object_store: Optional[git.ObjectStore] = None,
+    window: Optional[git.HistoryWindow] = None,
+    reduction: Optional[reduce.Reduction] = None,
+) -> Iterator[str]:
+    """Like :py:func:`git_to_dot`, but yield the dot Digraph in fragments
+    instead of building one large string.
+    """
+    if object_store:
+        git_objs = object_store.update()
+        window = object_store.window
+    else:
+        git_objs = git.collect_objects(
+            git_dir, window=window, hide_content=hide_content
+        )
+
+    refs = git.collect_refs(git_dir)
+    if window:
+        refs = refs_within(refs, git_objs)
+    if reduction:
+        git_objs = reduce.reduce_graph(git_objs, refs, reduction)
+    return iter_graphviz(git_objs, refs, hide_content)
+
+
+def refs_within(
+    refs: List[git.Ref], git_objects: List[gitobject.GitObject]
+) -> List[git.Ref]:
+    """Return the refs that point to one of the Git objects, either directly or
+    through other refs. Used to drop refs that point outside of a history
+    window.
+    """
+    targets = {obj.short_sha for obj in git_objects}
+    remaining = list(refs)
+    while True:
+        within = [ref for ref in remaining if ref.value in targets]
+        if not within:
+            break
+        targets.update(ref.name for ref in within)
+        remaining = [ref for ref in remaining if ref.value not in targets]
+    return [ref for ref in refs if ref.value in targets]
 
 
 def to_graphviz(
@@ -53,8 +116,36 @@ def to_graphviz(
         refs: A list of Git refs.
         hide_content: If True, trees and blobs are not added to the Digraph.
     """
+    return "".join(iter_graphviz(git_objects, refs, hide_content))
+
+
+def iter_graphviz(
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+    hide_content: bool,
+    positions: Optional[Positions] = None,
+) -> Iterator[str]:
+    """Yield the graphviz representation of the provided Git objects and refs
+    in fragments, which can be written to a file or piped into `dot` as they
+    are produced. Joining the fragments gives the output of
+    :py:func:`to_graphviz`.
+
+    If positions are given, they are added to the nodes, and the clusters are
+    given bounding boxes that enclose their nodes, such that the graph can be
+    rendered with :py:data:`util.PINNED_ENGINE`.
+    """
+    return profile.count_dot(_iter_graphviz(git_objects, refs, hide_content, positions))
+
+
+def _iter_graphviz(
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+    hide_content: bool,
+    positions: Optional[Positions],
+) -> Iterator[str]:
     if not git_objects:
-        return EMPTY
+        yield EMPTY
+        return
 
     sha_sorted_git_objects = sorted(git_objects, key=lambda go: go.sha)
     groups = {
@@ -65,57 +156,87 @@ def to_graphviz(
         )
     }
 
-    output = ""
-    if not hide_content and (Type.TREE in groups or Type.BLOB in groups):
-        content_objs = groups.get(Type.TREE, []) + groups.get(Type.BLOB, [])
-        output += _to_cluster(content_objs, "Content")
-    if Type.COMMIT in groups:
-        output += _to_cluster(
-            groups[Type.COMMIT], "Commits", show_children=not hide_content
-        )
-    if refs:
-        output += "\n".join([_ref_to_graphviz(ref) for ref in sorted(refs)])
-
-    return f"""digraph G {{
+    yield """digraph G {
 nodesep=.3;
 ranksep=.5;
 node [style=filled];
 rankdir=LR;
-{output}
-}}"""
+"""
+    if not hide_content and (Type.TREE in groups or Type.BLOB in groups):
+        content_objs = groups.get(Type.TREE, []) + groups.get(Type.BLOB, [])
+        yield from _iter_cluster(content_objs, "Content", positions=positions)
+    if Type.COMMIT in groups:
+        yield from _iter_cluster(
+            groups[Type.COMMIT],
+            "Commits",
+            show_children=not hide_content,
+            positions=positions,
+        )
+    for i, ref in enumerate(sorted(refs)):
+        if i:
+            yield "\n"
+        yield _ref_to_graphviz(ref, positions)
+    yield "\n}"
 
 
-def _to_cluster(
+def _iter_cluster(
     git_objects: List[gitobject.GitObject],
     label: str,
     show_children: bool = True,
     show_parents: bool = True,
-) -> str:
-    """Return a string with a graphviz cluster of the provided git objects."""
-    content = "\n".join(
-        [_gitobj_to_graphviz(obj, show_children, show_parents) for obj in git_objects]
-    )
-    return f"""subgraph cluster_{label} {{
+    positions: Optional[Positions] = None,
+) -> Iterator[str]:
+    """Yield a graphviz cluster of the provided git objects in fragments."""
+    yield f"""subgraph cluster_{label} {{
 label="{label}";
 style="rounded";
 bgcolor=beige;
-{content}
-}}
 """
+    if positions:
+        yield _cluster_bounding_box(git_objects, positions)
+    for i, obj in enumerate(git_objects):
+        if i:
+            yield "\n"
+        yield _gitobj_to_graphviz(obj, show_children, show_parents, positions)
+    yield "\n}\n"
+
+
+def _cluster_bounding_box(
+    git_objects: List[gitobject.GitObject], positions: Positions
+) -> str:
+    xs = [positions[obj.short_sha][0] for obj in git_objects]
+    ys = [positions[obj.short_sha][1] for obj in git_objects]
+    return (
+        f'bb="{min(xs) - CLUSTER_MARGIN:.2f},{min(ys) - CLUSTER_MARGIN:.2f},'
+        f'{max(xs) + CLUSTER_MARGIN:.2f},{max(ys) + CLUSTER_MARGIN:.2f}";\n'
+    )
+
+
+def _pos_attribute(name: str, positions: Optional[Positions]) -> str:
+    if not positions:
+        return ""
+    x, y = positions[name]
+    return f',pos="{x:.2f},{y:.2f}"'
 
 
 def _gitobj_to_graphviz(
-    git_object: gitobject.GitObject, show_children: bool, show_parents: bool
+    git_object: gitobject.GitObject,
+    show_children: bool,
+    show_parents: bool,
+    positions: Optional[Positions] = None,
 ) -> str:
     return (
-        _to_graphviz_node(git_object)
+        _to_graphviz_node(git_object, positions)
         + "\n"
         + _to_graphviz_edges(git_object, show_children, show_parents)
     )
 
 
-def _ref_to_graphviz(ref: git.Ref) -> str:
-    ref_parts = [f'"{ref.name}" [shape=rect];', f'"{ref.name}" -> "{ref.value}";']
+def _ref_to_graphviz(ref: git.Ref, positions: Optional[Positions] = None) -> str:
+    ref_parts = [
+        f'"{ref.name}" [shape=rect{_pos_attribute(ref.name, positions)}];',
+        f'"{ref.name}" -> "{ref.value}";',
+    ]
 
     if ref.remote_tracking_branch:
         ref_parts.append(
@@ -126,23 +247,42 @@ def _ref_to_graphviz(ref: git.Ref) -> str:
     return "\n".join(ref_parts)
 
 
-def _to_graphviz_node(git_object: gitobject.GitObject) -> str:
+def _to_graphviz_node(
+    git_object: gitobject.GitObject, positions: Optional[Positions] = None
+) -> str:
     color = _COLOR[git_object.obj_type]
     shape = _SHAPES[git_object.obj_type]
+    pos = _pos_attribute(git_object.short_sha, positions)
+    if git_object.collapsed:
+        return (
+            f'"{git_object.short_sha}" [label="{git_object.collapsed} commits\n'
+            f'{git_object.short_sha}..."'
+            f',fillcolor={color},shape={shape},style="filled,dashed"{pos}];'
+        )
+    if git_object.truncated:
+        return (
+            f'"{git_object.short_sha}" [label="{git_object.obj_type.value}\n'
+            f'{git_object.short_sha}\n..."'
+            f',fillcolor={color},shape={shape},style="filled,dashed"{pos}];'
+        )
     return (
         f'"{git_object.short_sha}" [label="{git_object.obj_type.value}\n{git_object.short_sha}"'
-        f",fillcolor={color},shape={shape}];"
+        f",fillcolor={color},shape={shape}{pos}];"
     )
 
 
 def _to_graphviz_edges(
     git_object: gitobject.GitObject, show_children: bool, show_parents: bool
 ) -> str:
-    output = ""
-    if git_object.children and show_children:
-        for child in git_object.children:
-            output += f'"{git_object.short_sha}" -> "{child.short_sha}" [label="{child.name}"];\n'
-    if git_object.parents and show_parents:
-        for parent in git_object.parents:
-            output += f'"{parent.short_sha}" -> "{git_object.short_sha}" [dir=back];\n'
-    return output.strip()
+    edges = []
+    if show_children:
+        edges.extend(
+            f'"{git_object.short_sha}" -> "{child.short_sha}" [label="{child.name}"];'
+            for child in git_object.children
+        )
+    if show_parents:
+        edges.extend(
+            f'"{parent.short_sha}" -> "{git_object.short_sha}" [dir=back];'
+            for parent in git_object.parents
+        )
+    return "\n".join(edges)
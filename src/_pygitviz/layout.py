@@ -0,0 +1,137 @@
+"""A layout engine for commit graphs, which assigns every commit a row and a
+lane in the same way as `git log --graph`. Unlike the general purpose layout
+of Graphviz, it runs in time that is near linear in the size of the graph.
+"""
+import dataclasses
+from typing import Dict, List, Optional, Tuple
+
+from _pygitviz import gitobject
+from _pygitviz.gitobject import Type
+
+
+@dataclasses.dataclass(frozen=True)
+class Edge:
+    """An edge from a commit to one of its parents.
+
+    Attributes:
+        child: The short sha of the commit.
+        parent: The short sha of the parent.
+        lane: The lane that the edge runs down between the rows of the commit
+            and the parent.
+    """
+
+    child: str
+    parent: str
+    lane: int
+
+
+@dataclasses.dataclass(frozen=True)
+class CommitLayout:
+    """The layout of a commit graph.
+
+    Attributes:
+        commits: The commits, ordered by row such that every commit comes
+            before its parents.
+        positions: The row and lane of each commit, keyed by short sha.
+        edges: The edges between commits and their parents.
+        num_lanes: The amount of lanes.
+    """
+
+    commits: List[gitobject.GitObject]
+    positions: Dict[str, Tuple[int, int]]
+    edges: List[Edge]
+    num_lanes: int
+
+
+def layout_commits(git_objects: List[gitobject.GitObject]) -> CommitLayout:
+    """Lay out the commits among the Git objects, newest first. Other objects
+    are ignored.
+
+    Every commit is put in the lane that its first child reserved for it, and
+    a new lane is only opened for the tip of a branch, or for a parent of a
+    merge that no other commit has reserved a lane for. Lanes are freed as
+    soon as the commit they were reserved for has been placed.
+    """
+    commits = _topological_order(
+        [obj for obj in git_objects if obj.obj_type == Type.COMMIT]
+    )
+    visible = {commit.sha for commit in commits}
+
+    # the sha of the commit that each lane is reserved for
+    lanes: List[Optional[str]] = []
+    lane_of: Dict[str, int] = {}
+    positions: Dict[str, Tuple[int, int]] = {}
+    edges: List[Edge] = []
+    num_lanes = 0
+
+    for row, commit in enumerate(commits):
+        lane = lane_of.pop(commit.sha, None)
+        if lane is None:
+            lane = _reserve(lanes, commit.sha)
+        lanes[lane] = None
+        positions[commit.short_sha] = (row, lane)
+
+        for i, parent in enumerate(commit.parents):
+            if parent.sha not in visible:
+                continue
+            if parent.sha not in lane_of:
+                # the first parent continues in the lane of the commit
+                lane_of[parent.sha] = (
+                    _reserve(lanes, parent.sha, lane)
+                    if i == 0
+                    else _reserve(lanes, parent.sha)
+                )
+            edges.append(Edge(commit.short_sha, parent.short_sha, lane_of[parent.sha]))
+
+        num_lanes = max(num_lanes, len(lanes))
+        while lanes and lanes[-1] is None:
+            lanes.pop()
+
+    return CommitLayout(commits, positions, edges, num_lanes)
+
+
+def _reserve(lanes: List[Optional[str]], sha: str, preferred: int = -1) -> int:
+    """Reserve a lane for the commit, preferably the given one, and otherwise
+    the leftmost free lane.
+    """
+    if 0 <= preferred < len(lanes) and lanes[preferred] is None:
+        lane = preferred
+    else:
+        lane = next((i for i, reserved in enumerate(lanes) if reserved is None), None)
+        if lane is None:
+            lane = len(lanes)
+            lanes.append(None)
+    lanes[lane] = sha
+    return lane
+
+
+def _topological_order(
+    commits: List[gitobject.GitObject],
+) -> List[gitobject.GitObject]:
+    """Return the commits ordered such that every commit comes before its
+    parents. Where possible, a commit is directly followed by its first
+    parent, such that chains of commits are kept together.
+    """
+    num_children: Dict[str, int] = dict.fromkeys((commit.sha for commit in commits), 0)
+    for commit in commits:
+        for parent in commit.parents:
+            if parent.sha in num_children:
+                num_children[parent.sha] += 1
+
+    # a stack, with the tips ordered such that the output is deterministic
+    ready = sorted(
+        (commit for commit in commits if not num_children[commit.sha]),
+        key=lambda commit: commit.sha,
+        reverse=True,
+    )
+    ordered = []
+    while ready:
+        commit = ready.pop()
+        ordered.append(commit)
+        # pushed in reverse, such that the first parent is popped first
+        for parent in reversed(commit.parents):
+            if parent.sha in num_children:
+                num_children[parent.sha] -= 1
+                if not num_children[parent.sha]:
+                    ready.append(parent)
+    return ordered
@@ -0,0 +1,326 @@
+"""Reuse of the Graphviz layout between renders.
+
+Laying out a graph with `dot` takes time that grows quickly with the size of
+the graph, and nodes may move around even if only a single commit was added.
+Instead, the positions of the nodes in the previous layout are kept, new
+nodes are placed next to the nodes they are connected to, and the graph is
+rendered with all nodes pinned, which only leaves the edges to be routed.
+
+The placement of new nodes is approximate, so the graph is laid out from
+scratch when a placed node would land in the other cluster, and after a
+bounded amount of incremental layouts in a row, before errors pile up.
+"""
+import collections
+import pathlib
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from _pygitviz import git
+from _pygitviz import gitobject
+from _pygitviz import util
+from _pygitviz.gitobject import Type
+from _pygitviz.graphviz import CLUSTER_MARGIN, Positions, iter_graphviz
+
+# distance in points between ranks and between nodes of the same rank, about
+# what `dot` uses for the graphs that pygitviz produces
+_RANK_STEP = 90.0
+_NODE_STEP = 60.0
+_POINTS_PER_INCH = 72.0
+# a node line of Graphviz's plain format, `node name x y ...`, where the name
+# is quoted if it contains special characters
+_PLAIN_NODE = re.compile(r'^node ("(?:[^"\\]|\\.)*"|\S+) (\S+) (\S+) ')
+
+
+class LayoutCache:
+    """The positions of the nodes of the previous layout, keyed by node name.
+    Nodes of Git objects are named after their short sha, and nodes of refs
+    after the ref.
+    """
+
+    def __init__(
+        self, max_new_fraction: float = 0.5, max_incremental_layouts: int = 20
+    ):
+        """
+        Args:
+            max_new_fraction: The largest fraction of new nodes for which the
+                layout is reused. If more of the graph is new, it is laid out
+                from scratch, as the placement of new nodes is crude.
+            max_incremental_layouts: The most layouts in a row that place new
+                nodes on top of the previous layout. The next graph with new
+                nodes is laid out from scratch.
+        """
+        self._max_new_fraction = max_new_fraction
+        self._max_incremental_layouts = max_incremental_layouts
+        self._positions: Positions = {}
+        self._incremental_layouts = 0
+
+    def place(
+        self,
+        git_objects: List[gitobject.GitObject],
+        refs: List[git.Ref],
+        hide_content: bool,
+    ) -> Optional[Positions]:
+        """Return positions for all nodes of the graph, where nodes of the
+        previous layout keep their position, or None if the graph should be
+        laid out from scratch. Every new node is put one rank away from a
+        node it is connected to, in the first spot that does not overlap
+        another node.
+        """
+        if not self._positions:
+            return None
+
+        nodes, edges = _nodes_and_edges(git_objects, refs, hide_content)
+        if any(tail not in nodes or head not in nodes for tail, head in edges):
+            return None  # Graphviz would add the missing nodes without positions
+
+        positions = {
+            name: self._positions[name] for name in nodes if name in self._positions
+        }
+        new_nodes = [name for name in nodes if name not in positions]
+        if not new_nodes:
+            return positions
+        if (
+            len(new_nodes) > self._max_new_fraction * len(nodes)
+            or self._incremental_layouts >= self._max_incremental_layouts
+        ):
+            return None
+
+        neighbors: Dict[str, List[Tuple[str, float]]] = collections.defaultdict(list)
+        for tail, head in edges:
+            # ranks increase along the edges, and the rank direction is LR
+            neighbors[tail].append((head, _RANK_STEP))
+            neighbors[head].append((tail, -_RANK_STEP))
+
+        occupied: _Occupied = collections.defaultdict(list)
+        for x, y in positions.values():
+            occupied[_cell(x, y)].append((x, y))
+        queue = collections.deque(
+            dict.fromkeys(
+                neighbor
+                for name in new_nodes
+                for neighbor, _ in neighbors[name]
+                if neighbor in positions
+            )
+        )
+        while queue:
+            name = queue.popleft()
+            x, y = positions[name]
+            for neighbor, x_offset in neighbors[name]:
+                if neighbor not in positions:
+                    positions[neighbor] = _free_position(x + x_offset, y, occupied)
+                    queue.append(neighbor)
+
+        # nodes that are not connected to the previous layout go to the right
+        max_x = max(x for x, _ in self._positions.values())
+        for name in new_nodes:
+            if name not in positions:
+                positions[name] = _free_position(max_x + _RANK_STEP, 0.0, occupied)
+
+        if _lands_in_other_cluster(
+            new_nodes, positions, _clusters(git_objects, hide_content)
+        ):
+            return None
+        return positions
+
+    def reset(self) -> None:
+        """Forget the previous layout, such that the next graph is laid out
+        from scratch.
+        """
+        self._positions = {}
+        self._incremental_layouts = 0
+
+    def update(self, positions: Positions, incremental: bool = False) -> None:
+        """Replace the positions with those of the latest layout.
+
+        Args:
+            positions: The positions of the nodes of the latest layout.
+            incremental: True if the positions were placed by
+                :py:meth:`place` instead of laid out from scratch.
+        """
+        if not incremental:
+            self._incremental_layouts = 0
+        elif positions.keys() - self._positions.keys():
+            self._incremental_layouts += 1
+        self._positions = dict(positions)
+
+
+def compile(
+    output_file: pathlib.Path,
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+    hide_content: bool,
+    layout_cache: LayoutCache,
+    cancel: Optional[threading.Event] = None,
+    render_cache: Optional[util.RenderCache] = None,
+) -> None:
+    """Compile the graph like :py:func:`util.compile`, but reuse the previous
+    layout if possible, and keep the layout for the next compilation. If the
+    output is taken from the render cache, there is no layout to keep, and
+    the next graph is laid out from scratch.
+    """
+    positions = layout_cache.place(git_objects, refs, hide_content)
+    if positions is not None:
+        util.compile(
+            output_file,
+            lambda: iter_graphviz(git_objects, refs, hide_content, positions),
+            cancel,
+            render_cache,
+            engine=util.PINNED_ENGINE,
+        )
+        layout_cache.update(positions, incremental=True)
+        return
+
+    layout_file = output_file.with_name(f".{output_file.name}.plain")
+    try:
+        util.compile(
+            output_file,
+            lambda: iter_graphviz(git_objects, refs, hide_content),
+            cancel,
+            render_cache,
+            layout_file=layout_file,
+        )
+        if layout_file.exists():
+            layout_cache.update(
+                parse_plain(layout_file.read_text(encoding=util.ENCODING))
+            )
+        else:
+            # the output came from the render cache, which keeps no layout,
+            # and the previous positions are not those of the shown graph
+            layout_cache.reset()
+    finally:
+        if layout_file.exists():
+            layout_file.unlink()
+
+
+def parse_plain(plain: str) -> Positions:
+    """Return the positions of the nodes in a layout in Graphviz's plain
+    format, converted from inches to points.
+    """
+    positions = {}
+    for line in plain.split("\n"):
+        match = _PLAIN_NODE.match(line)
+        if match:
+            name, x, y = match.groups()
+            if name.startswith('"'):
+                name = re.sub(r"\\(.)", r"\1", name[1:-1])
+            positions[name] = (
+                float(x) * _POINTS_PER_INCH,
+                float(y) * _POINTS_PER_INCH,
+            )
+    return positions
+
+
+def _nodes_and_edges(
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+    hide_content: bool,
+) -> Tuple[Set[str], List[Tuple[str, str]]]:
+    """Return the names of the nodes that are drawn, and the edges between
+    them as (tail, head).
+    """
+    shown_types = (
+        (Type.COMMIT,) if hide_content else (Type.COMMIT, Type.TREE, Type.BLOB)
+    )
+    shown = [obj for obj in git_objects if obj.obj_type in shown_types]
+    nodes = {obj.short_sha for obj in shown}
+    edges = []
+    for obj in shown:
+        edges.extend((parent.short_sha, obj.short_sha) for parent in obj.parents)
+        if not hide_content:
+            edges.extend((obj.short_sha, child.short_sha) for child in obj.children)
+    for ref in refs:
+        nodes.add(ref.name)
+        edges.append((ref.name, ref.value))
+        if ref.remote_tracking_branch:
+            edges.append((ref.name, ref.remote_tracking_branch))
+    return nodes, edges
+
+
+def _clusters(
+    git_objects: List[gitobject.GitObject], hide_content: bool
+) -> Dict[str, Type]:
+    """Return the cluster of each node of a Git object, as the type of the
+    first object of the cluster. Nodes of refs are in no cluster.
+    """
+    if hide_content:
+        return {
+            obj.short_sha: Type.COMMIT
+            for obj in git_objects
+            if obj.obj_type == Type.COMMIT
+        }
+    return {
+        obj.short_sha: Type.COMMIT if obj.obj_type == Type.COMMIT else Type.TREE
+        for obj in git_objects
+        if obj.obj_type != Type.TAG
+    }
+
+
+def _lands_in_other_cluster(
+    new_nodes: List[str], positions: Positions, clusters: Dict[str, Type]
+) -> bool:
+    """Return True if a new node is placed within the bounding box of the
+    previous nodes of a cluster that it does not belong to.
+    """
+    new = set(new_nodes)
+    bounding_boxes = {}
+    for cluster in set(clusters.values()):
+        previous = [
+            positions[name]
+            for name, name_cluster in clusters.items()
+            if name_cluster == cluster and name not in new
+        ]
+        if previous:
+            xs, ys = zip(*previous)
+            bounding_boxes[cluster] = (
+                min(xs) - CLUSTER_MARGIN,
+                min(ys) - CLUSTER_MARGIN,
+                max(xs) + CLUSTER_MARGIN,
+                max(ys) + CLUSTER_MARGIN,
+            )
+
+    for name in new_nodes:
+        x, y = positions[name]
+        for cluster, (min_x, min_y, max_x, max_y) in bounding_boxes.items():
+            if (
+                cluster != clusters.get(name)
+                and min_x <= x <= max_x
+                and min_y <= y <= max_y
+            ):
+                return True
+    return False
+
+
+# the positions of the placed nodes, bucketed by the grid cell they are in
+_Occupied = Dict[Tuple[int, int], List[Tuple[float, float]]]
+
+
+def _cell(x: float, y: float) -> Tuple[int, int]:
+    return round(x / _RANK_STEP), round(y / _NODE_STEP)
+
+
+def _overlaps(x: float, y: float, occupied: _Occupied) -> bool:
+    """Return True if a node at the position would be closer than a step to
+    a placed node. The nodes of a layout by `dot` are not on the grid, so
+    the placed nodes in the surrounding cells are checked as well.
+    """
+    cell_x, cell_y = _cell(x, y)
+    return any(
+        abs(x - other_x) < _RANK_STEP and abs(y - other_y) < _NODE_STEP
+        for neighbor_x in (cell_x - 1, cell_x, cell_x + 1)
+        for neighbor_y in (cell_y - 1, cell_y, cell_y + 1)
+        for other_x, other_y in occupied.get((neighbor_x, neighbor_y), ())
+    )
+
+
+def _free_position(x: float, y: float, occupied: _Occupied) -> Tuple[float, float]:
+    """Return the free spot closest to the position in the same rank, and
+    mark it as occupied.
+    """
+    offset = 0
+    while True:
+        for candidate_y in (y + offset * _NODE_STEP, y - offset * _NODE_STEP):
+            if not _overlaps(x, candidate_y, occupied):
+                occupied[_cell(x, candidate_y)].append((x, candidate_y))
+                return x, candidate_y
+        offset += 1
@@ -0,0 +1,313 @@
+"""Native reader for Git packfiles and their index files."""
+import collections
+import mmap
+import pathlib
+import zlib
+from typing import Iterable, List, Tuple
+
+from _pygitviz.gitobject import Type
+
+_PACK_SIGNATURE = b"PACK"
+_IDX_V2_SIGNATURE = b"\377tOc"
+_SHA_SIZE = 20
+_FANOUT_SIZE = 256 * 4
+
+_OFS_DELTA = 6
+_REF_DELTA = 7
+_PACK_TYPES = {1: Type.COMMIT, 2: Type.TREE, 3: Type.BLOB, 4: Type.TAG}
+
+DEFAULT_DELTA_CACHE_SIZE = 16 * 1024 * 1024
+
+
+class PackIndex:
+    """The SHA to offset mapping of a pack, as stored in its .idx file.
+
+    The index file is memory mapped and never copied into Python memory as a
+    whole. Lookups use the fanout table to narrow the search down to objects
+    that share the first byte of the sha, and then binary search the sorted
+    sha table, which is O(log n).
+
+    Use as a context manager to release the memory map.
+    """
+
+    def __init__(self, idx_path: pathlib.Path):
+        """
+        Args:
+            idx_path: Path to a .idx file.
+        """
+        with open(idx_path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._data[:4] == _IDX_V2_SIGNATURE:
+            self._fanout_start = 8
+            self._num_objects = self._fanout(255)
+            self._shas_start = self._fanout_start + _FANOUT_SIZE
+            self._sha_stride = _SHA_SIZE
+            # CRCs follow the sha table, and offsets follow the CRCs
+            self._offsets_start = self._shas_start + self._num_objects * (_SHA_SIZE + 4)
+            self._offset_stride = 4
+            self._large_offsets_start = self._offsets_start + self._num_objects * 4
+        else:  # version 1, entries are 4 byte offsets followed by a sha
+            self._fanout_start = 0
+            self._num_objects = self._fanout(255)
+            self._offsets_start = _FANOUT_SIZE
+            self._offset_stride = 4 + _SHA_SIZE
+            self._shas_start = _FANOUT_SIZE + 4
+            self._sha_stride = 4 + _SHA_SIZE
+            self._large_offsets_start = -1
+
+    def __enter__(self) -> "PackIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __len__(self) -> int:
+        return self._num_objects
+
+    def __contains__(self, sha: str) -> bool:
+        return self._find(bytes.fromhex(sha)) >= 0
+
+    def offset(self, sha: str) -> int:
+        """Return the offset of the object in the pack, or raise KeyError if
+        the object is not in the pack.
+        """
+        position = self._find(bytes.fromhex(sha))
+        if position < 0:
+            raise KeyError(sha)
+        return self._offset_at(position)
+
+    def shas(self) -> Iterable[str]:
+        """Return the shas of all objects in the pack, in sorted order."""
+        return (self._sha_at(i).hex() for i in range(self._num_objects))
+
+    def _fanout(self, first_byte: int) -> int:
+        """Return the amount of objects whose first sha byte is less than or
+        equal to the given byte.
+        """
+        start = self._fanout_start + first_byte * 4
+        return int.from_bytes(self._data[start : start + 4], "big")
+
+    def _find(self, raw_sha: bytes) -> int:
+        """Return the position of the sha in the sha table, or -1 if it's not
+        present.
+        """
+        first_byte = raw_sha[0]
+        lo = self._fanout(first_byte - 1) if first_byte else 0
+        hi = self._fanout(first_byte)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            candidate = self._sha_at(mid)
+            if candidate < raw_sha:
+                lo = mid + 1
+            elif candidate > raw_sha:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def _sha_at(self, position: int) -> bytes:
+        start = self._shas_start + position * self._sha_stride
+        return self._data[start : start + _SHA_SIZE]
+
+    def _offset_at(self, position: int) -> int:
+        start = self._offsets_start + position * self._offset_stride
+        offset = int.from_bytes(self._data[start : start + 4], "big")
+        if self._large_offsets_start >= 0 and offset & 0x80000000:
+            large = self._large_offsets_start + (offset & 0x7FFFFFFF) * 8
+            offset = int.from_bytes(self._data[large : large + 8], "big")
+        return offset
+
+
+class PackFile:
+    """A packfile and its index. The pack is memory mapped, so objects are
+    only read from disk as they are accessed. Deltified objects are resolved
+    in-process, with recently used delta bases kept in a size-bounded cache.
+
+    Use as a context manager to release the memory map.
+    """
+
+    def __init__(
+        self,
+        pack_path: pathlib.Path,
+        delta_cache_size: int = DEFAULT_DELTA_CACHE_SIZE,
+    ):
+        """
+        Args:
+            pack_path: Path to a .pack file. The .idx file is expected to be
+                next to it.
+            delta_cache_size: Maximum total size in bytes of cached delta
+                bases.
+        """
+        self.index = PackIndex(pack_path.with_suffix(".idx"))
+        with open(pack_path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._data[:4] != _PACK_SIGNATURE:
+            self.close()
+            raise RuntimeError(f"not a packfile: {pack_path}")
+
+        self._delta_cache_size = delta_cache_size
+        self._delta_cache: "collections.OrderedDict[int, Tuple[Type, bytes]]"
+        self._delta_cache = collections.OrderedDict()
+        self._delta_cache_used = 0
+
+    def __enter__(self) -> "PackFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.close()
+        self.index.close()
+
+    def object_type(self, offset: int) -> Type:
+        """Return the type of the object at the given offset. Deltified objects
+        have the type of their base, which is found by following the chain of
+        delta headers.
+        """
+        while True:
+            pack_type, _, data_start = self._read_header(offset)
+            if pack_type == _OFS_DELTA:
+                offset = self._read_ofs_delta_base(offset, data_start)[0]
+            elif pack_type == _REF_DELTA:
+                offset = self._read_ref_delta_base(data_start)[0]
+            else:
+                return _PACK_TYPES[pack_type]
+
+    def read(self, sha: str) -> Tuple[Type, bytes]:
+        """Return the type and content of the object with the given sha."""
+        return self.read_at(self.index.offset(sha))
+
+    def read_at(self, offset: int) -> Tuple[Type, bytes]:
+        """Return the type and content of the object at the given offset."""
+        delta_chain: List[Tuple[int, int]] = []
+        while offset not in self._delta_cache:
+            pack_type, _, data_start = self._read_header(offset)
+            if pack_type == _OFS_DELTA:
+                base_offset, delta_start = self._read_ofs_delta_base(offset, data_start)
+            elif pack_type == _REF_DELTA:
+                base_offset, delta_start = self._read_ref_delta_base(data_start)
+            else:
+                base = (_PACK_TYPES[pack_type], self._inflate(data_start))
+                break
+            delta_chain.append((offset, delta_start))
+            offset = base_offset
+        else:
+            self._delta_cache.move_to_end(offset)
+            base = self._delta_cache[offset]
+
+        obj_type, content = base
+        for delta_offset, delta_start in reversed(delta_chain):
+            self._cache_delta_base(offset, obj_type, content)
+            content = _apply_delta(content, self._inflate(delta_start))
+            offset = delta_offset
+
+        return obj_type, content
+
+    def _read_header(self, offset: int) -> Tuple[int, int, int]:
+        """Return the pack type, inflated size and start of the data of the
+        object at the given offset.
+        """
+        data = self._data
+        byte = data[offset]
+        pack_type = (byte >> 4) & 0x7
+        size = byte & 0x0F
+        shift = 4
+        pos = offset + 1
+        while byte & 0x80:
+            byte = data[pos]
+            size |= (byte & 0x7F) << shift
+            shift += 7
+            pos += 1
+        return pack_type, size, pos
+
+    def _read_ofs_delta_base(self, offset: int, data_start: int) -> Tuple[int, int]:
+        data = self._data
+        byte = data[data_start]
+        relative = byte & 0x7F
+        pos = data_start + 1
+        while byte & 0x80:
+            byte = data[pos]
+            relative = ((relative + 1) << 7) | (byte & 0x7F)
+            pos += 1
+        return offset - relative, pos
+
+    def _read_ref_delta_base(self, data_start: int) -> Tuple[int, int]:
+        base_sha = self._data[data_start : data_start + _SHA_SIZE].hex()
+        try:
+            return self.index.offset(base_sha), data_start + _SHA_SIZE
+        except KeyError:
+            raise RuntimeError(f"delta base {base_sha} is not in the pack")
+
+    def _inflate(self, start: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        chunks = []
+        pos = start
+        chunk_size = 64 * 1024
+        while not decompressor.eof:
+            chunk = self._data[pos : pos + chunk_size]
+            if not chunk:
+                raise RuntimeError(f"truncated object data at offset {start}")
+            chunks.append(decompressor.decompress(chunk))
+            pos += chunk_size
+        return b"".join(chunks)
+
+    def _cache_delta_base(self, offset: int, obj_type: Type, content: bytes) -> None:
+        if offset in self._delta_cache or len(content) > self._delta_cache_size:
+            return
+
+        self._delta_cache[offset] = (obj_type, content)
+        self._delta_cache_used += len(content)
+        while self._delta_cache_used > self._delta_cache_size:
+            _, (_, evicted) = self._delta_cache.popitem(last=False)
+            self._delta_cache_used -= len(evicted)
+
+
+def _apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Apply a Git delta to the base content and return the result."""
+    _, pos = _read_delta_size(delta, 0)  # size of base
+    target_size, pos = _read_delta_size(delta, pos)
+
+    result = bytearray()
+    while pos < len(delta):
+        opcode = delta[pos]
+        pos += 1
+        if opcode & 0x80:  # copy from base
+            copy_offset = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    copy_offset |= delta[pos] << (i * 8)
+                    pos += 1
+            copy_size = 0
+            for i in range(3):
+                if opcode & (1 << (4 + i)):
+                    copy_size |= delta[pos] << (i * 8)
+                    pos += 1
+            copy_size = copy_size or 0x10000
+            result += base[copy_offset : copy_offset + copy_size]
+        elif opcode:  # insert literal data
+            result += delta[pos : pos + opcode]
+            pos += opcode
+        else:
+            raise RuntimeError("invalid delta opcode 0")
+
+    if len(result) != target_size:
+        raise RuntimeError("delta produced an object of unexpected size")
+    return bytes(result)
+
+
+def _read_delta_size(delta: bytes, pos: int) -> Tuple[int, int]:
+    size = 0
+    shift = 0
+    while True:
+        byte = delta[pos]
+        pos += 1
+        size |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, pos
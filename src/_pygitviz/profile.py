@@ -0,0 +1,145 @@
+"""Instrumentation of the rendering pipeline.
+
+Instrumentation is only collected while a :py:class:`Profiler` is active.
+When none is, every hook in this module is a single global lookup, so the
+pipeline pays nothing for it.
+"""
+import collections
+import contextlib
+import pathlib
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+_active: Optional["Profiler"] = None
+_NO_PHASE = contextlib.nullcontext()
+
+
+class Profiler:
+    """Collects wall time per phase, subprocesses per command, object counts
+    by type and node and edge counts of the DOT output.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = collections.defaultdict(float)
+        self.subprocesses: Dict[str, List[float]] = collections.defaultdict(list)
+        self.object_counts: Dict[str, int] = {}
+        self.dot_nodes = 0
+        self.dot_edges = 0
+        # the render worker and the main thread may both spawn processes
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time spent in the context to the named phase. Phases
+        may be nested, and a phase that is entered several times accumulates
+        its time.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] += elapsed
+
+    def record_subprocess(self, args: Iterable, seconds: float) -> None:
+        with self._lock:
+            self.subprocesses[_command_name(list(args))].append(seconds)
+
+    def count_objects(self, git_objects: Iterable) -> None:
+        self.object_counts = dict(
+            collections.Counter(obj.obj_type.value for obj in git_objects)
+        )
+
+    def count_dot(self, fragments: Iterable[str]) -> Iterator[str]:
+        """Pass the DOT fragments through, while counting nodes and edges and
+        timing their generation. If the fragments are consumed several times,
+        the counts are of the last pass while the time accumulates.
+        """
+        self.dot_nodes = self.dot_edges = 0
+        iterator = iter(fragments)
+        while True:
+            with self.phase("generate_dot"):
+                fragment = next(iterator, None)
+            if fragment is None:
+                return
+            for line in fragment.split("\n"):
+                if line.startswith('"'):
+                    if " -> " in line:
+                        self.dot_edges += 1
+                    else:
+                        self.dot_nodes += 1
+            yield fragment
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": dict(self.phases),
+            "subprocesses": {
+                command: {"count": len(durations), "seconds": sum(durations)}
+                for command, durations in self.subprocesses.items()
+            },
+            "objects": self.object_counts,
+            "dot": {"nodes": self.dot_nodes, "edges": self.dot_edges},
+        }
+
+    def summary(self) -> str:
+        """Return a human readable summary of the profile."""
+        lines = ["Profile", "  phases:"]
+        lines.extend(
+            f"    {name:<24}{seconds:>10.4f}s" for name, seconds in self.phases.items()
+        )
+        lines.append("  subprocesses:")
+        lines.extend(
+            f"    {command:<24}{len(durations):>4} x {sum(durations):>10.4f}s"
+            for command, durations in self.subprocesses.items()
+        )
+        objects = ", ".join(
+            f"{obj_type}={count}" for obj_type, count in self.object_counts.items()
+        )
+        lines.append(f"  objects: {objects or 'none'}")
+        lines.append(f"  dot: {self.dot_nodes} nodes, {self.dot_edges} edges")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profiling(profiler: Optional[Profiler] = None) -> Iterator[Profiler]:
+    """Make a profiler active for the duration of the context."""
+    global _active
+    profiler = profiler or Profiler()
+    previous, _active = _active, profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+def active() -> Optional[Profiler]:
+    """Return the active profiler, or None if profiling is disabled."""
+    return _active
+
+
+def phase(name: str) -> contextlib.AbstractContextManager:
+    """Return a context manager that times the named phase if profiling is
+    enabled, and does nothing otherwise.
+    """
+    return _active.phase(name) if _active else _NO_PHASE
+
+
+def count_objects(git_objects: Iterable) -> None:
+    if _active:
+        _active.count_objects(git_objects)
+
+
+def count_dot(fragments: Iterable[str]) -> Iterable[str]:
+    return _active.count_dot(fragments) if _active else fragments
+
+
+def _command_name(args: List) -> str:
+    """Return the program name, with the subcommand for Git."""
+    if not args:
+        return "?"
+    program = pathlib.Path(str(args[0])).name
+    if program == "git" and len(args) > 1:
+        return f"git {args[1]}"
+    return program
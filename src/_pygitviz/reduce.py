@@ -0,0 +1,175 @@
+"""Graph reduction, which shrinks the Git object graph before it is turned
+into a Graphviz representation.
+"""
+import collections
+import dataclasses
+from typing import Dict, List, Optional
+
+from _pygitviz import git
+from _pygitviz import gitobject
+from _pygitviz.gitobject import Type
+
+
+@dataclasses.dataclass(frozen=True)
+class Reduction:
+    """Options for reducing the graph.
+
+    Attributes:
+        collapse_chains: If True, runs of commits with a single parent and a
+            single child that no ref points to are collapsed into one summary
+            node.
+        max_tree_depth: If given, trees at this depth (a commit's top-level
+            tree is at depth 0) are folded, such that their content is not
+            shown.
+    """
+
+    collapse_chains: bool = False
+    max_tree_depth: Optional[int] = None
+
+    def __bool__(self) -> bool:
+        return self.collapse_chains or self.max_tree_depth is not None
+
+
+def reduce_graph(
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+    reduction: Reduction,
+) -> List[gitobject.GitObject]:
+    """Return a reduced copy of the graph of Git objects. The provided objects
+    are not modified, so they can be kept in an object store.
+
+    Ref tips, merges and branching points are never collapsed. Content that
+    is only reachable through collapsed commits or folded trees is left out.
+
+    Args:
+        git_objects: The Git objects to reduce.
+        refs: The refs that point into the Git objects.
+        reduction: How to reduce the graph.
+    Returns:
+        New Git objects that make up the reduced graph.
+    """
+    runs = (
+        _collapsible_runs(git_objects, {ref.value for ref in refs})
+        if reduction.collapse_chains
+        else []
+    )
+    collapsed_shas = {obj.sha for run in runs for obj in run}
+
+    commits = [obj for obj in git_objects if obj.obj_type == Type.COMMIT]
+    content_depths = _content_depths(
+        [commit for commit in commits if commit.sha not in collapsed_shas]
+    )
+    if reduction.max_tree_depth is not None:
+        content_depths = {
+            sha: depth
+            for sha, depth in content_depths.items()
+            if depth <= reduction.max_tree_depth
+        }
+    # content that no commit points to is dangling, and always shown
+    committed_content = _content_depths(commits).keys()
+
+    copies: Dict[str, gitobject.GitObject] = {}
+    for obj in git_objects:
+        if obj.sha in collapsed_shas or (
+            obj.sha in committed_content and obj.sha not in content_depths
+        ):
+            continue
+        folded = (
+            obj.obj_type == Type.TREE
+            and bool(obj.children)
+            and content_depths.get(obj.sha) == reduction.max_tree_depth
+        )
+        copies[obj.sha] = gitobject.GitObject(
+            obj.sha, obj.obj_type, truncated=obj.truncated or folded
+        )
+    summaries = []
+    for run in runs:
+        newest, *_, oldest = run
+        summary = gitobject.GitObject(newest.sha, Type.COMMIT, collapsed=len(run))
+        copies.update((obj.sha, summary) for obj in run)
+        summaries.append((summary, oldest))
+
+    for obj in git_objects:
+        copy = copies.get(obj.sha)
+        if copy is not None and not copy.truncated and not copy.collapsed:
+            _link_copy(copy, obj, obj, copies)
+    for summary, oldest in summaries:
+        # a summary has the content of none, and the parent of the oldest
+        _link_copy(summary, None, oldest, copies)
+
+    return list({id(copy): copy for copy in copies.values()}.values())
+
+
+def _link_copy(
+    copy: gitobject.GitObject,
+    children_of: Optional[gitobject.GitObject],
+    parents_of: gitobject.GitObject,
+    copies: Dict[str, gitobject.GitObject],
+) -> None:
+    """Link the copy to the copies of the children and parents of the
+    originals, leaving out children and parents that are not shown.
+    """
+    if children_of is not None:
+        for child in children_of.children:
+            if child.sha in copies:
+                copy.add_child(child.name, copies[child.sha])
+    for parent in parents_of.parents:
+        if parent.sha in copies:
+            copy.add_parent(copies[parent.sha])
+
+
+def _collapsible_runs(
+    git_objects: List[gitobject.GitObject], ref_targets: set
+) -> List[List[gitobject.GitObject]]:
+    """Return runs of at least two collapsible commits, each ordered from the
+    newest commit to the oldest.
+    """
+    commits = [obj for obj in git_objects if obj.obj_type == Type.COMMIT]
+    num_children: Dict[str, int] = collections.Counter(
+        parent.sha for commit in commits for parent in commit.parents
+    )
+    child_of = {
+        commit.parents[0].sha: commit for commit in commits if len(commit.parents) == 1
+    }
+
+    def is_collapsible(commit: gitobject.GitObject) -> bool:
+        return (
+            commit.obj_type == Type.COMMIT
+            and not commit.truncated
+            and len(commit.parents) == 1
+            and num_children[commit.sha] == 1
+            and commit.short_sha not in ref_targets
+        )
+
+    runs = []
+    for commit in commits:
+        child = child_of.get(commit.sha)
+        if not is_collapsible(commit) or (child and is_collapsible(child)):
+            continue  # not the newest commit of a run
+
+        run = [commit]
+        parent = commit.parents[0]
+        while is_collapsible(parent):
+            run.append(parent)
+            parent = parent.parents[0]
+        if len(run) > 1:
+            runs.append(run)
+    return runs
+
+
+def _content_depths(commits: List[gitobject.GitObject]) -> Dict[str, int]:
+    """Return the minimum depth of all trees and blobs that are reachable from
+    the commits, where a top-level tree is at depth 0.
+    """
+    depths: Dict[str, int] = {}
+    frontier = [child.obj for commit in commits for child in commit.children]
+    depth = 0
+    while frontier:
+        next_frontier = []
+        for obj in frontier:
+            if obj.sha not in depths:
+                depths[obj.sha] = depth
+                next_frontier.extend(child.obj for child in obj.children)
+        frontier = next_frontier
+        depth += 1
+    return depths
@@ -0,0 +1,103 @@
+"""A background worker that renders the newest state of a repository."""
+import threading
+from typing import Callable, Optional
+
+import daiquiri
+
+from _pygitviz import util
+
+LOGGER = daiquiri.getLogger(__file__)
+
+RenderFunc = Callable[[threading.Event], None]
+
+
+class RenderWorker:
+    """Runs a render function in a background thread.
+
+    Calling :py:meth:`request` while a render is in progress cancels it, and
+    a new render is started as soon as the cancelled one has stopped. Any
+    number of requests made during a render result in a single new render,
+    so intermediate states are never rendered in sequence.
+
+    Use as a context manager to start and stop the worker.
+    """
+
+    def __init__(self, render_func: RenderFunc):
+        """
+        Args:
+            render_func: A function that renders the current state. It is
+                passed an event that is set when the render should be
+                cancelled, and it may then raise
+                :py:class:`util.CompilationCancelled`.
+        """
+        self._render_func = render_func
+        self._condition = threading.Condition()
+        self._pending = False
+        self._stopped = False
+        self._rendering = False
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "RenderWorker":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="pygitviz-render", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Cancel any render in progress and wait for the worker to exit."""
+        with self._condition:
+            self._stopped = True
+            self._cancel.set()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def request(self) -> None:
+        """Request a render of the newest state, cancelling any render that
+        is in progress.
+        """
+        with self._condition:
+            self._pending = True
+            self._cancel.set()
+            self._condition.notify()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until there are no pending or in-progress renders.
+
+        Returns:
+            True if the worker is idle, False on timeout.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and not self._rendering, timeout
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopped)
+                if self._stopped:
+                    return
+                self._pending = False
+                self._rendering = True
+                self._cancel = threading.Event()
+                cancel = self._cancel
+
+            try:
+                self._render_func(cancel)
+            except util.CompilationCancelled:
+                pass
+            except Exception as exc:
+                LOGGER.error(f"rendering failed: {exc}")
+            finally:
+                with self._condition:
+                    self._rendering = False
+                    self._condition.notify_all()
@@ -0,0 +1,277 @@
+"""Replay of the history of a repository, with one rendered frame per commit.
+
+The object graph is collected once and sent to a pool of worker processes in
+a compact form. Each worker rebuilds the graph a single time, and then
+computes and renders the subgraph of every frame that it is handed.
+"""
+import bisect
+import concurrent.futures
+import multiprocessing.context
+import os
+import pathlib
+from typing import Dict, List, Optional, Tuple
+
+from _pygitviz import git
+from _pygitviz import gitobject
+from _pygitviz import reduce
+from _pygitviz import svg
+from _pygitviz import util
+from _pygitviz.gitobject import Type
+from _pygitviz.graphviz import iter_graphviz, refs_within
+
+# (sha, type, truncated, children as (name, index), parents as indices)
+_CompactObject = Tuple[str, str, bool, Tuple[Tuple[str, int], ...], Tuple[int, ...]]
+
+
+class History:
+    """The history of a repository, from which the graph as it was after each
+    commit in the replay can be computed.
+    """
+
+    def __init__(
+        self,
+        git_objects: List[gitobject.GitObject],
+        refs: List[git.Ref],
+        commit_shas: List[str],
+    ):
+        """
+        Args:
+            git_objects: All Git objects of the repository.
+            refs: The current refs of the repository.
+            commit_shas: The shas of the commits to replay, ordered such that
+                every commit comes after its parents.
+        """
+        objects_by_sha = {obj.sha: obj for obj in git_objects}
+        self._commits = [
+            objects_by_sha[sha] for sha in commit_shas if sha in objects_by_sha
+        ]
+        self._refs = refs
+
+        positions = {commit.sha: i for i, commit in enumerate(self._commits)}
+        commits_by_short_sha = {
+            obj.short_sha: obj for obj in git_objects if obj.obj_type == Type.COMMIT
+        }
+        # the positions of the replayed commits that each ref has reached,
+        # which is None for refs that do not point to a commit
+        self._ref_positions: List[Optional[List[int]]] = [
+            (
+                _ancestor_positions(commits_by_short_sha[ref.value], positions)
+                if ref.value in commits_by_short_sha
+                else None
+            )
+            for ref in refs
+        ]
+
+    def __len__(self) -> int:
+        return len(self._commits)
+
+    @property
+    def commit_shas(self) -> List[str]:
+        """The shas of the replayed commits, without those that are not among
+        the Git objects.
+        """
+        return [commit.sha for commit in self._commits]
+
+    def frame(self, index: int) -> Tuple[List[gitobject.GitObject], List[git.Ref]]:
+        """Return copies of the objects that existed after the commit at the
+        given index of the replay, along with the refs at that time.
+
+        Every ref is moved to the newest commit of the frame that it has
+        reached, and refs that have reached none are left out. Parents of the
+        first replayed commits are drawn as truncated stubs. Tag objects are
+        not linked to what they tag, so they are left out, while tag refs are
+        shown.
+        """
+        visible = self._commits[: index + 1]
+        originals: Dict[str, gitobject.GitObject] = {
+            commit.sha: commit for commit in visible
+        }
+        frontier = [child.obj for commit in visible for child in commit.children]
+        while frontier:
+            obj = frontier.pop()
+            if obj.sha not in originals:
+                originals[obj.sha] = obj
+                frontier.extend(child.obj for child in obj.children)
+        copies = {
+            sha: gitobject.GitObject(sha, obj.obj_type, truncated=obj.truncated)
+            for sha, obj in originals.items()
+        }
+        stubs: Dict[str, gitobject.GitObject] = {}
+        for sha, obj in originals.items():
+            copy = copies[sha]
+            for child in obj.children:
+                copy.add_child(child.name, copies[child.sha])
+            for parent in obj.parents:
+                if parent.sha not in copies and parent.sha not in stubs:
+                    stubs[parent.sha] = gitobject.GitObject(
+                        parent.sha, parent.obj_type, truncated=True
+                    )
+                copy.add_parent(copies.get(parent.sha) or stubs[parent.sha])
+
+        git_objects = list(copies.values()) + list(stubs.values())
+        return git_objects, refs_within(self._frame_refs(index), git_objects)
+
+    def _frame_refs(self, index: int) -> List[git.Ref]:
+        refs = []
+        for ref, positions in zip(self._refs, self._ref_positions):
+            if positions is None:
+                refs.append(ref)
+                continue
+
+            reached = bisect.bisect_right(positions, index)
+            if reached:
+                newest = self._commits[positions[reached - 1]]
+                refs.append(
+                    git.Ref(ref.name, newest.short_sha, ref.remote_tracking_branch)
+                )
+        return refs
+
+
+def _ancestor_positions(
+    commit: gitobject.GitObject, positions: Dict[str, int]
+) -> List[int]:
+    """Return the sorted positions of the commit and all of its ancestors in
+    the replay.
+    """
+    seen = {commit.sha}
+    frontier = [commit]
+    reached = []
+    while frontier:
+        obj = frontier.pop()
+        if obj.sha in positions:
+            reached.append(positions[obj.sha])
+        for parent in obj.parents:
+            if parent.sha not in seen:
+                seen.add(parent.sha)
+                frontier.append(parent)
+    return sorted(reached)
+
+
+def frame_paths(output: pathlib.Path, num_frames: int) -> List[pathlib.Path]:
+    """Return numbered paths for the frames, based on the output path. For
+    example, the first frame of graph.png is graph-0001.png.
+    """
+    width = max(4, len(str(num_frames)))
+    return [
+        output.with_name(f"{output.stem}-{frame:0{width}}{output.suffix}")
+        for frame in range(1, num_frames + 1)
+    ]
+
+
+def replay(
+    output: pathlib.Path,
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+    commit_shas: List[str],
+    hide_content: bool,
+    reduction: reduce.Reduction,
+    renderer: util.Renderer = util.Renderer.DOT,
+    max_workers: Optional[int] = None,
+    mp_context: Optional[multiprocessing.context.BaseContext] = None,
+) -> List[pathlib.Path]:
+    """Render one frame per replayed commit, in parallel over a pool of
+    processes.
+
+    Args:
+        output: The path to base the numbered paths of the frames on.
+        git_objects: All Git objects of the repository.
+        refs: The current refs of the repository.
+        commit_shas: The shas of the commits to replay, ordered such that
+            every commit comes after its parents.
+        hide_content: If True, trees and blobs are not shown.
+        reduction: How to reduce the graph of each frame.
+        renderer: The renderer of the frames.
+        max_workers: The amount of processes. Defaults to the amount of
+            available cores.
+        mp_context: The context to start the processes with. Defaults to the
+            default start method of the platform.
+    Returns:
+        The paths of the rendered frames.
+    """
+    # shas that are not among the objects get no frame, so count the frames
+    # from the commits that the history actually replays
+    commit_shas = History(git_objects, refs, commit_shas).commit_shas
+    paths = frame_paths(output, len(commit_shas))
+    if not paths:
+        return []
+
+    workers = min(len(paths), max_workers or os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(
+            _compact(git_objects),
+            refs,
+            commit_shas,
+            hide_content,
+            reduction,
+            renderer,
+        ),
+    ) as executor:
+        # consume the results to raise any error that occurred in a worker
+        list(executor.map(_render_frame, range(len(paths)), paths))
+    return paths
+
+
+def _compact(git_objects: List[gitobject.GitObject]) -> List[_CompactObject]:
+    """Return the objects as plain tuples, which are far cheaper to send to
+    another process than the linked objects.
+    """
+    indices = {obj.sha: i for i, obj in enumerate(git_objects)}
+    return [
+        (
+            obj.sha,
+            obj.obj_type.value,
+            obj.truncated,
+            tuple((child.name, indices[child.sha]) for child in obj.children),
+            tuple(indices[parent.sha] for parent in obj.parents),
+        )
+        for obj in git_objects
+    ]
+
+
+def _expand(compact_objects: List[_CompactObject]) -> List[gitobject.GitObject]:
+    git_objects = [
+        gitobject.GitObject(sha, Type(obj_type), truncated=truncated)
+        for sha, obj_type, truncated, _, _ in compact_objects
+    ]
+    for obj, (*_, children, parents) in zip(git_objects, compact_objects):
+        for name, index in children:
+            obj.add_child(name, git_objects[index])
+        for index in parents:
+            obj.add_parent(git_objects[index])
+    return git_objects
+
+
+# state of a worker process, set up once by the pool initializer
+_worker_history: Optional[History] = None
+_worker_options: Tuple[bool, reduce.Reduction, util.Renderer] = (
+    False,
+    reduce.Reduction(),
+    util.Renderer.DOT,
+)
+
+
+def _init_worker(
+    compact_objects: List[_CompactObject],
+    refs: List[git.Ref],
+    commit_shas: List[str],
+    hide_content: bool,
+    reduction: reduce.Reduction,
+    renderer: util.Renderer,
+) -> None:
+    global _worker_history, _worker_options
+    _worker_history = History(_expand(compact_objects), refs, commit_shas)
+    _worker_options = (hide_content, reduction, renderer)
+
+
+def _render_frame(index: int, output: pathlib.Path) -> None:
+    hide_content, reduction, renderer = _worker_options
+    git_objects, refs = _worker_history.frame(index)
+    if reduction:
+        git_objects = reduce.reduce_graph(git_objects, refs, reduction)
+    if renderer == util.Renderer.NATIVE:
+        svg.compile(output, git_objects, refs)
+    else:
+        util.compile(output, lambda: iter_graphviz(git_objects, refs, hide_content))
@@ -0,0 +1,208 @@
+"""A local HTTP server for viewing the graph in a browser.
+
+The server serves a page that shows the latest rendered SVG, and pushes every
+new render to the page with server-sent events, such that the page updates in
+place. Any number of pages can share one render.
+"""
+import asyncio
+import threading
+from typing import Optional, Set
+
+import daiquiri
+
+LOGGER = daiquiri.getLogger(__file__)
+
+_PAGE = b"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>PyGitViz</title>
+</head>
+<body style="margin: 0">
+<div id="graph">Waiting for the first render ...</div>
+<script>
+const graph = document.getElementById("graph");
+const events = new EventSource("/events");
+events.addEventListener("graph", (event) => { graph.innerHTML = event.data; });
+</script>
+</body>
+</html>
+"""
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class LiveServer:
+    """An HTTP server on localhost that runs an asyncio event loop in a
+    background thread. Renders are handed to it with :py:meth:`publish`.
+
+    Use as a context manager to start and stop the server.
+    """
+
+    def __init__(self, port: int = 8000, host: str = "127.0.0.1"):
+        """
+        Args:
+            port: The port to listen on. If 0, a free port is picked.
+            host: The address to listen on.
+        """
+        self._host = host
+        self._port = port
+        self._document: Optional[bytes] = None
+        self._version = 0
+        self._published: Optional[bytes] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._error: Optional[OSError] = None
+        # created in the event loop
+        self._changed: Optional[asyncio.Condition] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._clients: Set[asyncio.Task] = set()
+
+    def __enter__(self) -> "LiveServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        """The port that the server listens on, once it is started."""
+        return self._port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._host}:{self._port}/"
+
+    def start(self) -> None:
+        """Start the server, and wait until it listens.
+
+        Raises:
+            RuntimeError: If the server cannot listen on the port.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete,
+            args=(self._serve(),),
+            name="pygitviz-serve",
+            daemon=True,
+        )
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise RuntimeError(
+                f"could not serve on {self._host}:{self._port}: {self._error}"
+            )
+
+    def stop(self) -> None:
+        """Disconnect all clients and wait for the server to exit."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+        self._loop.close()
+
+    def publish(self, document: bytes) -> None:
+        """Make the SVG document the latest render, and push it to all
+        clients. A document that is identical to the previous one is not
+        pushed. May be called from any thread.
+        """
+        if document == self._published:
+            return
+        self._published = document
+        asyncio.run_coroutine_threadsafe(self._set_document(document), self._loop)
+
+    async def _set_document(self, document: bytes) -> None:
+        async with self._changed:
+            self._document = document
+            self._version += 1
+            self._changed.notify_all()
+
+    async def _serve(self) -> None:
+        self._changed = asyncio.Condition()
+        self._stopped = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle, self._host, self._port)
+        except OSError as exc:
+            self._error = exc
+            self._started.set()
+            return
+
+        self._port = server.sockets[0].getsockname()[1]
+        self._started.set()
+        async with server:
+            await self._stopped.wait()
+            # event streams never end by themselves
+            for client in list(self._clients):
+                client.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()).strip():
+                pass  # headers are not needed
+
+            method, path = request_line[:2] if len(request_line) >= 2 else ("", "")
+            if method != "GET":
+                writer.write(_response(405, "text/plain", b"Only GET is supported"))
+            elif path == "/":
+                writer.write(_response(200, "text/html; charset=utf-8", _PAGE))
+            elif path == "/graph.svg" and self._document is not None:
+                writer.write(_response(200, "image/svg+xml", self._document))
+            elif path == "/events":
+                await self._stream_events(writer)
+            else:
+                writer.write(_response(404, "text/plain", b"Not found"))
+            await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception:
+            LOGGER.exception("error while handling a request")
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _stream_events(self, writer: asyncio.StreamWriter) -> None:
+        """Send the latest document, and then every new document as soon as
+        it is published. A client that falls behind only gets the newest
+        document.
+        """
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await writer.drain()
+        sent_version = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._version != sent_version)
+                sent_version, document = self._version, self._document
+            writer.write(_event("graph", document))
+            await writer.drain()
+
+
+def _response(status: int, content_type: str, body: bytes) -> bytes:
+    return (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Cache-Control: no-cache\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def _event(name: str, data: bytes) -> bytes:
+    """Return a server-sent event. Every line of the data is sent as a data
+    field, which the browser joins with newlines.
+    """
+    lines = data.decode("utf8", errors="replace").splitlines() or [""]
+    fields = "".join(f"data: {line}\n" for line in lines)
+    return f"event: {name}\n{fields}\n".encode("utf8")
@@ -0,0 +1,147 @@
+"""A renderer that writes commit graphs as SVG, using the native layout engine
+instead of Graphviz.
+"""
+import collections
+import os
+import pathlib
+from typing import Dict, Iterator, List
+from xml.sax.saxutils import escape
+
+from _pygitviz import git
+from _pygitviz import gitobject
+from _pygitviz import layout
+from _pygitviz import util
+
+_ROW_HEIGHT = 32
+_LANE_WIDTH = 24
+_MARGIN = 16
+_RADIUS = 7
+_FONT_SIZE = 13
+# approximate width of a character in the monospace font, used to size refs
+_CHAR_WIDTH = 8
+_COMMIT_COLOR = "#97ffff"  # darkslategray1, as in the Graphviz output
+_REF_COLOR = "#f5f5dc"  # beige
+_LANE_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#9467bd", "#ff7f0e", "#8c564b")
+
+
+def compile(
+    output_file: pathlib.Path,
+    git_objects: List[gitobject.GitObject],
+    refs: List[git.Ref],
+) -> None:
+    """Lay out the commits and write them as SVG to the output file. Other
+    Git objects are not shown.
+
+    Like :py:func:`util.compile`, the output file is replaced atomically.
+    """
+    tmp_output_file = output_file.with_name(f".{output_file.name}.tmp")
+    with open(tmp_output_file, "wb") as file:
+        util.write_graph(iter_svg(git_objects, refs), file)
+    os.replace(tmp_output_file, output_file)
+
+
+def iter_svg(
+    git_objects: List[gitobject.GitObject], refs: List[git.Ref]
+) -> Iterator[str]:
+    """Yield an SVG document of the commits and refs in fragments."""
+    commit_layout = layout.layout_commits(git_objects)
+    labels = _ref_labels(refs)
+    text_x = _MARGIN + max(commit_layout.num_lanes, 1) * _LANE_WIDTH
+
+    def center(row: int, lane: int):
+        return (
+            _MARGIN + lane * _LANE_WIDTH + _LANE_WIDTH // 2,
+            _MARGIN + row * _ROW_HEIGHT + _ROW_HEIGHT // 2,
+        )
+
+    widest_text = max(
+        (
+            len(_commit_label(commit))
+            + sum(len(label) + 2 for label in labels[commit.short_sha])
+            for commit in commit_layout.commits
+        ),
+        default=0,
+    )
+    width = text_x + widest_text * _CHAR_WIDTH + 2 * _MARGIN
+    height = 2 * _MARGIN + len(commit_layout.commits) * _ROW_HEIGHT
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" viewBox="0 0 {width} {height}" '
+        f'font-family="monospace" font-size="{_FONT_SIZE}">\n'
+    )
+
+    for edge in commit_layout.edges:
+        child_row, child_lane = commit_layout.positions[edge.child]
+        parent_row, parent_lane = commit_layout.positions[edge.parent]
+        cells = [(child_row, child_lane)]
+        if edge.lane != child_lane and parent_row > child_row + 1:
+            cells.append((child_row + 1, edge.lane))
+        cells.append((parent_row, parent_lane))
+        points = " ".join("{},{}".format(*center(*cell)) for cell in cells)
+        color = _LANE_COLORS[edge.lane % len(_LANE_COLORS)]
+        yield (
+            f'<polyline points="{points}" fill="none" stroke="{color}" '
+            'stroke-width="2"/>\n'
+        )
+
+    for commit in commit_layout.commits:
+        row, lane = commit_layout.positions[commit.short_sha]
+        x, y = center(row, lane)
+        dashed = (
+            ' stroke-dasharray="3,2"' if commit.truncated or commit.collapsed else ""
+        )
+        yield (
+            f"<g><title>{escape(commit.sha)}</title>"
+            f'<circle cx="{x}" cy="{y}" r="{_RADIUS}" fill="{_COMMIT_COLOR}" '
+            f'stroke="black"{dashed}/></g>\n'
+        )
+        yield from _iter_text(
+            text_x, y, _commit_label(commit), labels[commit.short_sha]
+        )
+
+    yield "</svg>\n"
+
+
+def _iter_text(x: int, y: int, label: str, ref_labels: List[str]) -> Iterator[str]:
+    baseline = y + _FONT_SIZE // 3
+    yield f'<text x="{x}" y="{baseline}">{escape(label)}</text>\n'
+    x += (len(label) + 1) * _CHAR_WIDTH
+    for ref_label in ref_labels:
+        box_width = (len(ref_label) + 1) * _CHAR_WIDTH
+        yield (
+            f'<rect x="{x}" y="{y - _FONT_SIZE // 2 - 3}" width="{box_width}" '
+            f'height="{_FONT_SIZE + 6}" rx="3" fill="{_REF_COLOR}" stroke="black"/>'
+            f'<text x="{x + _CHAR_WIDTH // 2}" y="{baseline}">'
+            f"{escape(ref_label)}</text>\n"
+        )
+        x += box_width + _CHAR_WIDTH
+
+
+def _commit_label(commit: gitobject.GitObject) -> str:
+    if commit.collapsed:
+        return f"{commit.collapsed} commits {commit.short_sha}..."
+    if commit.truncated:
+        return f"{commit.short_sha} ..."
+    return commit.short_sha
+
+
+def _ref_labels(refs: List[git.Ref]) -> Dict[str, List[str]]:
+    """Return the labels of the refs that point to each commit, keyed by short
+    sha. Symbolic refs are shown along with the ref they point to, as in
+    `HEAD -> main`.
+    """
+    ref_names = {ref.name for ref in refs}
+    symbolic = collections.defaultdict(list)
+    for ref in sorted(refs):
+        if ref.value in ref_names:
+            symbolic[ref.value].append(ref.name)
+
+    labels = collections.defaultdict(list)
+    for ref in sorted(refs):
+        if ref.value in ref_names:
+            continue
+        pointing = symbolic.get(ref.name)
+        labels[ref.value].extend(
+            [f"{name} -> {ref.name}" for name in pointing] if pointing else [ref.name]
+        )
+    return labels
@@ -4,9 +4,20 @@ import pathlib
 import sys
 import collections
 import enum
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import IO, Callable, Iterable, Optional, Sequence, Tuple, Union
+
+from _pygitviz import profile
 
 ENCODING = sys.getdefaultencoding()
 
+# seconds between checks for cancellation while waiting for dot
+_CANCEL_POLL_INTERVAL = 0.05
+
 OS = collections.namedtuple("OS", "name open_pdf_cmd shell_setting".split())
 Linux = OS(name="Linux", open_pdf_cmd="xdg-open", shell_setting=False)
 MacOS = OS(name="macOS", open_pdf_cmd="open", shell_setting=False)
@@ -17,6 +28,16 @@ WSL2 = OS(name="WSL2", open_pdf_cmd="wslview", shell_setting=False)
 class FileType(enum.Enum):
     PDF = "pdf"
     PNG = "png"
+    SVG = "svg"
+
+
+class Renderer(enum.Enum):
+    """The renderer that turns the Git objects into the output file."""
+
+    # Graphviz's dot, which can show any Git objects
+    DOT = "dot"
+    # the native commit graph layout, which only shows commits and writes SVG
+    NATIVE = "native"
 
 
 def short_sha(sha: str) -> str:
@@ -40,12 +61,19 @@ def _is_wsl2():
     return rc == 0 and "WSL2" in stdout
 
 
-def captured_run(*args, **kwargs):
-    """Run a subprocess and capture the output."""
+def captured_run(*args, decode: bool = True, **kwargs):
+    """Run a subprocess and capture the output. If decode is False, stdout is
+    returned as raw bytes.
+    """
+    profiler = profile.active()
+    start = time.perf_counter() if profiler else 0.0
     proc = subprocess.run(
         args, **kwargs, stdout=subprocess.PIPE, stderr=subprocess.PIPE
     )
-    return (proc.returncode, proc.stdout.decode(ENCODING), proc.stderr.decode(ENCODING))
+    if profiler:
+        profiler.record_subprocess(args, time.perf_counter() - start)
+    stdout = proc.stdout.decode(ENCODING) if decode else proc.stdout
+    return (proc.returncode, stdout, proc.stderr.decode(ENCODING))
 
 
 def check_filetype_supported(path: pathlib.Path) -> None:
@@ -61,14 +89,196 @@ def check_filetype_supported(path: pathlib.Path) -> None:
         )
 
 
+class CompilationCancelled(Exception):
+    """Raised when a compilation is cancelled before it finishes."""
+
+
+Graph = Union[str, Iterable[str], Callable[[], Iterable[str]]]
+
+# lays out the graph from scratch
+DOT_ENGINE = ("dot",)
+# keeps the positions of the nodes as given, and only routes the edges
+PINNED_ENGINE = ("neato", "-n2")
+
+
+class RenderCache:
+    """A small LRU cache of rendered outputs, keyed by the hash of the graph
+    source and the output format. Bounded both by the amount of entries and
+    by their total size.
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_entries: The maximum amount of rendered outputs to keep.
+            max_bytes: The maximum total size of the rendered outputs to keep.
+        """
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._used_bytes = 0
+        self._entries: "collections.OrderedDict[Tuple[str, FileType], bytes]"
+        self._entries = collections.OrderedDict()
+
+    def get(self, key: Tuple[str, FileType]) -> Optional[bytes]:
+        """Return the rendered output for the key, or None if not cached."""
+        output = self._entries.get(key)
+        if output is not None:
+            self._entries.move_to_end(key)
+        return output
+
+    def put(self, key: Tuple[str, FileType], output: bytes) -> None:
+        """Add a rendered output, evicting the least recently used outputs
+        if the cache grows too large.
+        """
+        if len(output) > self._max_bytes:
+            return
+
+        self._used_bytes -= len(self._entries.pop(key, b""))
+        self._entries[key] = output
+        self._used_bytes += len(output)
+        while (
+            len(self._entries) > self._max_entries or self._used_bytes > self._max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._used_bytes -= len(evicted)
+
+
+def hash_graph(fragments: Iterable[str]) -> str:
+    """Return a hex digest of the graph source made up of the fragments."""
+    digest = hashlib.sha256()
+    for fragment in fragments:
+        digest.update(fragment.encode(ENCODING))
+    return digest.hexdigest()
+
+
 def compile(
-    dot_file: pathlib.Path,
     output_file: pathlib.Path,
-    graph: str,
+    graph: Graph,
+    cancel: Optional[threading.Event] = None,
+    render_cache: Optional[RenderCache] = None,
+    engine: Sequence[str] = DOT_ENGINE,
+    layout_file: Optional[pathlib.Path] = None,
 ) -> None:
-    dot_file.write_text(graph)
+    """Compile a graph with `dot`. The graph is piped into `dot` as it is
+    produced, so it can be passed as an iterable of fragments to avoid
+    building the whole graph in memory.
+
+    The output is first written to a temporary file next to the output file,
+    which is then atomically moved into place. A viewer of the output file
+    therefore never sees a partially written file.
+
+    Args:
+        output_file: Path to the output file. The suffix determines the
+            output format.
+        graph: The graph, fragments of it, or a function that produces the
+            fragments. When a render cache is used, the function is called
+            once to hash the graph and once more if it must be compiled,
+            so the graph never needs to be held in memory.
+        cancel: An event that, when set, kills `dot` and aborts the
+            compilation by raising :py:class:`CompilationCancelled`.
+        render_cache: A cache of previous outputs. If the graph is
+            identical to a cached one, `dot` is not run at all.
+        engine: The Graphviz command to lay out the graph with. Use
+            :py:data:`PINNED_ENGINE` for graphs where every node has a
+            position.
+        layout_file: If given, the layout is also written to this file in
+            Graphviz's plain format. It is not written on a cache hit.
+    """
     output_format = FileType(output_file.suffix.lstrip("."))
-    captured_run(*f"dot -T{output_format.value} {dot_file} -o {output_file}".split())
+    tmp_output_file = output_file.with_name(f".{output_file.name}.tmp")
+
+    if callable(graph):
+        make_fragments = graph
+    elif isinstance(graph, str):
+        make_fragments = lambda: [graph]  # noqa: E731
+    else:
+        graph = list(graph) if render_cache is not None else graph
+        make_fragments = lambda: graph  # noqa: E731
+
+    cache_key = None
+    if render_cache is not None:
+        cache_key = (hash_graph(make_fragments()), output_format)
+        cached_output = render_cache.get(cache_key)
+        if cached_output is not None:
+            tmp_output_file.write_bytes(cached_output)
+            os.replace(tmp_output_file, output_file)
+            return
+
+    profiler = profile.active()
+    start = time.perf_counter() if profiler else 0.0
+    layout_args = ["-Tplain", "-o", str(layout_file)] if layout_file else []
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            [
+                *engine,
+                f"-T{output_format.value}",
+                "-o",
+                str(tmp_output_file),
+                *layout_args,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        try:
+            returncode = _feed_and_wait(proc, make_fragments(), cancel)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            _remove_if_exists(tmp_output_file)
+            raise
+
+        if returncode != 0:
+            _remove_if_exists(tmp_output_file)
+            stderr.seek(0)
+            raise RuntimeError(stderr.read().decode(ENCODING).strip())
+
+    if profiler:
+        profiler.record_subprocess(engine, time.perf_counter() - start)
+    if render_cache is not None:
+        render_cache.put(cache_key, tmp_output_file.read_bytes())
+    os.replace(tmp_output_file, output_file)
+
+
+def _feed_and_wait(
+    proc: subprocess.Popen,
+    fragments: Iterable[str],
+    cancel: Optional[threading.Event],
+) -> int:
+    def _check_cancelled():
+        if cancel is not None and cancel.is_set():
+            raise CompilationCancelled()
+
+    try:
+        for fragment in fragments:
+            _check_cancelled()
+            proc.stdin.write(fragment.encode(ENCODING))
+    except BrokenPipeError:
+        pass  # dot exited early, the error is reported by the return code
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    while True:
+        try:
+            return proc.wait(timeout=None if cancel is None else _CANCEL_POLL_INTERVAL)
+        except subprocess.TimeoutExpired:
+            _check_cancelled()
+
+
+def _remove_if_exists(path: pathlib.Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def write_graph(fragments: Iterable[str], file: IO[bytes]) -> None:
+    """Write graph fragments to a binary file-like object."""
+    for fragment in fragments:
+        file.write(fragment.encode(ENCODING))
 
 
 def compile_pdf(dot_file, pdf_file, graphviz):
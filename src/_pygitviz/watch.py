@@ -0,0 +1,244 @@
+"""Watchers that block until a Git directory may have changed."""
+import ctypes
+import ctypes.util
+import errno
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+from typing import Dict, Optional, Union
+
+import daiquiri
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+# subdirectories of the .git directory whose entire tree is watched
+_RECURSIVE_DIRS = ("refs", "objects")
+
+LOGGER = daiquiri.getLogger(__file__)
+
+
+class PollingWatcher:
+    """Watcher that simply waits for a fixed interval. Used where inotify is
+    not available.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        """
+        Args:
+            interval: Seconds to wait in each call to :py:meth:`wait`.
+        """
+        self._interval = interval
+
+    def __enter__(self) -> "PollingWatcher":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for one polling interval, or for the timeout if it is shorter.
+        Always returns True, as any interval may contain a change.
+        """
+        time.sleep(self._interval if timeout is None else min(timeout, self._interval))
+        return True
+
+
+class InotifyWatcher:
+    """Watcher that subscribes to inotify events on the parts of a .git
+    directory that affect the visualization: the directory itself (HEAD,
+    packed-refs, config), and the refs and objects trees. Bursts of events,
+    such as a rebase touching hundreds of files, are debounced into a single
+    wakeup.
+
+    If the inotify watch limit is reached while watching directories that
+    are created later on, the watcher falls back to polling.
+    """
+
+    def __init__(
+        self,
+        git_root: pathlib.Path,
+        debounce: float = 0.05,
+        max_delay: float = 0.5,
+    ):
+        """
+        Args:
+            git_root: The .git directory.
+            debounce: Seconds without events after which a burst is
+                considered finished.
+            max_delay: Maximum seconds to keep collecting a burst of events.
+
+        Raises:
+            OSError: If inotify is unavailable.
+        """
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._git_root = git_root
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._watches: Dict[int, pathlib.Path] = {}
+        self._fallback: Optional[PollingWatcher] = None
+
+        try:
+            self._add_watch(git_root)
+            for name in _RECURSIVE_DIRS:
+                self._add_tree_watches(git_root / name)
+        except OSError:
+            self.close()
+            raise
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until a burst of changes has occurred and settled, or until
+        the timeout expires.
+
+        Returns:
+            True if there were changes, False on timeout.
+        """
+        if self._fallback:
+            self.close()
+            return self._fallback.wait(timeout)
+        if not self._read_events(timeout):
+            return False
+
+        deadline = time.monotonic() + self._max_delay
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._read_events(min(self._debounce, remaining)):
+                return True
+
+    def _read_events(self, timeout: Optional[float]) -> bool:
+        """Read and process all pending events, waiting at most timeout seconds
+        for one to arrive. Return True if any events were read.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+
+        buffer = os.read(self._fd, _READ_SIZE)
+        pos = 0
+        while pos < len(buffer):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(buffer, pos)
+            pos += _EVENT_HEADER.size
+            name = buffer[pos : pos + name_len].rstrip(b"\0")
+            pos += name_len
+            self._handle_event(wd, mask, os.fsdecode(name))
+        return True
+
+    def _handle_event(self, wd: int, mask: int, name: str) -> None:
+        if mask & _IN_Q_OVERFLOW:
+            # events were dropped, so directories may have been missed
+            for dirname in _RECURSIVE_DIRS:
+                self._add_tree_watches(self._git_root / dirname, new_only=True)
+        elif mask & _IN_IGNORED:
+            self._watches.pop(wd, None)
+        elif mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+            parent = self._watches.get(wd)
+            if parent is not None and parent != self._git_root:
+                self._add_tree_watches(parent / name, new_only=True)
+
+    def _add_tree_watches(self, root: pathlib.Path, new_only: bool = False) -> None:
+        """Watch every directory of the tree.
+
+        Args:
+            root: The root of the tree.
+            new_only: If True, only directories that are not yet watched are
+                added. This is for trees that appear while watching, where a
+                failure must not stop the live view, so errors are logged
+                instead of raised. If the watch limit is reached, the watcher
+                falls back to polling.
+        """
+        if self._fallback or not root.is_dir():
+            return
+        watched = set(self._watches.values()) if new_only else set()
+        for dirpath, _, _ in os.walk(root):
+            directory = pathlib.Path(dirpath)
+            if directory in watched:
+                continue
+            try:
+                self._add_watch(directory)
+            except FileNotFoundError:
+                pass  # removed while walking, e.g. by gc
+            except OSError as exc:
+                if not new_only:
+                    raise
+                if exc.errno == errno.ENOSPC:
+                    LOGGER.warning(
+                        f"inotify watch limit reached, polling for changes instead: {exc}"
+                    )
+                    self._fallback = PollingWatcher()
+                    return
+                LOGGER.warning(f"could not watch directory: {exc}")
+
+    def _add_watch(self, directory: pathlib.Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        self._watches[wd] = directory
+
+
+def _load_libc() -> ctypes.CDLL:
+    if not sys.platform.startswith("linux"):
+        raise OSError("inotify is only available on Linux")
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError("libc does not provide inotify")
+    return libc
+
+
+def create_watcher(git_root: pathlib.Path) -> Union[InotifyWatcher, PollingWatcher]:
+    """Return an inotify watcher for the .git directory if possible, and
+    otherwise a polling watcher.
+    """
+    try:
+        return InotifyWatcher(git_root)
+    except OSError:
+        return PollingWatcher()
@@ -1,3 +1,4 @@
 from _pygitviz import cli
 
-cli.main()
+if __name__ == "__main__":
+    cli.main()
@@ -0,0 +1,106 @@
+import pathlib
+import shutil
+
+import pytest
+
+from _pygitviz import cache
+from _pygitviz import git
+from _pygitviz.gitobject import Type
+
+_GIT_REPOS_DIR = pathlib.Path(__file__).parent / "resources" / "git_repos"
+
+_TREE = cache.ParsedObject(
+    "a" * 40, Type.TREE, children=(("README.md", "b" * 40), ("src", "c" * 40))
+)
+_COMMIT = cache.ParsedObject(
+    "d" * 40, Type.COMMIT, children=(("", "a" * 40),), parents=("e" * 40, "f" * 40)
+)
+_BLOB = cache.ParsedObject("b" * 40, Type.BLOB)
+
+
+@pytest.fixture
+def object_cache(tmp_path):
+    with cache.ObjectCache(tmp_path / "cache.sqlite") as object_cache:
+        yield object_cache
+
+
+class TestObjectCache:
+    """Tests for the ObjectCache class."""
+
+    def test_round_trip(self, object_cache):
+        object_cache.put_many([_TREE, _COMMIT, _BLOB])
+
+        found = object_cache.get_many([_TREE.sha, _COMMIT.sha, _BLOB.sha, "0" * 40])
+
+        assert found == {obj.sha: obj for obj in (_TREE, _COMMIT, _BLOB)}
+
+    def test_persists_across_instances(self, tmp_path):
+        with cache.ObjectCache(tmp_path / "cache.sqlite") as object_cache:
+            object_cache.put_many([_COMMIT])
+
+        with cache.ObjectCache(tmp_path / "cache.sqlite") as object_cache:
+            assert object_cache.get_many([_COMMIT.sha]) == {_COMMIT.sha: _COMMIT}
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        with cache.ObjectCache(
+            tmp_path / "cache.sqlite", max_entries=2, touch_interval=0
+        ) as object_cache:
+            object_cache.put_many([_TREE])
+            object_cache.put_many([_COMMIT])
+            object_cache.get_many([_TREE.sha])
+            object_cache.put_many([_BLOB])
+
+            found = object_cache.get_many([_TREE.sha, _COMMIT.sha, _BLOB.sha])
+
+        assert sorted(found) == sorted([_TREE.sha, _BLOB.sha])
+
+    def test_evicts_with_entries_from_earlier_instances(self, tmp_path):
+        with cache.ObjectCache(tmp_path / "cache.sqlite") as object_cache:
+            object_cache.put_many([_TREE])
+            object_cache.put_many([_COMMIT])
+
+        with cache.ObjectCache(
+            tmp_path / "cache.sqlite", max_entries=2
+        ) as object_cache:
+            object_cache.put_many([_COMMIT, _BLOB])
+
+            found = object_cache.get_many([_TREE.sha, _COMMIT.sha, _BLOB.sha])
+
+        assert sorted(found) == sorted([_COMMIT.sha, _BLOB.sha])
+
+    def test_recently_used_entries_are_read_without_writes(self, object_cache):
+        object_cache.put_many([_TREE, _COMMIT])
+        statements = []
+        object_cache._connection.set_trace_callback(statements.append)
+
+        object_cache.get_many([_TREE.sha, _COMMIT.sha])
+        object_cache.put_many([_BLOB])
+
+        assert not [
+            statement
+            for statement in statements
+            if statement.startswith("UPDATE") or "COUNT" in statement
+        ]
+
+    def test_for_repo_uses_xdg_cache_home(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+
+        with cache.ObjectCache.for_repo(tmp_path / ".git"):
+            pass
+
+        assert list((tmp_path / "xdg" / "pygitviz").glob("*.sqlite"))
+
+
+def test_warm_cache_skips_object_reads(object_cache, tmp_path, monkeypatch):
+    shutil.unpack_archive(str(_GIT_REPOS_DIR / "repo_with_tags.zip"), tmp_path)
+    git_dir, *_ = tmp_path.rglob(".git")
+    expected = git.collect_objects(git_dir, object_cache=object_cache)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("unexpected object read")
+
+    monkeypatch.setattr(git, "read_loose_object", _fail)
+    monkeypatch.setattr(git, "read_loose_object_info", _fail)
+    actual = git.collect_objects(git_dir, object_cache=object_cache)
+
+    assert sorted(map(repr, actual)) == sorted(map(repr, expected))
@@ -0,0 +1,119 @@
+import pytest
+
+from _pygitviz import commitgraph
+from _pygitviz import git
+
+from helpers import run_git
+
+
+def _commit(repo, message, filename="file.txt"):
+    (repo / filename).write_text(f"{message}\n")
+    run_git(repo, "add", filename)
+    run_git(repo, "commit", "-m", message)
+
+
+@pytest.fixture(params=["single", "split"])
+def git_dir(tmp_path, request):
+    """A repository with merges and an octopus merge, with a commit-graph
+    that covers all but the last commit.
+    """
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    run_git(repo, "init", "-b", "main")
+    _commit(repo, "root")
+    for branch in ("a", "b", "c"):
+        run_git(repo, "checkout", "-b", branch, "main")
+        _commit(repo, f"on {branch}", filename=f"{branch}.txt")
+    run_git(repo, "checkout", "main")
+    run_git(repo, "merge", "--no-edit", "a", "b", "c")
+
+    if request.param == "split":
+        run_git(repo, "commit-graph", "write", "--reachable", "--split")
+        _commit(repo, "after first layer")
+        run_git(repo, "commit-graph", "write", "--reachable", "--split=no-merge")
+    else:
+        run_git(repo, "commit-graph", "write", "--reachable")
+    _commit(repo, "not in graph")
+    return repo / ".git"
+
+
+def _all_commits(git_dir):
+    """Return the shas of all commits, with the one that is not in the
+    commit-graph first.
+    """
+    newest = run_git(git_dir.parent, "rev-parse", "HEAD")
+    return [newest] + [
+        sha
+        for sha in run_git(git_dir.parent, "rev-list", "--all").split()
+        if sha != newest
+    ]
+
+
+def test_lookup_matches_parsed_commits(git_dir):
+    newest, *graph_commits = _all_commits(git_dir)
+    contents = git.batch_read(graph_commits, git_dir)
+
+    with commitgraph.CommitGraph.open(git_dir) as graph:
+        assert len(graph) == len(graph_commits)
+        for sha in graph_commits:
+            assert graph.lookup(sha) == git.parse_commit(contents[sha])
+        assert graph.lookup(newest) is None
+        assert newest not in graph
+
+
+def test_octopus_merge_has_all_parents(git_dir):
+    merge_sha = run_git(git_dir.parent, "rev-list", "--merges", "main")
+    with commitgraph.CommitGraph.open(git_dir) as graph:
+        _, parents = graph.lookup(merge_sha)
+
+    assert len(parents) == 3
+
+
+def test_split_chain_has_multiple_layers(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    run_git(repo, "init")
+    _commit(repo, "first")
+    run_git(repo, "commit-graph", "write", "--reachable", "--split")
+    _commit(repo, "second")
+    run_git(repo, "commit-graph", "write", "--reachable", "--split=no-merge")
+
+    chain = repo / ".git" / "objects" / "info" / "commit-graphs" / "commit-graph-chain"
+    assert len(chain.read_text().split()) == 2
+    with commitgraph.CommitGraph.open(repo / ".git") as graph:
+        second = run_git(repo, "rev-parse", "HEAD")
+        first = run_git(repo, "rev-parse", "HEAD~1")
+        assert graph.lookup(second)[1] == [first]
+
+
+def test_open_returns_none_without_commit_graph(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    run_git(repo, "init")
+
+    assert commitgraph.CommitGraph.open(repo / ".git") is None
+
+
+def test_collect_objects_reads_only_commits_outside_of_graph(git_dir, record_reads):
+    commits = _all_commits(git_dir)
+    newest, *_ = commits
+    expected = {
+        obj.sha: [parent.sha for parent in obj.parents]
+        for obj in git.collect_objects(git_dir)
+        if obj.sha in commits
+    }
+
+    read_shas = record_reads()
+    objects = git.collect_objects(git_dir, hide_content=True)
+
+    assert read_shas == [newest]
+    assert {
+        obj.sha: [parent.sha for parent in obj.parents] for obj in objects
+    } == expected
+
+
+def test_shas_are_all_commits_in_graph(git_dir):
+    _, *graph_commits = _all_commits(git_dir)
+
+    with commitgraph.CommitGraph.open(git_dir) as graph:
+        assert sorted(graph.shas()) == sorted(graph_commits)
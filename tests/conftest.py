@@ -0,0 +1,62 @@
+import shutil
+
+import pytest
+
+from _pygitviz import git
+from _pygitviz import util
+
+from helpers import GIT_REPOS_DIR
+
+
+@pytest.fixture
+def git_dir(tmp_path):
+    shutil.unpack_archive(str(GIT_REPOS_DIR / "repo_with_tags.zip"), tmp_path)
+    git_dir, *_ = tmp_path.rglob(".git")
+    return git_dir
+
+
+@pytest.fixture
+def repo(git_dir):
+    return git_dir.parent
+
+
+@pytest.fixture
+def record_reads(monkeypatch):
+    """Return a function that starts recording the shas of the objects that
+    the native object database reads the content of, and returns the list
+    that they are recorded in.
+    """
+
+    def _record_reads():
+        read_shas = []
+        original_read = git._NativeObjectDatabase.read_contents
+
+        def _recording_read(self, shas):
+            read_shas.extend(shas)
+            return original_read(self, shas)
+
+        monkeypatch.setattr(git._NativeObjectDatabase, "read_contents", _recording_read)
+        return read_shas
+
+    return _record_reads
+
+
+@pytest.fixture
+def record_captured_runs(monkeypatch):
+    """Return a function that starts recording the arguments of each call to
+    :py:func:`util.captured_run`, and returns the list that they are recorded
+    in.
+    """
+
+    def _record_captured_runs():
+        calls = []
+        original_captured_run = util.captured_run
+
+        def _recording_captured_run(*args, **kwargs):
+            calls.append(args)
+            return original_captured_run(*args, **kwargs)
+
+        monkeypatch.setattr(util, "captured_run", _recording_captured_run)
+        return calls
+
+    return _record_captured_runs
@@ -0,0 +1,429 @@
+import shutil
+
+import pytest
+
+from _pygitviz import git
+from _pygitviz import util
+from _pygitviz.gitobject import Type
+
+from helpers import GIT_REPOS_DIR, run_git
+
+
+def _loose_shas(git_dir):
+    return [
+        obj.parent.name + obj.name
+        for obj in (git_dir / "objects").glob("??/*")
+        if len(obj.name) == 38
+    ]
+
+
+class TestBatchCheck:
+    """Tests for the batch_check function."""
+
+    def test_types_match_cat_file(self, git_dir):
+        shas = _loose_shas(git_dir)
+
+        infos = git.batch_check(shas, git_dir)
+
+        assert sorted(infos) == sorted(shas)
+        for sha, info in infos.items():
+            expected = git.cat_file(sha, git_dir, git.CatFileOption.TYPE)
+            assert info.obj_type == Type(expected)
+
+    def test_empty_input_spawns_no_process(self, git_dir, monkeypatch):
+        def _fail(*args, **kwargs):
+            raise AssertionError("unexpected subprocess")
+
+        monkeypatch.setattr("_pygitviz.util.captured_run", _fail)
+
+        assert git.batch_check([], git_dir) == {}
+
+    def test_raises_on_missing_object(self, git_dir):
+        with pytest.raises(RuntimeError):
+            git.batch_check(["0" * 40], git_dir)
+
+
+class TestBatchRead:
+    """Tests for the batch_read function and the raw content parsers."""
+
+    def test_content_matches_cat_file(self, git_dir):
+        shas = _loose_shas(git_dir)
+
+        contents = git.batch_read(shas, git_dir)
+
+        assert sorted(contents) == sorted(shas)
+        for sha, content in contents.items():
+            info = git.batch_check([sha], git_dir)[sha]
+            assert len(content) == info.size
+
+    def test_parse_tree_matches_pretty_print(self, git_dir):
+        infos = git.batch_check(_loose_shas(git_dir), git_dir)
+        tree_shas = [sha for sha, info in infos.items() if info.obj_type == Type.TREE]
+        contents = git.batch_read(tree_shas, git_dir)
+
+        for sha in tree_shas:
+            pretty = git.cat_file(sha, git_dir, git.CatFileOption.PRETTY)
+            expected = [
+                (line.split("\t")[1], line.split()[2]) for line in pretty.split("\n")
+            ]
+            assert list(git.parse_tree(contents[sha])) == expected
+
+    def test_parse_commit(self):
+        content = (
+            b"tree " + b"a" * 40 + b"\n"
+            b"parent " + b"b" * 40 + b"\n"
+            b"parent " + b"c" * 40 + b"\n"
+            b"author A U Thor <author@example.com> 0 +0000\n"
+            b"committer A U Thor <author@example.com> 0 +0000\n"
+            b"\n"
+            b"parent in the message is not a parent\n"
+        )
+
+        tree_sha, parent_shas = git.parse_commit(content)
+
+        assert tree_sha == "a" * 40
+        assert parent_shas == ["b" * 40, "c" * 40]
+
+
+def _all_git_dirs(tmp_path):
+    for repo_zip in GIT_REPOS_DIR.glob("*.zip"):
+        shutil.unpack_archive(str(repo_zip), tmp_path / repo_zip.stem)
+    return sorted(tmp_path.rglob(".git"))
+
+
+def _summarize(git_objects):
+    return sorted(
+        (
+            obj.sha,
+            obj.obj_type,
+            tuple((child.name, child.sha) for child in obj.children),
+            tuple(parent.sha for parent in obj.parents),
+        )
+        for obj in git_objects
+    )
+
+
+class TestCollectObjects:
+    """Tests for the collect_objects function."""
+
+    def test_backends_produce_identical_objects(self, tmp_path):
+        for git_dir in _all_git_dirs(tmp_path):
+            git_objects = git.collect_objects(git_dir, git.ObjectBackend.GIT)
+            native_objects = git.collect_objects(git_dir, git.ObjectBackend.NATIVE)
+
+            assert _summarize(native_objects) == _summarize(git_objects)
+
+    def test_native_backend_spawns_no_processes(self, tmp_path, monkeypatch):
+        def _fail(*args, **kwargs):
+            raise AssertionError("unexpected subprocess")
+
+        git_dirs = _all_git_dirs(tmp_path)
+        monkeypatch.setattr("subprocess.Popen", _fail)
+
+        for git_dir in git_dirs:
+            assert git.collect_objects(git_dir, git.ObjectBackend.NATIVE)
+
+
+class TestHideContent:
+    """Tests for collecting objects with content hidden."""
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{}, {"reachable_only": True}, {"window": git.HistoryWindow(max_commits=2)}],
+    )
+    def test_only_commits_are_read(self, git_dir, record_reads, kwargs):
+        read_shas = record_reads()
+        objects = git.collect_objects(git_dir, hide_content=True, **kwargs)
+
+        read_types = {
+            info.obj_type for info in git.batch_check(read_shas, git_dir).values()
+        }
+        assert read_types == {Type.COMMIT}
+        assert {obj.obj_type for obj in objects} <= {Type.COMMIT, Type.TAG}
+        assert all(not obj.children for obj in objects)
+
+    def test_commit_parents_match_full_collection(self, tmp_path):
+        for git_dir in _all_git_dirs(tmp_path):
+            full_commits = [
+                (obj.sha, tuple(parent.sha for parent in obj.parents))
+                for obj in git.collect_objects(git_dir)
+                if obj.obj_type in (Type.COMMIT, Type.TAG)
+            ]
+            commits = [
+                (obj.sha, tuple(parent.sha for parent in obj.parents))
+                for obj in git.collect_objects(git_dir, hide_content=True)
+            ]
+
+            assert sorted(commits) == sorted(full_commits)
+
+
+def test_read_loose_object_matches_batch_read(git_dir):
+    shas = _loose_shas(git_dir)
+    expected = git.batch_read(shas, git_dir)
+
+    for sha in shas:
+        info = git.read_loose_object_info(git_dir, sha)
+        obj_type, content = git.read_loose_object(git_dir, sha)
+
+        assert content == expected[sha]
+        assert info.size == len(content)
+        assert info.obj_type == obj_type
+
+
+class TestFingerprinter:
+    """Tests for the Fingerprinter class."""
+
+    def test_state_is_stable_without_changes(self, git_dir):
+        fingerprinter = git.Fingerprinter(git_dir)
+
+        assert fingerprinter.state() == fingerprinter.state()
+        assert git.Fingerprinter(git_dir).state() == fingerprinter.state()
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            ["branch", "new-branch"],
+            ["tag", "new-tag"],
+            ["checkout", "--detach"],
+            ["config", "branch.main.remote", "origin"],
+            ["commit", "--allow-empty", "-m", "Empty commit"],
+            ["pack-refs", "--all"],
+            ["gc"],
+            ["tag", "-a", "-m", "Annotated tag", "annotated-tag"],
+        ],
+    )
+    def test_state_changes_on_repository_change(self, git_dir, repo, change):
+        fingerprinter = git.Fingerprinter(git_dir)
+        before = fingerprinter.state()
+
+        run_git(repo, *change)
+
+        assert fingerprinter.state() != before
+
+    def test_state_of_non_existing_directory(self, tmp_path):
+        assert git.Fingerprinter(tmp_path / ".git").state() == 0
+
+
+class TestObjectStore:
+    """Tests for the ObjectStore class."""
+
+    def test_update_matches_collect_objects(self, git_dir, repo):
+        store = git.ObjectStore(git_dir)
+        store.update()
+
+        (repo / "new_file.txt").write_text("New content\n")
+        run_git(repo, "add", "new_file.txt")
+        run_git(repo, "commit", "-m", "Add new file")
+
+        assert _summarize(store.update()) == _summarize(git.collect_objects(git_dir))
+
+    def test_update_only_reads_new_objects(self, git_dir, repo, record_reads):
+        store = git.ObjectStore(git_dir)
+        old_objects = {obj.sha: obj for obj in store.update()}
+        run_git(repo, "commit", "--allow-empty", "-m", "Empty commit")
+
+        read_shas = record_reads()
+        new_objects = {obj.sha: obj for obj in store.update()}
+
+        assert len(read_shas) == 1
+        assert new_objects.keys() - old_objects.keys() == set(read_shas)
+        assert all(new_objects[sha] is obj for sha, obj in old_objects.items())
+
+    def test_update_drops_pruned_objects(self, git_dir, repo):
+        store = git.ObjectStore(git_dir)
+        run_git(repo, "commit", "--allow-empty", "-m", "Soon to be dangling")
+        store.update()
+
+        run_git(repo, "reset", "--hard", "HEAD~1")
+        run_git(repo, "reflog", "expire", "--expire=now", "--all")
+        run_git(repo, "gc", "--prune=now")
+
+        assert _summarize(store.update()) == _summarize(git.collect_objects(git_dir))
+
+
+class TestReachableOnly:
+    """Tests for collecting only the objects that are reachable from refs."""
+
+    @staticmethod
+    def _rev_list_objects(repo):
+        stdout = run_git(repo, "rev-list", "--objects", "--all")
+        return {line.split()[0] for line in stdout.splitlines()}
+
+    @pytest.mark.parametrize("backend", list(git.ObjectBackend))
+    def test_matches_rev_list(self, git_dir, repo, backend):
+        (repo / "README.md").write_text("Stashed change\n")
+        run_git(repo, "stash")
+        run_git(repo, "tag", "-a", "-m", "Annotated tag", "annotated-tag")
+
+        objects = git.collect_objects(git_dir, backend, reachable_only=True)
+
+        assert {obj.sha for obj in objects} == self._rev_list_objects(repo)
+
+    def test_dangling_objects_are_not_read(self, git_dir, repo, monkeypatch):
+        (repo / "dangling.txt").write_text("Not in any commit\n")
+        dangling_sha = run_git(repo, "hash-object", "-w", "dangling.txt")
+
+        read_shas = []
+        original_object_types = git._NativeObjectDatabase.object_types
+
+        def _recording_object_types(self, shas):
+            read_shas.extend(shas)
+            return original_object_types(self, shas)
+
+        monkeypatch.setattr(
+            git._NativeObjectDatabase, "object_types", _recording_object_types
+        )
+        objects = git.collect_objects(git_dir, reachable_only=True)
+
+        assert dangling_sha not in read_shas
+        assert len(objects) == len(read_shas)
+        assert dangling_sha in {obj.sha for obj in git.collect_objects(git_dir)}
+
+    def test_update_drops_objects_that_become_unreachable(self, git_dir, repo):
+        store = git.ObjectStore(git_dir, reachable_only=True)
+        run_git(repo, "commit", "--allow-empty", "-m", "Soon to be unreachable")
+        store.update()
+
+        run_git(repo, "reset", "--hard", "HEAD~1")
+
+        assert {obj.sha for obj in store.update()} == self._rev_list_objects(repo)
+
+
+class TestHistoryWindow:
+    """Tests for collecting a window of history."""
+
+    @pytest.fixture
+    def repo(self, tmp_path):
+        repo = tmp_path / "repo"
+        repo.mkdir()
+        run_git(repo, "init")
+        for i in range(5):
+            (repo / "file.txt").write_text(f"Version {i}\n")
+            run_git(repo, "add", "file.txt")
+            run_git(repo, "commit", "-m", f"Commit {i}")
+        return repo
+
+    @staticmethod
+    def _commits(objects):
+        return {
+            obj.sha: obj.truncated for obj in objects if obj.obj_type == Type.COMMIT
+        }
+
+    def test_max_commits_truncates_at_boundary(self, repo):
+        objects = git.collect_objects(
+            repo / ".git", window=git.HistoryWindow(max_commits=2)
+        )
+
+        assert self._commits(objects) == {
+            run_git(repo, "rev-parse", "HEAD"): False,
+            run_git(repo, "rev-parse", "HEAD~1"): False,
+            run_git(repo, "rev-parse", "HEAD~2"): True,
+        }
+        # one tree and one blob per expanded commit
+        assert len(objects) == 3 + 2 + 2
+
+    def test_revision_range(self, repo):
+        objects = git.collect_objects(
+            repo / ".git", window=git.HistoryWindow(revision_range="HEAD~3..HEAD~1")
+        )
+
+        assert self._commits(objects) == {
+            run_git(repo, "rev-parse", "HEAD~1"): False,
+            run_git(repo, "rev-parse", "HEAD~2"): False,
+            run_git(repo, "rev-parse", "HEAD~3"): True,
+        }
+
+    def test_objects_beyond_boundary_are_not_read(self, repo, record_reads):
+        read_shas = record_reads()
+        git.collect_objects(repo / ".git", window=git.HistoryWindow(max_commits=1))
+
+        # the newest commit and its tree
+        assert len(read_shas) == 2
+
+    def test_stub_becomes_full_commit_when_window_moves(self, repo):
+        store = git.ObjectStore(repo / ".git", window=git.HistoryWindow(max_commits=1))
+        old_head = run_git(repo, "rev-parse", "HEAD")
+        store.update()
+
+        run_git(repo, "reset", "--hard", "HEAD~1")
+
+        assert self._commits(store.update()) == {
+            run_git(repo, "rev-parse", "HEAD"): False,
+            run_git(repo, "rev-parse", "HEAD~1"): True,
+        }
+        assert old_head != run_git(repo, "rev-parse", "HEAD")
+
+    def test_max_commits_spawns_no_processes_for_many_refs(
+        self, repo, record_captured_runs
+    ):
+        for i in range(5):
+            run_git(repo, "branch", f"branch-{i}", f"HEAD~{i}")
+        calls = record_captured_runs()
+        objects = git.collect_objects(
+            repo / ".git", window=git.HistoryWindow(max_commits=1)
+        )
+
+        assert not [call for call in calls if "rev-list" in call]
+        assert sum(not truncated for truncated in self._commits(objects).values()) == 5
+
+    def test_max_commits_skips_tags_of_trees(self, repo):
+        run_git(repo, "tag", "tree-tag", "HEAD^{tree}")
+        run_git(repo, "tag", "-a", "annotated-tree-tag", "-m", "Tree", "HEAD^{tree}")
+
+        objects = git.collect_objects(
+            repo / ".git", window=git.HistoryWindow(max_commits=1)
+        )
+
+        assert self._commits(objects) == {
+            run_git(repo, "rev-parse", "HEAD"): False,
+            run_git(repo, "rev-parse", "HEAD~1"): True,
+        }
+
+    def test_raises_on_invalid_range(self, repo):
+        with pytest.raises(RuntimeError):
+            git.collect_objects(
+                repo / ".git", window=git.HistoryWindow(revision_range="no-such-rev")
+            )
+
+
+class TestCollectRefs:
+    """Tests for the collect_refs function."""
+
+    def test_collects_all_refs_with_a_single_process(
+        self, git_dir, record_captured_runs
+    ):
+        calls = record_captured_runs()
+
+        refs = git.collect_refs(git_dir)
+
+        assert refs
+        assert len(calls) == 1
+
+    def test_annotated_tag_is_peeled(self, git_dir, repo):
+        run_git(repo, "tag", "-a", "-m", "Annotated tag", "annotated-tag")
+        commit_sha = run_git(repo, "rev-parse", "HEAD")
+
+        refs = {ref.name: ref for ref in git.collect_refs(git_dir)}
+
+        assert refs["annotated-tag"].value == util.short_sha(commit_sha)
+
+    def test_upstream_is_only_included_if_it_exists(self, git_dir, repo):
+        run_git(repo, "remote", "add", "origin", "https://example.com/repo.git")
+        run_git(repo, "update-ref", "refs/remotes/origin/main", "HEAD")
+        run_git(repo, "branch", "tracking", "--track", "origin/main")
+        run_git(repo, "branch", "gone", "--track", "origin/main")
+        run_git(repo, "config", "branch.gone.merge", "refs/heads/does-not-exist")
+
+        refs = {ref.name: ref for ref in git.collect_refs(git_dir)}
+
+        assert refs["tracking"].remote_tracking_branch == "origin/main"
+        assert refs["gone"].remote_tracking_branch is None
+        assert refs["origin/main"].remote_tracking_branch is None
+
+    def test_stash_is_included(self, git_dir, repo):
+        (repo / "README.md").write_text("Uncommitted change\n")
+        run_git(repo, "stash")
+
+        refs = {ref.name: ref for ref in git.collect_refs(git_dir)}
+
+        assert r"stash@{0}" in refs
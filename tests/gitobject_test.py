@@ -0,0 +1,68 @@
+import pytest
+
+from _pygitviz.gitobject import Child, GitObject, Type
+
+_TREE_SHA = "a" * 40
+_BLOB_SHA = "b" * 40
+
+
+@pytest.fixture
+def tree():
+    tree = GitObject(_TREE_SHA, Type.TREE)
+    tree.add_child("README.md", GitObject(_BLOB_SHA, Type.BLOB))
+    return tree
+
+
+class TestGitObject:
+    """Tests for the GitObject class."""
+
+    def test_has_no_instance_dict(self, tree):
+        assert not hasattr(tree, "__dict__")
+
+    def test_short_sha_is_interned(self):
+        first = GitObject("1234567" + "a" * 33, Type.BLOB)
+        second = GitObject("1234567" + "b" * 33, Type.BLOB)
+
+        assert first.short_sha == "1234567"
+        assert first.short_sha is second.short_sha
+
+    def test_children_view_is_read_only(self, tree):
+        with pytest.raises(TypeError):
+            tree.children[0] = None
+        assert not hasattr(tree.children, "append")
+
+    def test_children_view_reflects_added_children(self, tree):
+        children = tree.children
+        tree.add_child("other.txt", GitObject("c" * 40, Type.BLOB))
+
+        assert [child.name for child in children] == ["README.md", "other.txt"]
+
+    def test_parents_passed_to_constructor_are_copied(self):
+        parent = GitObject("c" * 40, Type.COMMIT)
+        parents = [parent]
+
+        commit = GitObject("d" * 40, Type.COMMIT, parents=parents)
+        parents.clear()
+
+        assert commit.parents == [parent]
+
+    def test_child_delegates_to_object(self, tree):
+        (child,) = tree.children
+
+        assert isinstance(child, Child)
+        assert child.name == "README.md"
+        assert child.sha == _BLOB_SHA
+        assert child.short_sha == "bbbbbbb"
+        assert child.obj_type == Type.BLOB
+        assert child.children == []
+
+    def test_unlink_removes_child_and_parent(self, tree):
+        (child,) = tree.children
+        commit = GitObject("c" * 40, Type.COMMIT)
+        commit.add_parent(tree)
+
+        tree.unlink([child.obj])
+        commit.unlink([tree])
+
+        assert tree.children == []
+        assert commit.parents == []
@@ -4,6 +4,8 @@ import shutil
 
 import pytest
 
+from _pygitviz import git
+from _pygitviz import gitobject
 from _pygitviz import graphviz
 
 _RepoTestCase = collections.namedtuple("_RepoTestCase", "repo_zip expected_dot_file")
@@ -41,3 +43,47 @@ def test_git_to_dot_produces_empty_graph_for_non_existing_git_dir(tmp_path):
     graph = graphviz.git_to_dot(non_existing_dir)
 
     assert graph == 'digraph G {}'
+
+
+def test_truncated_commit_is_drawn_as_stub():
+    stub = gitobject.GitObject("a" * 40, gitobject.Type.COMMIT, truncated=True)
+    commit = gitobject.GitObject("b" * 40, gitobject.Type.COMMIT, parents=[stub])
+
+    graph = graphviz.to_graphviz([commit, stub], [], hide_content=False)
+
+    assert f'"{stub.short_sha}" [label="commit\n{stub.short_sha}\n..."' in graph
+    assert 'style="filled,dashed"' in graph
+    assert f'"{stub.short_sha}" -> "{commit.short_sha}" [dir=back];' in graph
+
+
+def test_refs_within_drops_refs_outside_of_objects():
+    commit = gitobject.GitObject("a" * 40, gitobject.Type.COMMIT)
+    main = git.Ref("main", commit.short_sha)
+    head = git.Ref("HEAD", "main")
+    outside = git.Ref("old", "b" * 7)
+    head_of_outside = git.Ref("other", "old")
+
+    refs = graphviz.refs_within([main, head, outside, head_of_outside], [commit])
+
+    assert refs == [main, head]
+
+
+@pytest.mark.parametrize("repo_test_case", _get_repo_test_cases())
+def test_hide_content_matches_hiding_full_collection(repo_test_case, tmp_path):
+    shutil.unpack_archive(str(repo_test_case.repo_zip), tmp_path)
+    git_dir, *_ = tmp_path.rglob(".git")
+    expected_graph = graphviz.to_graphviz(
+        git.collect_objects(git_dir), git.collect_refs(git_dir), hide_content=True
+    )
+
+    actual_graph = graphviz.git_to_dot(git_dir, hide_content=True)
+
+    assert actual_graph == expected_graph
+
+
+def test_collapsed_commit_is_drawn_as_summary():
+    summary = gitobject.GitObject("a" * 40, gitobject.Type.COMMIT, collapsed=3)
+
+    graph = graphviz.to_graphviz([summary], [], hide_content=False)
+
+    assert f'"{summary.short_sha}" [label="3 commits\n{summary.short_sha}..."' in graph
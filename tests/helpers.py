@@ -0,0 +1,29 @@
+"""Helpers that are shared between test modules."""
+import pathlib
+import subprocess
+
+
+def run_git(repo, *args):
+    """Run a Git command in the repository with a fixed identity, and return
+    its stripped standard output.
+    """
+    return (
+        subprocess.run(
+            ["git", "-c", "user.name=Tester", "-c", "user.email=tester@example.com"]
+            + list(args),
+            cwd=repo,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        .stdout.decode()
+        .strip()
+    )
+
+
+GIT_REPOS_DIR = pathlib.Path(__file__).parent / "resources" / "git_repos"
+
+
+def make_sha(n):
+    """Return a made up sha whose short sha is n in hexadecimal."""
+    return f"{n:07x}" + "0" * 33
@@ -0,0 +1,94 @@
+from _pygitviz import layout
+from _pygitviz.gitobject import GitObject, Type
+
+from helpers import make_sha
+
+
+def _commit(n, *parents):
+    return GitObject(make_sha(n), Type.COMMIT, parents=list(parents))
+
+
+def _positions(commit_layout, commits):
+    return [commit_layout.positions[commit.short_sha] for commit in commits]
+
+
+def test_linear_history_is_one_lane_newest_first():
+    root = _commit(0)
+    middle = _commit(1, root)
+    tip = _commit(2, middle)
+
+    commit_layout = layout.layout_commits([root, tip, middle])
+
+    assert _positions(commit_layout, [tip, middle, root]) == [(0, 0), (1, 0), (2, 0)]
+    assert commit_layout.num_lanes == 1
+
+
+def test_branches_get_their_own_lanes():
+    root = _commit(0)
+    main = _commit(1, root)
+    feature = _commit(2, root)
+
+    commit_layout = layout.layout_commits([root, main, feature])
+
+    (_, main_lane), (_, feature_lane), (root_row, root_lane) = _positions(
+        commit_layout, [main, feature, root]
+    )
+    assert {main_lane, feature_lane} == {0, 1}
+    assert root_row == 2
+    assert commit_layout.num_lanes == 2
+    # both edges end in the lane of the root
+    assert {edge.lane for edge in commit_layout.edges} == {root_lane}
+
+
+def test_merged_parents_get_separate_lanes_which_are_freed():
+    root = _commit(0)
+    first = _commit(1, root)
+    second = _commit(2, root)
+    merge = _commit(3, first, second)
+    tip = _commit(4, merge)
+
+    commit_layout = layout.layout_commits([root, first, second, merge, tip])
+
+    positions = dict(
+        zip(
+            "root first second merge tip".split(),
+            _positions(commit_layout, [root, first, second, merge, tip]),
+        )
+    )
+    assert positions["tip"][1] == positions["merge"][1] == positions["first"][1] == 0
+    assert positions["second"][1] == 1
+    assert positions["root"] == (4, 0)
+    assert commit_layout.num_lanes == 2
+
+
+def test_every_commit_comes_before_its_parents():
+    commits = [_commit(0)]
+    for i in range(1, 20):
+        parents = [commits[i - 1]] + ([commits[i // 2]] if i % 3 == 0 else [])
+        commits.append(_commit(i, *parents))
+
+    commit_layout = layout.layout_commits(commits)
+
+    rows = {
+        commit.sha: commit_layout.positions[commit.short_sha][0] for commit in commits
+    }
+    assert all(
+        rows[commit.sha] < rows[parent.sha]
+        for commit in commits
+        for parent in commit.parents
+    )
+    assert [commit.sha for commit in commit_layout.commits] == sorted(
+        rows, key=rows.get
+    )
+
+
+def test_ignores_other_objects_and_parents_outside_graph():
+    outside = _commit(0)
+    commit = _commit(1, outside)
+    tree = GitObject(make_sha(2), Type.TREE)
+    commit.add_child("", tree)
+
+    commit_layout = layout.layout_commits([commit, tree])
+
+    assert list(commit_layout.positions) == [commit.short_sha]
+    assert not commit_layout.edges
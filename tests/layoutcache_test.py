@@ -0,0 +1,239 @@
+import shutil
+
+import pytest
+
+from _pygitviz import git
+from _pygitviz import layoutcache
+from _pygitviz import util
+from _pygitviz.gitobject import GitObject, Type
+from _pygitviz.graphviz import iter_graphviz
+
+from helpers import make_sha
+
+
+@pytest.fixture
+def history():
+    root = GitObject(make_sha(0), Type.COMMIT)
+    tip = GitObject(make_sha(1), Type.COMMIT, parents=[root])
+    return [root, tip], [git.Ref("main", tip.short_sha), git.Ref("HEAD", "main")]
+
+
+def _cache_with(positions):
+    layout_cache = layoutcache.LayoutCache()
+    layout_cache.update(positions)
+    return layout_cache
+
+
+def test_parse_plain():
+    plain = "\n".join(
+        [
+            "graph 1 3 2",
+            'node 0000001 1.5 0.5 0.75 0.5 "commit\\n0000001" solid rect black cyan',
+            'node "feature \\"x\\"" 0.25 1 0.75 0.5 "feature" solid rect black white',
+            "edge 0000001 0000002 4 1 1 2 2 3 3 4 4 solid black",
+            "stop",
+        ]
+    )
+
+    assert layoutcache.parse_plain(plain) == {
+        "0000001": (108.0, 36.0),
+        'feature "x"': (18.0, 72.0),
+    }
+
+
+class TestPlace:
+    """Tests for placing nodes based on the previous layout."""
+
+    def test_nothing_to_reuse_without_previous_layout(self, history):
+        git_objects, refs = history
+
+        assert layoutcache.LayoutCache().place(git_objects, refs, True) is None
+
+    def test_new_commit_is_placed_next_to_its_parent(self, history):
+        (root, tip), refs = history
+        new_commit = GitObject(make_sha(2), Type.COMMIT, parents=[tip])
+        previous = {root.short_sha: (0.0, 0.0), tip.short_sha: (90.0, 0.0)}
+        previous.update(main=(-90.0, 60.0), HEAD=(-180.0, 60.0))
+        layout_cache = _cache_with(previous)
+
+        positions = layout_cache.place([root, tip, new_commit], refs, True)
+
+        assert {name: positions[name] for name in previous} == previous
+        assert positions[new_commit.short_sha] == (180.0, 0.0)
+
+    def test_new_nodes_do_not_overlap(self, history):
+        (root, tip), refs = history
+        siblings = [GitObject(make_sha(i), Type.COMMIT, parents=[tip]) for i in (2, 3)]
+        layout_cache = _cache_with(
+            {
+                root.short_sha: (0.0, 0.0),
+                tip.short_sha: (90.0, 0.0),
+                "main": (0.0, 60.0),
+                "HEAD": (-90.0, 60.0),
+            }
+        )
+
+        positions = layout_cache.place([root, tip] + siblings, refs, True)
+
+        assert len(positions) == 6
+        assert len(set(positions.values())) == len(positions)
+
+    def test_new_nodes_do_not_overlap_off_grid_layout(self, history):
+        (root, tip), refs = history
+        # dot spaces nodes of a rank by less than the grid, and off its cells
+        siblings = [GitObject(make_sha(i), Type.COMMIT, parents=[root]) for i in (2, 3)]
+        previous = {
+            root.short_sha: (3.0, 0.0),
+            tip.short_sha: (97.0, 29.0),
+            siblings[0].short_sha: (97.0, -28.6),
+            "main": (187.0, 29.0),
+            "HEAD": (277.0, 29.0),
+        }
+        new_commits = [
+            GitObject(make_sha(i), Type.COMMIT, parents=[parent])
+            for i, parent in ((4, tip), (5, tip), (6, siblings[0]), (7, siblings[1]))
+        ]
+        git_objects = [root, tip] + siblings + new_commits
+        layout_cache = layoutcache.LayoutCache(max_new_fraction=1.0)
+        layout_cache.update(previous)
+
+        positions = layout_cache.place(git_objects, refs, True)
+
+        new_positions = [positions[obj.short_sha] for obj in new_commits]
+        new_positions.append(positions[siblings[1].short_sha])
+        old_cells = {layoutcache._cell(x, y) for x, y in previous.values()}
+        assert not old_cells & {layoutcache._cell(x, y) for x, y in new_positions}
+        for i, (x, y) in enumerate(new_positions):
+            others = list(previous.values()) + new_positions[i + 1 :]
+            assert all(
+                abs(x - other_x) >= layoutcache._RANK_STEP
+                or abs(y - other_y) >= layoutcache._NODE_STEP
+                for other_x, other_y in others
+            )
+
+    def test_lays_out_from_scratch_if_placed_in_other_cluster(self):
+        commit = GitObject(make_sha(0), Type.COMMIT)
+        trees = [GitObject(make_sha(i), Type.TREE) for i in (1, 2)]
+        for i, tree in enumerate(trees):
+            commit.add_child(str(i), tree)
+        new_commit = GitObject(make_sha(3), Type.COMMIT, parents=[commit])
+        # the trees are one rank after the commit, which is where the new
+        # commit would go as well
+        layout_cache = _cache_with(
+            {
+                commit.short_sha: (0.0, 0.0),
+                trees[0].short_sha: (90.0, 0.0),
+                trees[1].short_sha: (90.0, 120.0),
+            }
+        )
+
+        assert layout_cache.place([commit] + trees, [], False) is not None
+        assert layout_cache.place([commit, new_commit] + trees, [], False) is None
+
+    def test_lays_out_from_scratch_after_max_incremental_layouts(self, history):
+        (root, tip), refs = history
+        layout_cache = layoutcache.LayoutCache(max_incremental_layouts=2)
+        layout_cache.update(
+            {
+                root.short_sha: (0.0, 0.0),
+                tip.short_sha: (90.0, 0.0),
+                "main": (90.0, 60.0),
+                "HEAD": (90.0, 120.0),
+            }
+        )
+        git_objects = [root, tip]
+
+        for i in range(2, 4):
+            git_objects.append(GitObject(make_sha(i), Type.COMMIT, parents=[tip]))
+            positions = layout_cache.place(git_objects, refs, True)
+            assert positions is not None
+            layout_cache.update(positions, incremental=True)
+        git_objects.append(GitObject(make_sha(4), Type.COMMIT, parents=[tip]))
+
+        assert layout_cache.place(git_objects[:-1], refs, True) is not None
+        assert layout_cache.place(git_objects, refs, True) is None
+
+        layout_cache.update(positions)
+        assert layout_cache.place(git_objects, refs, True) is not None
+
+    def test_lays_out_from_scratch_if_mostly_new(self, history):
+        (root, tip), refs = history
+        new_commits = [
+            GitObject(make_sha(i), Type.COMMIT, parents=[tip]) for i in (2, 3, 4)
+        ]
+        layout_cache = _cache_with({root.short_sha: (0.0, 0.0)})
+
+        assert layout_cache.place([root, tip] + new_commits, [], True) is None
+
+    def test_lays_out_from_scratch_if_ref_target_is_not_drawn(self, history):
+        (root, tip), _ = history
+        layout_cache = _cache_with(
+            {root.short_sha: (0.0, 0.0), tip.short_sha: (90.0, 0.0)}
+        )
+
+        refs = [git.Ref("main", "fffffff")]
+        assert layout_cache.place([root, tip], refs, True) is None
+
+
+def test_positions_are_added_to_graph(history):
+    (root, tip), refs = history
+    positions = {
+        root.short_sha: (0.0, 0.0),
+        tip.short_sha: (90.0, 0.0),
+        "main": (180.0, 0.0),
+        "HEAD": (270.0, 0.0),
+    }
+
+    graph = "".join(iter_graphviz([root, tip], refs, True, positions))
+
+    assert 'pos="90.00,0.00"' in graph
+    assert '"HEAD" [shape=rect,pos="270.00,0.00"];' in graph
+    assert 'bb="-40.00,-40.00,130.00,40.00";' in graph
+
+
+def test_render_cache_hit_resets_layout(tmp_path, history):
+    (root, tip), refs = history
+    new_commits = [
+        GitObject(make_sha(i), Type.COMMIT, parents=[tip]) for i in (2, 3, 4)
+    ]
+    newest_commit = GitObject(make_sha(5), Type.COMMIT, parents=[new_commits[0]])
+    git_objects = [root, tip] + new_commits
+    output_file = tmp_path / "graph.png"
+    render_cache = util.RenderCache()
+    graph_hash = util.hash_graph(iter_graphviz(git_objects, refs, False))
+    render_cache.put((graph_hash, util.FileType.PNG), b"cached")
+    # the layout of a later graph, e.g. before a reset, which has too little
+    # in common with the cached graph to be reused for it
+    layout_cache = _cache_with(
+        {
+            root.short_sha: (0.0, 0.0),
+            newest_commit.short_sha: (270.0, 0.0),
+            "main": (360.0, 0.0),
+            "HEAD": (450.0, 0.0),
+        }
+    )
+
+    layoutcache.compile(
+        output_file, git_objects, refs, False, layout_cache, render_cache=render_cache
+    )
+
+    assert output_file.read_bytes() == b"cached"
+    assert layout_cache.place(git_objects + [newest_commit], refs, False) is None
+
+
+@pytest.mark.skipif(
+    not (shutil.which("dot") and shutil.which("neato")), reason="requires Graphviz"
+)
+def test_compile_reuses_layout(tmp_path, history):
+    (root, tip), refs = history
+    output_file = tmp_path / "graph.png"
+    layout_cache = layoutcache.LayoutCache()
+
+    layoutcache.compile(output_file, [root, tip], refs, False, layout_cache)
+    first_layout = layout_cache.place([root, tip], refs, False)
+    new_commit = GitObject(make_sha(2), Type.COMMIT, parents=[tip])
+    layoutcache.compile(output_file, [root, tip, new_commit], refs, False, layout_cache)
+
+    assert first_layout is not None
+    assert output_file.stat().st_size > 0
+    assert list(tmp_path.iterdir()) == [output_file]
@@ -0,0 +1,107 @@
+import subprocess
+
+import pytest
+
+from _pygitviz import git
+from _pygitviz import pack
+
+from helpers import run_git
+
+
+@pytest.fixture(scope="module", params=["ofs-delta", "ref-delta"])
+def packed_git_dir(tmp_path_factory, request):
+    """A repository with a single, heavily deltified pack."""
+    repo = tmp_path_factory.mktemp("repo")
+    run_git(repo, "init")
+    lines = [f"line {i}\n" for i in range(2000)]
+    for i in range(10):
+        lines[i * 100] = f"changed in commit {i}\n"
+        (repo / "file.txt").write_text("".join(lines))
+        (repo / "sub").mkdir(exist_ok=True)
+        (repo / "sub" / f"file{i}.txt").write_text(f"content {i}\n")
+        run_git(repo, "add", ".")
+        run_git(repo, "commit", "-m", f"commit {i}")
+    run_git(repo, "tag", "-a", "-m", "a tag", "v1")
+    run_git(repo, "gc", "--aggressive", "--prune=now")
+    if request.param == "ref-delta":
+        run_git(repo, "-c", "repack.useDeltaBaseOffset=false", "repack", "-adf")
+    return repo / ".git"
+
+
+def _pack_path(git_dir):
+    pack_file, *_ = (git_dir / "objects" / "pack").glob("*.pack")
+    return pack_file
+
+
+def test_pack_contains_deltas(packed_git_dir):
+    """Sanity check that the fixture exercises delta resolution."""
+    proc = subprocess.run(
+        ["git", "verify-pack", "-v", str(_pack_path(packed_git_dir))],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    assert b"chain length" in proc.stdout
+
+
+def test_read_matches_git(packed_git_dir):
+    with pack.PackFile(_pack_path(packed_git_dir)) as packfile:
+        shas = list(packfile.index.shas())
+        expected_infos = git.batch_check(shas, packed_git_dir)
+        expected_contents = git.batch_read(shas, packed_git_dir)
+
+        for sha in shas:
+            obj_type, content = packfile.read(sha)
+            assert obj_type == expected_infos[sha].obj_type
+            assert content == expected_contents[sha]
+
+
+def test_object_types_match_git(packed_git_dir):
+    with pack.PackFile(_pack_path(packed_git_dir)) as packfile:
+        types = {
+            sha: packfile.object_type(packfile.index.offset(sha))
+            for sha in packfile.index.shas()
+        }
+
+    expected_infos = git.batch_check(list(types), packed_git_dir)
+    assert types == {sha: info.obj_type for sha, info in expected_infos.items()}
+
+
+def test_read_with_tiny_delta_cache(packed_git_dir):
+    with pack.PackFile(_pack_path(packed_git_dir), delta_cache_size=1) as packfile:
+        shas = list(packfile.index.shas())
+        expected_contents = git.batch_read(shas, packed_git_dir)
+
+        assert {sha: packfile.read(sha)[1] for sha in shas} == expected_contents
+
+
+class TestPackIndex:
+    """Tests for the PackIndex class."""
+
+    def test_lookup_finds_every_object(self, packed_git_dir):
+        pack_path = _pack_path(packed_git_dir)
+        with pack.PackIndex(pack_path.with_suffix(".idx")) as index:
+            shas = list(index.shas())
+            offsets = {sha: index.offset(sha) for sha in shas}
+
+            assert len(shas) == len(index)
+            assert all(sha in index for sha in shas)
+        # the offsets of all objects are distinct and within the pack
+        assert len(set(offsets.values())) == len(shas)
+        assert all(
+            12 <= offset < pack_path.stat().st_size for offset in offsets.values()
+        )
+
+    def test_shas_are_sorted(self, packed_git_dir):
+        with pack.PackIndex(_pack_path(packed_git_dir).with_suffix(".idx")) as index:
+            shas = list(index.shas())
+
+        assert shas == sorted(shas)
+
+    @pytest.mark.parametrize("missing_sha", ["0" * 40, "f" * 40, "7f" + "0" * 38])
+    def test_lookup_of_missing_object_raises_key_error(
+        self, packed_git_dir, missing_sha
+    ):
+        with pack.PackIndex(_pack_path(packed_git_dir).with_suffix(".idx")) as index:
+            assert missing_sha not in index
+            with pytest.raises(KeyError):
+                index.offset(missing_sha)
@@ -0,0 +1,57 @@
+import pytest
+
+from _pygitviz import graphviz
+from _pygitviz import profile
+from _pygitviz import util
+from _pygitviz.gitobject import GitObject, Type
+
+
+def test_disabled_profiling_records_nothing():
+    assert profile.active() is None
+    with profile.phase("collect_objects"):
+        pass
+    assert list(profile.count_dot(["a"])) == ["a"]
+
+
+def test_phases_accumulate():
+    with profile.profiling() as profiler:
+        for _ in range(2):
+            with profile.phase("collect_objects"):
+                pass
+
+    assert list(profiler.phases) == ["collect_objects"]
+    assert profile.active() is None
+
+
+def test_subprocesses_are_recorded_per_git_subcommand():
+    with profile.profiling() as profiler:
+        util.captured_run("git", "--version")
+        util.captured_run("git", "--version")
+
+    assert len(profiler.subprocesses["git --version"]) == 2
+
+
+def test_counts_objects_and_dot_nodes_and_edges():
+    blob = GitObject("a" * 40, Type.BLOB)
+    tree = GitObject("b" * 40, Type.TREE)
+    tree.add_child("file.txt", blob)
+
+    with profile.profiling() as profiler:
+        profile.count_objects([blob, tree])
+        "".join(graphviz.iter_graphviz([blob, tree], [], hide_content=False))
+
+    assert profiler.object_counts == {"blob": 1, "tree": 1}
+    assert (profiler.dot_nodes, profiler.dot_edges) == (2, 1)
+    assert "generate_dot" in profiler.phases
+
+
+@pytest.mark.parametrize(
+    "args, expected",
+    [
+        (["git", "cat-file", "--batch"], "git cat-file"),
+        (["/usr/bin/dot", "-Tpdf"], "dot"),
+        ([], "?"),
+    ],
+)
+def test_command_name(args, expected):
+    assert profile._command_name(args) == expected
@@ -0,0 +1,121 @@
+import pytest
+
+from _pygitviz import git
+from _pygitviz import reduce
+from _pygitviz.gitobject import GitObject, Type
+
+from helpers import make_sha
+
+
+def _chain(length):
+    """Return a linear chain of commits, oldest first."""
+    commits = []
+    for i in range(length):
+        commits.append(
+            GitObject(
+                make_sha(i), Type.COMMIT, parents=commits[-1:] if commits else None
+            )
+        )
+    return commits
+
+
+def _by_sha(objects):
+    return {obj.sha: obj for obj in objects}
+
+
+class TestCollapseChains:
+    """Tests for collapsing linear chains of commits."""
+
+    def test_collapses_unreferenced_run(self):
+        commits = _chain(5)
+        refs = [git.Ref("main", commits[-1].short_sha)]
+
+        reduced = reduce.reduce_graph(
+            commits, refs, reduce.Reduction(collapse_chains=True)
+        )
+
+        # the root has no parent and the tip is referenced, so they are kept
+        root, summary, tip = (_by_sha(reduced)[commits[i].sha] for i in (0, 3, 4))
+        assert len(reduced) == 3
+        assert summary.collapsed == 3
+        assert list(summary.parents) == [root]
+        assert list(tip.parents) == [summary]
+
+    def test_keeps_referenced_commits_and_merges(self):
+        root, a, b = _chain(3)
+        branch = GitObject(make_sha(10), Type.COMMIT, parents=[a])
+        merge = GitObject(make_sha(11), Type.COMMIT, parents=[b, branch])
+        refs = [git.Ref("main", merge.short_sha)]
+
+        reduced = reduce.reduce_graph(
+            [root, a, b, branch, merge], refs, reduce.Reduction(collapse_chains=True)
+        )
+
+        assert not any(obj.collapsed for obj in reduced)
+        assert len(reduced) == 5
+
+    def test_content_of_collapsed_commits_is_dropped(self):
+        commits = _chain(4)
+        tree = GitObject(make_sha(20), Type.TREE)
+        commits[1].add_child("", tree)
+        refs = [git.Ref("main", commits[-1].short_sha)]
+
+        reduced = reduce.reduce_graph(
+            commits + [tree], refs, reduce.Reduction(collapse_chains=True)
+        )
+
+        assert tree.sha not in _by_sha(reduced)
+
+    def test_does_not_modify_input(self):
+        commits = _chain(5)
+        parents_before = [list(commit.parents) for commit in commits]
+
+        reduce.reduce_graph(commits, [], reduce.Reduction(collapse_chains=True))
+
+        assert [list(commit.parents) for commit in commits] == parents_before
+        assert not any(commit.collapsed for commit in commits)
+
+
+class TestMaxTreeDepth:
+    """Tests for folding deep trees."""
+
+    @pytest.fixture
+    def objects(self):
+        blob = GitObject(make_sha(1), Type.BLOB)
+        subtree = GitObject(make_sha(2), Type.TREE)
+        subtree.add_child("file.txt", blob)
+        tree = GitObject(make_sha(3), Type.TREE)
+        tree.add_child("sub", subtree)
+        commit = GitObject(make_sha(4), Type.COMMIT)
+        commit.add_child("", tree)
+        dangling_blob = GitObject(make_sha(5), Type.BLOB)
+        return [blob, subtree, tree, commit, dangling_blob]
+
+    def test_folds_trees_at_max_depth(self, objects):
+        blob, subtree, tree, commit, dangling_blob = objects
+
+        reduced = _by_sha(
+            reduce.reduce_graph(objects, [], reduce.Reduction(max_tree_depth=1))
+        )
+
+        assert blob.sha not in reduced
+        assert reduced[subtree.sha].truncated
+        assert not reduced[subtree.sha].children
+        assert not reduced[tree.sha].truncated
+        assert [child.sha for child in reduced[tree.sha].children] == [subtree.sha]
+        assert dangling_blob.sha in reduced
+
+    def test_depth_zero_folds_top_level_trees(self, objects):
+        _, _, tree, commit, _ = objects
+
+        reduced = _by_sha(
+            reduce.reduce_graph(objects, [], reduce.Reduction(max_tree_depth=0))
+        )
+
+        assert set(reduced) == {tree.sha, commit.sha, objects[-1].sha}
+        assert reduced[tree.sha].truncated
+
+
+def test_empty_reduction_is_falsy():
+    assert not reduce.Reduction()
+    assert reduce.Reduction(max_tree_depth=0)
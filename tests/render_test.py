@@ -0,0 +1,78 @@
+import threading
+
+from _pygitviz import render
+from _pygitviz import util
+
+
+class _BlockingRender:
+    """A render function that blocks until it is cancelled or released."""
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.observe_cancel = threading.Event()
+        self.observe_cancel.set()
+        self.release = threading.Event()
+        self.renders = []
+
+    def __call__(self, cancel):
+        index = len(self.renders)
+        self.renders.append("started")
+        self.started.release()
+        while not self.release.is_set():
+            if self.observe_cancel.is_set() and cancel.wait(timeout=0.01):
+                self.renders[index] = "cancelled"
+                raise util.CompilationCancelled()
+        self.renders[index] = "finished"
+
+
+class TestRenderWorker:
+    """Tests for the RenderWorker class."""
+
+    def test_new_request_cancels_render_in_progress(self):
+        render_func = _BlockingRender()
+
+        with render.RenderWorker(render_func) as worker:
+            worker.request()
+            assert render_func.started.acquire(timeout=1)
+
+            worker.request()
+            assert render_func.started.acquire(timeout=1)
+            render_func.release.set()
+
+            assert worker.wait_idle(timeout=1)
+
+        assert render_func.renders == ["cancelled", "finished"]
+
+    def test_requests_during_render_result_in_single_render(self):
+        render_func = _BlockingRender()
+        render_func.observe_cancel.clear()
+
+        with render.RenderWorker(render_func) as worker:
+            worker.request()
+            assert render_func.started.acquire(timeout=1)
+            for _ in range(10):
+                worker.request()
+            render_func.observe_cancel.set()
+
+            assert render_func.started.acquire(timeout=1)
+            render_func.release.set()
+
+            assert worker.wait_idle(timeout=1)
+
+        assert render_func.renders == ["cancelled", "finished"]
+
+    def test_worker_survives_failing_render(self):
+        calls = []
+
+        def _render_func(cancel):
+            calls.append(cancel)
+            if len(calls) == 1:
+                raise RuntimeError("dot failed")
+
+        with render.RenderWorker(_render_func) as worker:
+            worker.request()
+            assert worker.wait_idle(timeout=1)
+            worker.request()
+            assert worker.wait_idle(timeout=1)
+
+        assert len(calls) == 2
@@ -0,0 +1,205 @@
+import multiprocessing
+import pathlib
+import runpy
+import shutil
+
+import pytest
+
+from _pygitviz import cli
+from _pygitviz import git
+from _pygitviz import reduce
+from _pygitviz import replay
+from _pygitviz import util
+from _pygitviz.gitobject import Type
+
+from helpers import run_git
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository with three commits on main, a tag on the first one and a
+    feature branch off the second one.
+    """
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    run_git(repo, "init", "--initial-branch=main")
+    for i in range(3):
+        (repo / "file.txt").write_text(f"Version {i}\n")
+        run_git(repo, "add", "file.txt")
+        run_git(repo, "commit", "-m", f"Commit {i}")
+        if i == 0:
+            run_git(repo, "tag", "-a", "v1", "-m", "Tag")
+    run_git(repo, "checkout", "-b", "feature", "main~1")
+    (repo / "feature.txt").write_text("Feature\n")
+    run_git(repo, "add", "feature.txt")
+    run_git(repo, "commit", "-m", "Feature")
+    run_git(repo, "checkout", "main")
+    return repo
+
+
+def _history(repo, revision_range="--all"):
+    git_dir = repo / ".git"
+    return replay.History(
+        git.collect_objects(git_dir),
+        git.collect_refs(git_dir),
+        git.replay_commit_shas(git_dir, revision_range),
+    )
+
+
+def _refs(refs):
+    return {ref.name: ref.value for ref in refs}
+
+
+class TestHistory:
+    """Tests for computing the frames of a replay."""
+
+    def test_first_frame(self, repo):
+        history = _history(repo)
+        root = run_git(repo, "rev-parse", "--short=7", "main~2")
+
+        git_objects, refs = history.frame(0)
+
+        assert sorted(obj.obj_type.value for obj in git_objects) == [
+            "blob",
+            "commit",
+            "tree",
+        ]
+        assert _refs(refs) == {
+            "main": root,
+            "feature": root,
+            "v1": root,
+            "HEAD": "main",
+        }
+
+    def test_last_frame_shows_current_refs(self, repo):
+        history = _history(repo)
+
+        git_objects, refs = history.frame(len(history) - 1)
+
+        assert len(history) == 4
+        assert sum(obj.obj_type == Type.COMMIT for obj in git_objects) == 4
+        assert _refs(refs) == _refs(git.collect_refs(repo / ".git"))
+
+    def test_parents_outside_range_are_stubs(self, repo):
+        history = _history(repo, "main~1..main")
+
+        git_objects, refs = history.frame(0)
+
+        commits = {
+            obj.short_sha: obj.truncated
+            for obj in git_objects
+            if obj.obj_type == Type.COMMIT
+        }
+        assert commits == {
+            run_git(repo, "rev-parse", "--short=7", "main"): False,
+            run_git(repo, "rev-parse", "--short=7", "main~1"): True,
+        }
+        assert set(_refs(refs)) == {"main", "HEAD"}
+
+    def test_frames_do_not_modify_input(self, repo):
+        git_dir = repo / ".git"
+        git_objects = git.collect_objects(git_dir)
+        parents_before = {obj.sha: list(obj.parents) for obj in git_objects}
+        history = replay.History(
+            git_objects,
+            git.collect_refs(git_dir),
+            git.replay_commit_shas(git_dir, "main~1..main"),
+        )
+
+        history.frame(0)
+
+        assert {obj.sha: list(obj.parents) for obj in git_objects} == parents_before
+
+
+def test_compact_round_trip(repo):
+    git_objects = git.collect_objects(repo / ".git")
+
+    expanded = replay._expand(replay._compact(git_objects))
+
+    assert [repr(obj) for obj in expanded] == [repr(obj) for obj in git_objects]
+
+
+def test_frame_paths():
+    paths = replay.frame_paths(pathlib.Path("out") / "graph.png", 2)
+
+    assert paths == [
+        pathlib.Path("out/graph-0001.png"),
+        pathlib.Path("out/graph-0002.png"),
+    ]
+
+
+@pytest.mark.skipif(not shutil.which("dot"), reason="requires Graphviz")
+def test_replay_renders_one_frame_per_commit(repo, tmp_path):
+    git_dir = repo / ".git"
+
+    frames = replay.replay(
+        tmp_path / "graph.png",
+        git.collect_objects(git_dir),
+        git.collect_refs(git_dir),
+        git.replay_commit_shas(git_dir, "main"),
+        hide_content=False,
+        reduction=reduce.Reduction(),
+        max_workers=2,
+    )
+
+    assert len(frames) == 3
+    assert all(frame.stat().st_size > 0 for frame in frames)
+
+
+def test_replay_with_spawned_workers(repo, tmp_path):
+    """Spawned workers re-import the main module instead of forking, which is
+    the default on macOS and Windows.
+    """
+    git_dir = repo / ".git"
+
+    frames = replay.replay(
+        tmp_path / "graph.svg",
+        git.collect_objects(git_dir),
+        git.collect_refs(git_dir),
+        git.replay_commit_shas(git_dir, "main"),
+        hide_content=False,
+        reduction=reduce.Reduction(),
+        renderer=util.Renderer.NATIVE,
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+    assert len(frames) == 3
+    assert all(frame.stat().st_size > 0 for frame in frames)
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        pathlib.Path(__file__).parent.parent / "bin" / "pygitviz",
+        pathlib.Path(__file__).parent.parent / "src" / "pygitviz.py",
+    ],
+)
+def test_entry_points_do_not_run_in_spawned_workers(script, mocker):
+    """A spawned worker runs the main script as __mp_main__, which must not
+    start pygitviz all over again.
+    """
+    main = mocker.patch.object(cli, "main")
+
+    runpy.run_path(str(script), run_name="__mp_main__")
+
+    main.assert_not_called()
+
+
+def test_replay_skips_commits_that_are_not_collected(repo, tmp_path):
+    git_dir = repo / ".git"
+    commit_shas = git.replay_commit_shas(git_dir, "main")
+
+    frames = replay.replay(
+        tmp_path / "graph.svg",
+        git.collect_objects(git_dir),
+        git.collect_refs(git_dir),
+        ["0" * 40] + commit_shas,
+        hide_content=False,
+        reduction=reduce.Reduction(),
+        renderer=util.Renderer.NATIVE,
+        max_workers=1,
+    )
+
+    assert frames == replay.frame_paths(tmp_path / "graph.svg", len(commit_shas))
+    assert all(frame.stat().st_size > 0 for frame in frames)
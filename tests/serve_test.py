@@ -0,0 +1,90 @@
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from _pygitviz import serve
+
+
+@pytest.fixture
+def server():
+    with serve.LiveServer(port=0) as server:
+        yield server
+
+
+def _get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.headers.get_content_type(), response.read()
+
+
+class _EventStream:
+    """A minimal client of the event stream."""
+
+    def __init__(self, server):
+        self._sock = socket.create_connection(("127.0.0.1", server.port), timeout=5)
+        self._sock.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        self._file = self._sock.makefile("rb")
+        while self._file.readline().strip():
+            pass  # skip the response headers
+
+    def next_event(self):
+        lines = []
+        while True:
+            line = self._file.readline().decode().rstrip("\n")
+            if not line:
+                return lines
+            lines.append(line)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+def test_serves_page_and_latest_document(server):
+    server.publish(b"<svg>1</svg>")
+    server.publish(b"<svg>2</svg>")
+
+    content_type, page = _get(server.url)
+    assert content_type == "text/html"
+    assert b"EventSource" in page
+    # publishing is asynchronous, so wait for the document through an event
+    stream = _EventStream(server)
+    stream.next_event()
+    stream.close()
+    assert _get(server.url + "graph.svg") == ("image/svg+xml", b"<svg>2</svg>")
+
+
+def test_pushes_only_changed_documents(server):
+    server.publish(b"<svg>\nfirst\n</svg>")
+    stream = _EventStream(server)
+
+    first = stream.next_event()
+    server.publish(b"<svg>\nfirst\n</svg>")
+    server.publish(b"<svg>second</svg>")
+    second = stream.next_event()
+    stream.close()
+
+    assert first == ["event: graph", "data: <svg>", "data: first", "data: </svg>"]
+    assert second == ["event: graph", "data: <svg>second</svg>"]
+
+
+def test_unknown_path_is_not_found(server):
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        _get(server.url + "nothing")
+
+    assert exc_info.value.code == 404
+
+
+def test_raises_if_port_is_taken(server):
+    with pytest.raises(RuntimeError):
+        serve.LiveServer(port=server.port).start()
+
+
+def test_stops_with_connected_clients():
+    with serve.LiveServer(port=0) as server:
+        server.publish(b"<svg/>")
+        stream = _EventStream(server)
+        stream.next_event()
+
+    stream.close()
@@ -0,0 +1,73 @@
+import xml.etree.ElementTree as ElementTree
+
+from _pygitviz import git
+from _pygitviz import svg
+from _pygitviz.gitobject import GitObject, Type
+
+from helpers import make_sha
+
+_SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+
+def _history():
+    root = GitObject(make_sha(0), Type.COMMIT)
+    main = GitObject(make_sha(1), Type.COMMIT, parents=[root])
+    feature = GitObject(make_sha(2), Type.COMMIT, parents=[root])
+    refs = [
+        git.Ref("main", main.short_sha),
+        git.Ref("feature<1>", feature.short_sha),
+        git.Ref("HEAD", "main"),
+    ]
+    return [root, main, feature], refs
+
+
+def _parse(git_objects, refs):
+    return ElementTree.fromstring("".join(svg.iter_svg(git_objects, refs)))
+
+
+def test_draws_one_node_per_commit_and_one_line_per_edge():
+    git_objects, refs = _history()
+
+    document = _parse(git_objects, refs)
+
+    assert len(document.findall(f".//{_SVG_NAMESPACE}circle")) == 3
+    assert len(document.findall(f".//{_SVG_NAMESPACE}polyline")) == 2
+
+
+def test_labels_refs_with_symbolic_refs_joined():
+    git_objects, refs = _history()
+
+    document = _parse(git_objects, refs)
+
+    texts = [text.text for text in document.iter(f"{_SVG_NAMESPACE}text")]
+    assert "HEAD -> main" in texts
+    assert "feature<1>" in texts
+    assert "main" not in texts
+
+
+def test_truncated_and_collapsed_commits_are_dashed():
+    stub = GitObject(make_sha(0), Type.COMMIT, truncated=True)
+    summary = GitObject(make_sha(1), Type.COMMIT, parents=[stub], collapsed=3)
+
+    document = _parse([stub, summary], [])
+
+    circles = document.findall(f".//{_SVG_NAMESPACE}circle")
+    assert all(circle.get("stroke-dasharray") for circle in circles)
+    texts = [text.text for text in document.iter(f"{_SVG_NAMESPACE}text")]
+    assert f"3 commits {summary.short_sha}..." in texts
+
+
+def test_empty_graph_is_valid_svg():
+    document = _parse([], [])
+
+    assert document.tag == f"{_SVG_NAMESPACE}svg"
+
+
+def test_compile_writes_file(tmp_path):
+    git_objects, refs = _history()
+    output_file = tmp_path / "graph.svg"
+
+    svg.compile(output_file, git_objects, refs)
+
+    assert ElementTree.parse(output_file).getroot().tag == f"{_SVG_NAMESPACE}svg"
+    assert list(tmp_path.iterdir()) == [output_file]
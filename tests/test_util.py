@@ -1,3 +1,9 @@
+import io
+import shutil
+import threading
+
+import pytest
+
 from _pygitviz import util
 
 
@@ -16,3 +22,93 @@ class TestGetOs:
         os = util.get_os("linux")
 
         assert os == util.WSL2
+
+
+class TestCompile:
+    """Tests for the compile and write_graph functions."""
+
+    def test_write_graph_writes_all_fragments(self):
+        buffer = io.BytesIO()
+
+        util.write_graph(["digraph G {", "\n", '"å" -> "b";', "\n}"], buffer)
+
+        assert buffer.getvalue().decode(util.ENCODING) == 'digraph G {\n"å" -> "b";\n}'
+
+    @pytest.mark.skipif(not shutil.which("dot"), reason="requires Graphviz")
+    @pytest.mark.parametrize("filetype", list(util.FileType))
+    def test_compile_fragments(self, tmp_path, filetype):
+        output_file = tmp_path / f"graph.{filetype.value}"
+
+        util.compile(output_file, iter(["digraph G {", '"a" -> "b";', "}"]))
+
+        assert output_file.stat().st_size > 0
+
+    @pytest.mark.skipif(not shutil.which("dot"), reason="requires Graphviz")
+    def test_compile_raises_on_invalid_graph(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            util.compile(tmp_path / "graph.pdf", "this is not a graph")
+
+    @pytest.mark.skipif(not shutil.which("dot"), reason="requires Graphviz")
+    def test_cancelled_compile_leaves_previous_output(self, tmp_path):
+        output_file = tmp_path / "graph.pdf"
+        output_file.write_bytes(b"previous output")
+        cancel = threading.Event()
+        cancel.set()
+
+        with pytest.raises(util.CompilationCancelled):
+            util.compile(output_file, "digraph G {}", cancel)
+
+        assert output_file.read_bytes() == b"previous output"
+        assert list(tmp_path.iterdir()) == [output_file]
+
+    def test_cache_hit_skips_dot(self, tmp_path, monkeypatch):
+        output_file = tmp_path / "graph.pdf"
+        graph = "digraph G {}"
+        render_cache = util.RenderCache()
+        render_cache.put((util.hash_graph([graph]), util.FileType.PDF), b"cached")
+
+        def fail(*args, **kwargs):
+            raise AssertionError("dot should not run on a cache hit")
+
+        monkeypatch.setattr(util.subprocess, "Popen", fail)
+
+        util.compile(output_file, lambda: iter([graph]), render_cache=render_cache)
+
+        assert output_file.read_bytes() == b"cached"
+        assert list(tmp_path.iterdir()) == [output_file]
+
+    def test_graph_hash_ignores_fragmentation(self):
+        assert util.hash_graph(["digraph G {", "}"]) == util.hash_graph(
+            ["digraph G {}"]
+        )
+
+
+class TestRenderCache:
+    """Tests for the RenderCache class."""
+
+    def test_evicts_least_recently_used_entry(self):
+        render_cache = util.RenderCache(max_entries=2)
+        render_cache.put(("a", util.FileType.PDF), b"a")
+        render_cache.put(("b", util.FileType.PDF), b"b")
+        render_cache.get(("a", util.FileType.PDF))
+
+        render_cache.put(("c", util.FileType.PDF), b"c")
+
+        assert render_cache.get(("a", util.FileType.PDF)) == b"a"
+        assert render_cache.get(("b", util.FileType.PDF)) is None
+        assert render_cache.get(("c", util.FileType.PDF)) == b"c"
+
+    def test_evicts_entries_beyond_max_bytes(self):
+        render_cache = util.RenderCache(max_bytes=4)
+        render_cache.put(("a", util.FileType.PDF), b"aaa")
+
+        render_cache.put(("b", util.FileType.PDF), b"bb")
+
+        assert render_cache.get(("a", util.FileType.PDF)) is None
+        assert render_cache.get(("b", util.FileType.PDF)) == b"bb"
+
+    def test_format_is_part_of_key(self):
+        render_cache = util.RenderCache()
+        render_cache.put(("a", util.FileType.PDF), b"pdf")
+
+        assert render_cache.get(("a", util.FileType.PNG)) is None
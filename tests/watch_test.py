@@ -0,0 +1,74 @@
+import errno
+import os
+import sys
+
+import pytest
+
+from _pygitviz import watch
+
+from helpers import run_git
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="inotify is only available on Linux"
+)
+
+
+class TestInotifyWatcher:
+    """Tests for the InotifyWatcher class."""
+
+    def test_wait_times_out_without_changes(self, repo):
+        with watch.InotifyWatcher(repo / ".git") as watcher:
+            assert not watcher.wait(timeout=0.1)
+
+    def test_wait_returns_after_commit(self, repo):
+        with watch.InotifyWatcher(repo / ".git") as watcher:
+            run_git(repo, "commit", "--allow-empty", "-m", "First commit")
+
+            assert watcher.wait(timeout=1)
+
+    def test_burst_of_changes_is_debounced(self, repo):
+        with watch.InotifyWatcher(repo / ".git", debounce=0.2) as watcher:
+            for i in range(5):
+                run_git(repo, "commit", "--allow-empty", "-m", f"Commit {i}")
+
+            assert watcher.wait(timeout=1)
+            assert not watcher.wait(timeout=0.1)
+
+    def test_watches_directories_created_after_start(self, repo):
+        with watch.InotifyWatcher(repo / ".git") as watcher:
+            (repo / ".git" / "refs" / "heads" / "nested").mkdir()
+            assert watcher.wait(timeout=1)
+
+            (repo / ".git" / "refs" / "heads" / "nested" / "branch").write_text("")
+            assert watcher.wait(timeout=1)
+
+    def test_unwatchable_new_directory_is_skipped(self, repo, monkeypatch):
+        with watch.InotifyWatcher(repo / ".git") as watcher:
+            monkeypatch.setattr(watcher, "_add_watch", _raising_add_watch(errno.EACCES))
+            (repo / ".git" / "refs" / "heads" / "nested").mkdir()
+
+            assert watcher.wait(timeout=1)
+            assert not watcher.wait(timeout=0.1)
+
+    def test_falls_back_to_polling_at_watch_limit(self, repo, monkeypatch):
+        with watch.InotifyWatcher(repo / ".git") as watcher:
+            monkeypatch.setattr(watcher, "_add_watch", _raising_add_watch(errno.ENOSPC))
+            (repo / ".git" / "refs" / "heads" / "nested").mkdir()
+
+            assert watcher.wait(timeout=1)
+            # a polling watcher reports a change on every wait
+            assert watcher.wait(timeout=0.1)
+
+
+def _raising_add_watch(error):
+    def _add_watch(directory):
+        raise OSError(error, os.strerror(error), str(directory))
+
+    return _add_watch
+
+
+def test_create_watcher_falls_back_to_polling(repo, monkeypatch):
+    monkeypatch.setattr(sys, "platform", "win32")
+
+    with watch.create_watcher(repo / ".git") as watcher:
+        assert isinstance(watcher, watch.PollingWatcher)